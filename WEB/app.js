@@ -1,12 +1,20 @@
 const CONFIG = {
   manifestPath: "./tentit/manifest.json",
   basePath: "./tentit/",
+  searchPath: "./tentit/search/",
+  serviceWorkerPath: "./sw.js",
+  // start_web.py:n tapahtumavirta (SSE) muuttuneista tenteistä
+  eventsPath: "/events",
+  // Montako tulevaa kysymystä kuvineen ladataan etukäteen
+  prefetchAhead: 3,
 };
 
 const elements = {
   examSelect: document.querySelector("#exam-select"),
   questionCountInput: document.querySelector("#question-count"),
   startButton: document.querySelector("#start-btn"),
+  searchInput: document.querySelector("#search-input"),
+  searchButton: document.querySelector("#search-btn"),
   status: document.querySelector("#status"),
   quizSection: document.querySelector("#quiz"),
   quizTitle: document.querySelector("#quiz-title"),
@@ -34,6 +42,56 @@ const state = {
 
 const resolveAssetUrl = async (relativePath) => relativePath;
 
+// Manifestin sisältötiiviste lisätään osoitteeseen (?v=...), jolloin palvelin
+// antaa tiedostolle pysyvän välimuistiajan ja muutos vaihtaa osoitteen.
+const versioned = (url, hash) => (hash ? `${url}?v=${hash}` : url);
+
+// Muuntaa tenttidatan polun ./images/X.png muotoon tentit/images/X.png
+const resolveExamPath = (path) =>
+  path.startsWith("./") ? `tentit/${path.substring(2)}` : path;
+
+// Kuvien versiot (WebP/AVIF eri leveyksinä) tulevat manifestin images-kentästä
+const IMAGE_SIZES = "(max-width: 720px) 100vw, 720px";
+
+function createExamImage(src, alt, className) {
+  const img = document.createElement("img");
+  img.className = className;
+  img.alt = alt;
+  img.decoding = "async";
+  const meta = state.quiz?.manifestEntry?.images?.[src];
+  img.src = versioned(resolveExamPath(src), meta?.hash);
+  img.onerror = () => {
+    img.style.display = "none";
+    console.error("Kuvan lataus epäonnistui:", src);
+  };
+
+  if (!meta?.variants) {
+    img.id = "question-image";
+    return img;
+  }
+
+  // Varataan kuvalle tila ennen latausta
+  img.width = meta.width;
+  img.height = meta.height;
+
+  const picture = document.createElement("picture");
+  picture.id = "question-image";
+  const byType = new Map();
+  meta.variants.forEach((variant) => {
+    if (!byType.has(variant.type)) byType.set(variant.type, []);
+    byType.get(variant.type).push(`${versioned(resolveExamPath(variant.src), meta.hash)} ${variant.width}w`);
+  });
+  byType.forEach((srcset, type) => {
+    const source = document.createElement("source");
+    source.type = type;
+    source.srcset = srcset.join(", ");
+    source.sizes = IMAGE_SIZES;
+    picture.append(source);
+  });
+  picture.append(img);
+  return picture;
+}
+
 const CATEGORY_FALLBACK_KEY = "muut";
 const CATEGORY_DISPLAY_NAMES = {
   fysiikka: "Fysiikka",
@@ -65,7 +123,9 @@ elements.themeToggle.textContent =
 // --- Manifestin haku ---
 async function fetchManifest() {
   if (state.manifestLoaded) return state.manifest;
-  const response = await fetch(CONFIG.manifestPath, { cache: "no-store" });
+  // Manifest tarkistetaan aina palvelimelta (ETag → 304), muut tiedostot
+  // haetaan sen tiivisteillä versioiduista osoitteista.
+  const response = await fetch(CONFIG.manifestPath, { cache: "no-cache" });
   const manifestData = await response.json();
   state.manifest = manifestData.map((entry) => ({
     ...entry,
@@ -119,10 +179,159 @@ function populateExamSelect() {
 async function loadQuiz(examId) {
   const manifest = await fetchManifest();
   const entry = manifest.find((e) => e.id === examId);
-  const response = await fetch(CONFIG.basePath + entry.file, { cache: "no-store" });
+  if (entry.bundle) {
+    const bundle = await fetchBundle(entry.bundle);
+    if (bundle[entry.file]) return { manifestEntry: entry, quizData: bundle[entry.file] };
+  }
+  const url = versioned(CONFIG.basePath + entry.file, entry.hash);
+  const response = await fetch(url, { cache: entry.hash ? "default" : "no-cache" });
   return { manifestEntry: entry, quizData: await response.json() };
 }
 
+// Kategoriapaketti sisältää kaikki kategorian tentit; haetaan kerran per sivu.
+const bundleCache = new Map();
+
+function fetchBundle(path) {
+  if (!bundleCache.has(path)) {
+    const request = fetch(CONFIG.basePath + path)
+      .then((response) => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+      })
+      .catch((error) => {
+        bundleCache.delete(path);
+        console.error("Kategoriapaketin lataus epäonnistui:", path, error);
+        return {};
+      });
+    bundleCache.set(path, request);
+  }
+  return bundleCache.get(path);
+}
+
+// --- Kokotekstihaku ---
+// update_tentit.py rakentaa indeksin (muoto kuvattu haku.py:ssä): index.json
+// ja sanan ensimmäisen merkin mukaan pilkotut osat, jotka haetaan vasta kun
+// hakusana niitä tarvitsee. Normalisointi vastaa haku.normalisoi()-funktiota.
+const searchCache = new Map();
+
+function fetchSearchFile(name) {
+  if (!searchCache.has(name)) {
+    // index.json tarkistetaan palvelimelta, osat on nimetty tiivisteellään
+    const request = fetch(CONFIG.searchPath + name, { cache: name === "index.json" ? "no-cache" : "default" })
+      .then((response) => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+      })
+      .catch((error) => {
+        searchCache.delete(name);
+        throw error;
+      });
+    searchCache.set(name, request);
+  }
+  return searchCache.get(name);
+}
+
+const normalizeSearchText = (text) =>
+  text.normalize("NFKD").replace(/\p{M}/gu, "").toLowerCase().replace(/ß/g, "ss");
+
+function searchTokens(text, minLength) {
+  const tokens = normalizeSearchText(text).match(/[\p{L}\p{N}]+/gu) ?? [];
+  return [...new Set(tokens)].filter((token) => token.length >= minLength);
+}
+
+const termShardKey = (token) => (/[a-z0-9]/.test(token[0]) ? token[0] : "_");
+const termShards = new Map();
+
+async function loadTermShard(index, key) {
+  if (!termShards.has(key)) {
+    const postings = index.terms[key] ? await fetchSearchFile(index.terms[key]) : {};
+    termShards.set(key, { terms: Object.keys(postings).sort(), postings });
+  }
+  return termShards.get(key);
+}
+
+// Dokumentit, joissa on tokenilla alkava sana: täsmäosuma 2, etuliite 1 pistettä
+async function prefixMatches(index, token) {
+  const { terms, postings } = await loadTermShard(index, termShardKey(token));
+  let low = 0;
+  let high = terms.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (terms[mid] < token) low = mid + 1;
+    else high = mid;
+  }
+  const matches = new Map();
+  for (let i = low; i < terms.length && terms[i].startsWith(token); i++) {
+    const score = terms[i] === token ? 2 : 1;
+    postings[terms[i]].forEach((doc) => {
+      if ((matches.get(doc) ?? 0) < score) matches.set(doc, score);
+    });
+  }
+  return matches;
+}
+
+// Palauttaa osumat [{ exam, ordinal, question }] parhaat ensin
+async function searchQuestions(query) {
+  const index = await fetchSearchFile("index.json");
+  const tokens = searchTokens(query, index.min_token);
+  if (!tokens.length) return [];
+  const perToken = await Promise.all(tokens.map((token) => prefixMatches(index, token)));
+  perToken.sort((a, b) => a.size - b.size);
+  let result = null;
+  for (const matches of perToken) {
+    if (!result) {
+      result = new Map(matches);
+    } else {
+      const next = new Map();
+      result.forEach((score, doc) => {
+        if (matches.has(doc)) next.set(doc, score + matches.get(doc));
+      });
+      result = next;
+    }
+    if (!result.size) return [];
+  }
+  const docs = [...result].sort((a, b) => b[1] - a[1] || a[0] - b[0]).map(([doc]) => doc);
+  const shards = await Promise.all(
+    [...new Set(docs.map((doc) => Math.floor(doc / index.docs_per_shard)))].map(async (shard) => [
+      shard,
+      await fetchSearchFile(index.docs[shard]),
+    ])
+  );
+  const byShard = new Map(shards);
+  return docs.map((doc) => {
+    const [exam, ordinal, question] = byShard.get(Math.floor(doc / index.docs_per_shard))[doc % index.docs_per_shard];
+    return { exam: index.exams[exam], ordinal, question };
+  });
+}
+
+// Sama kelpoisuussääntö kuin tenttipankki.normalisoi_kysymys; indeksin
+// järjestysnumerot lasketaan vain kelvollisista kysymyksistä.
+const isValidQuestion = (q) =>
+  q && typeof q === "object" && Array.isArray(q.options) && q.options.length > 0 && q.options.includes(q.correct);
+
+async function loadSearchQuiz(query) {
+  const hits = await searchQuestions(query);
+  const manifest = await fetchManifest();
+  const entries = new Map();
+  const questions = [];
+  for (const hit of hits) {
+    const entry = manifest.find((e) => e.file === hit.exam.file);
+    if (!entry) continue;
+    if (!entries.has(entry.file)) {
+      const { quizData } = await loadQuiz(entry.id);
+      entries.set(entry.file, { entry, valid: (quizData.questions ?? []).filter(isValidQuestion) });
+    }
+    const q = entries.get(entry.file).valid[hit.ordinal];
+    // Jos tentti on muuttunut indeksin jälkeen, osuma ohitetaan
+    if (q && q.question === hit.question) questions.push(q);
+  }
+  const manifestEntry = {
+    title: `Haku: ${query}`,
+    images: Object.assign({}, ...[...entries.values()].map(({ entry }) => entry.images ?? {})),
+  };
+  return { manifestEntry, quizData: { TITLE: manifestEntry.title, questions } };
+}
+
 function shuffle(array) {
   for (let i = array.length - 1; i > 0; i--) {
     const j = Math.floor(Math.random() * (i + 1));
@@ -134,7 +343,8 @@ function shuffle(array) {
 function determineQuestionSet(quizData) {
   const requested =
     Number(elements.questionCountInput.value) || quizData.questions.length;
-  return shuffle([...quizData.questions])
+  // source = kysymyksen kohta tentissä, jotta päivitetty versio löytyy (reloadChangedExams)
+  return shuffle(quizData.questions.map((q, source) => ({ ...q, source })))
     .slice(0, requested)
     .map((q) => ({ ...q, options: shuffle([...q.options]) }));
 }
@@ -149,6 +359,7 @@ function startQuiz(manifestEntry, quizData, questions) {
   state.currentQuestionIndex = 0;
   state.score = 0;
   state.wrongAnswers = [];
+  prefetchedImages.clear();
   elements.quizTitle.textContent = state.quiz.title;
   elements.quizSection.classList.remove("hidden");
   elements.resultsSection.classList.add("hidden");
@@ -161,6 +372,24 @@ function startQuiz(manifestEntry, quizData, questions) {
   }
 }
 
+// Esiladataan seuraavien kysymysten kuvat. Irrallinen <img>/<picture> valitsee
+// saman version kuin näkyvä kuva, ja service worker tallentaa sen välimuistiin.
+const prefetchedImages = new Map();
+
+function prefetchUpcomingImages() {
+  const items = state.quiz.questions ?? state.quiz.content ?? [];
+  const start = state.currentQuestionIndex + 1;
+  items.slice(start, start + CONFIG.prefetchAhead).forEach((item) => {
+    if (!item.image || prefetchedImages.has(item.image)) return;
+    const element = createExamImage(item.image, "", "");
+    element.removeAttribute("id");
+    const img = element.tagName === "IMG" ? element : element.querySelector("img");
+    img.loading = "eager";
+    img.onerror = null;
+    prefetchedImages.set(item.image, element);
+  });
+}
+
 function renderReadingMaterial() {
   const item = state.quiz.content[state.currentQuestionIndex];
   elements.progressLabel.textContent = `${state.currentQuestionIndex + 1}/${state.quiz.content.length}`;
@@ -179,15 +408,11 @@ function renderReadingMaterial() {
   }
   
   if (item.image) {
-    const img = document.createElement('img');
-    img.id = 'question-image';
-    img.className = 'question-image reading-material-image';
-    img.src = item.image.startsWith('./') ? `tentit/${item.image.substring(2)}` : item.image;
-    img.alt = item.title || 'Kuva';
-    img.onerror = () => {
-      img.style.display = 'none';
-      console.error('Kuvan lataus epäonnistui:', item.image);
-    };
+    const img = createExamImage(
+      item.image,
+      item.title || 'Kuva',
+      'question-image reading-material-image'
+    );
     elements.questionText.parentElement.insertBefore(img, elements.optionsList);
   }
   
@@ -220,6 +445,7 @@ function renderReadingMaterial() {
   }
   
   elements.optionsList.appendChild(navDiv);
+  prefetchUpcomingImages();
 }
 
 function renderQuestion() {
@@ -245,18 +471,10 @@ function renderQuestion() {
   }
   
   if (q.image) {
-    const img = document.createElement('img');
-    img.id = 'question-image';
-    img.className = 'question-image';
-    // Convert relative path ./images/X.png to tentit/images/X.png for correct resolution
-    img.src = q.image.startsWith('./') ? `tentit/${q.image.substring(2)}` : q.image;
-    img.alt = q.question || 'Kysymyskuva';
-    img.onerror = () => {
-      img.style.display = 'none';
-      console.error('Kuvan lataus epäonnistui:', q.image);
-    };
+    const img = createExamImage(q.image, q.question || 'Kysymyskuva', 'question-image');
     elements.questionText.parentElement.insertBefore(img, elements.optionsList);
   }
+  prefetchUpcomingImages();
   
   elements.optionsList.innerHTML = "";
   q.options.forEach((option) => {
@@ -344,6 +562,28 @@ elements.startButton.addEventListener("click", async () => {
   }
 });
 
+elements.searchButton.addEventListener("click", async () => {
+  const query = elements.searchInput.value.trim();
+  if (!query) return;
+  elements.status.textContent = "Haetaan...";
+  try {
+    const { manifestEntry, quizData } = await loadSearchQuiz(query);
+    if (!quizData.questions.length) {
+      elements.status.textContent = `Ei osumia haulle "${query}".`;
+      return;
+    }
+    elements.status.textContent = `${quizData.questions.length} osumaa haulle "${query}".`;
+    startQuiz(manifestEntry, quizData, determineQuestionSet(quizData));
+  } catch (err) {
+    console.error("Haku epäonnistui:", err);
+    elements.status.textContent = "Hakuindeksiä ei voitu ladata.";
+  }
+});
+
+elements.searchInput.addEventListener("keydown", (event) => {
+  if (event.key === "Enter") elements.searchButton.click();
+});
+
 elements.restartButton.addEventListener("click", () => {
   startQuiz(
     state.quiz.manifestEntry,
@@ -352,13 +592,80 @@ elements.restartButton.addEventListener("click", () => {
   );
 });
 
+// --- Live reload: update_tentit.py --watch + start_web.py ---
+// Palvelin lähettää "exam"-tapahtuman jokaisesta muuttuneesta tentistä.
+// Manifesti ja tenttilista haetaan uudelleen, ja jos muuttunut tentti on
+// auki, sen vastaamattomat kysymykset korvataan uusilla versioilla.
+const changedExams = new Set();
+let reloadTimer = null;
+
+async function reloadChangedExams(files) {
+  const selected = elements.examSelect.value;
+  state.manifestLoaded = false;
+  searchCache.clear();
+  await fetchManifest();
+  populateExamSelect();
+  if (state.manifest.some((e) => e.id === selected)) elements.examSelect.value = selected;
+
+  const file = state.quiz?.manifestEntry?.file;
+  if (!file || !files.has(file)) return;
+  const entry = state.manifest.find((e) => e.file === file);
+  if (!entry) {
+    elements.status.textContent = `${state.quiz.title} poistettiin palvelimelta.`;
+    return;
+  }
+  const { quizData } = await loadQuiz(entry.id);
+  state.quiz.manifestEntry = entry;
+  if (state.quiz.content) {
+    if (!Array.isArray(quizData.content) || !quizData.content.length) return;
+    state.quiz.content = quizData.content;
+    state.currentQuestionIndex = Math.min(state.currentQuestionIndex, quizData.content.length - 1);
+    renderReadingMaterial();
+  } else if (Array.isArray(quizData.questions)) {
+    // Vastatut kysymykset, pisteet ja kysymysjärjestys säilyvät
+    const firstOpen = state.currentQuestionIndex + (state.hasAnswered ? 1 : 0);
+    state.quiz.questions = state.quiz.questions.map((q, i) => {
+      const updated = i >= firstOpen ? quizData.questions[q.source] : null;
+      return isValidQuestion(updated) ? { ...updated, source: q.source, options: shuffle([...updated.options]) } : q;
+    });
+    if (!state.hasAnswered && state.currentQuestionIndex < state.quiz.questions.length) renderQuestion();
+  }
+  elements.status.textContent = `${entry.title} päivitettiin.`;
+}
+
+function listenForExamUpdates() {
+  if (!("EventSource" in window)) return;
+  const source = new EventSource(CONFIG.eventsPath);
+  source.addEventListener("exam", (event) => {
+    changedExams.add(JSON.parse(event.data).file);
+    // Yksi tallennus voi muuttaa useita tenttejä; päivitetään kerralla
+    clearTimeout(reloadTimer);
+    reloadTimer = setTimeout(() => {
+      const files = new Set(changedExams);
+      changedExams.clear();
+      reloadChangedExams(files).catch((err) => console.warn("Tentin päivitys epäonnistui:", err));
+    }, 100);
+  });
+  // Staattinen palvelin (esim. python -m http.server) vastaa 404, eikä yhteyttä yritetä uudelleen
+}
+
 // --- Ladataan tenttilista sivun latauksen jälkeen ---
 document.addEventListener("DOMContentLoaded", async () => {
   try {
     await fetchManifest();
     populateExamSelect();
+    listenForExamUpdates();
   } catch (err) {
     console.error("Virhe tenttilistan latauksessa:", err);
     elements.examSelect.innerHTML = "<option disabled>Virhe tenttilistan latauksessa</option>";
   }
 });
+
+// --- Offline-tuki: service worker tallentaa sovelluksen ja tentit välimuistiin ---
+if ("serviceWorker" in navigator) {
+  window.addEventListener("load", () => {
+    navigator.serviceWorker
+      .register(CONFIG.serviceWorkerPath)
+      .catch((err) => console.warn("Service workerin rekisteröinti epäonnistui:", err));
+  });
+}
@@ -0,0 +1,142 @@
+// Offline-first service worker TiteTenttaajalle.
+//
+// - precache.json (update_tentit.py luo) kertoo sovelluksen rungon, manifestin
+//   ja tentit. Ne tallennetaan asennuksessa, ja lista tarkistetaan uudelleen
+//   sivun latauksen yhteydessä: uudet tiedostot haetaan, poistuneet poistetaan.
+// - Tiivisteellä versioidut osoitteet (?v=... tai nimi.<hash>.json) eivät
+//   muutu, joten ne tarjoillaan suoraan välimuistista.
+// - Muut (runko, manifest) stale-while-revalidate: vastaus välimuistista heti,
+//   päivitys verkosta taustalla seuraavaa latausta varten.
+// - Kuvat ja hakuindeksin osat (lazy) tallennetaan ajonaikaiseen
+//   välimuistiin ensimmäisellä haulla (app.js esilataa tulevien kysymysten
+//   kuvat ja hakee indeksin osat vasta haettaessa).
+
+const PRECACHE = "titetenttaaja-precache";
+const RUNTIME = "titetenttaaja-runtime";
+const PRECACHE_LIST = "./precache.json";
+const APP_SHELL = ["./index.html", "./app.js", "./styles.css"];
+const SYNC_INTERVAL_MS = 60 * 1000;
+const HASHED_NAME = /\.[0-9a-f]{8,}\.[A-Za-z0-9]+$/;
+
+const scoped = (path) => new URL(path, self.location).href;
+const SCOPE = scoped("./");
+
+let lastSync = 0;
+
+async function loadPrecacheList() {
+  try {
+    const response = await fetch(PRECACHE_LIST, { cache: "no-cache" });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    return await response.json();
+  } catch (error) {
+    console.warn("precache.json puuttuu, tallennetaan vain sovelluksen runko:", error);
+    return null;
+  }
+}
+
+// Tuo välimuistin listan mukaiseksi. Ilman listaa (offline tai
+// update_tentit.py ajamatta) tallennetaan vain runko eikä poisteta mitään.
+async function syncPrecache() {
+  lastSync = Date.now();
+  const list = await loadPrecacheList();
+  const wanted = new Set((list?.precache ?? APP_SHELL).map(scoped));
+  const cache = await caches.open(PRECACHE);
+  const cached = new Set((await cache.keys()).map((request) => request.url));
+
+  await Promise.allSettled(
+    [...wanted].filter((url) => !cached.has(url)).map((url) => cache.add(url))
+  );
+  if (!list) return;
+
+  await Promise.all(
+    [...cached].filter((url) => !wanted.has(url)).map((url) => cache.delete(url))
+  );
+  const images = new Set([...list.images, ...(list.lazy ?? [])].map(scoped));
+  const runtime = await caches.open(RUNTIME);
+  const stale = (await runtime.keys()).filter(
+    (request) => !images.has(request.url) && !wanted.has(request.url)
+  );
+  await Promise.all(stale.map((request) => runtime.delete(request)));
+}
+
+function maybeSync() {
+  if (Date.now() - lastSync < SYNC_INTERVAL_MS) return Promise.resolve();
+  return syncPrecache().catch((error) => console.warn("Välimuistin päivitys epäonnistui:", error));
+}
+
+function isImmutable(url) {
+  return url.searchParams.has("v") || HASHED_NAME.test(url.pathname);
+}
+
+async function cacheFor(request) {
+  const precache = await caches.open(PRECACHE);
+  return (await precache.match(request)) ? precache : caches.open(RUNTIME);
+}
+
+async function cacheFirst(request) {
+  const cached = await caches.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok) {
+    const cache = await caches.open(RUNTIME);
+    await cache.put(request, response.clone());
+  }
+  return response;
+}
+
+async function staleWhileRevalidate(event, fallbackUrl) {
+  const request = event.request;
+  const cached = await caches.match(request, { ignoreSearch: request.mode === "navigate" });
+  const network = fetch(request).then(async (response) => {
+    if (response.ok) {
+      const cache = await cacheFor(request);
+      await cache.put(request, response.clone());
+    }
+    return response;
+  });
+  event.waitUntil(network.catch(() => {}));
+  if (cached) return cached;
+  try {
+    return await network;
+  } catch (error) {
+    const fallback = fallbackUrl && (await caches.match(fallbackUrl));
+    if (fallback) return fallback;
+    throw error;
+  }
+}
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(syncPrecache().then(() => self.skipWaiting()));
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(
+    caches
+      .keys()
+      .then((names) =>
+        Promise.all(
+          names
+            .filter((name) => name.startsWith("titetenttaaja-") && name !== PRECACHE && name !== RUNTIME)
+            .map((name) => caches.delete(name))
+        )
+      )
+      .then(() => self.clients.claim())
+  );
+});
+
+self.addEventListener("fetch", (event) => {
+  const request = event.request;
+  if (request.method !== "GET") return;
+  const url = new URL(request.url);
+  if (!url.href.startsWith(SCOPE) || url.pathname.endsWith("/sw.js")) return;
+  if (url.href === scoped(PRECACHE_LIST)) return;
+
+  if (request.mode === "navigate") {
+    event.waitUntil(maybeSync());
+    event.respondWith(staleWhileRevalidate(event, scoped("./index.html")));
+  } else if (isImmutable(url)) {
+    event.respondWith(cacheFirst(request));
+  } else {
+    event.respondWith(staleWhileRevalidate(event, null));
+  }
+});
@@ -0,0 +1,323 @@
+"""
+Vastauslomakkeiden eräarviointi ilman interaktiivista käyttöliittymää.
+
+- kaanna_avain() kääntää tentin kerran vastausavaimeksi. Jokainen vastaus
+  muunnetaan kokonaislukukoodiksi: kysymyksen alkukohta + vaihtoehdon
+  indeksi. Kysymyskohtainen hakutaulu tuntee kaikki hyväksytyt muodot
+  (vaihtoehdon teksti, numero 1..n, kirjain A..), joten lomakkeen
+  arviointi on pelkkiä sanakirjahakuja.
+- lue_lomakkeet() lukee CSV- tai JSONL-tiedostoa virtana lomake kerrallaan.
+- Arvioija pisteyttää lomakkeet ja kerää vastauskoodit puskuriin, joka
+  lasketaan erissä Counterilla. tilastot() laskee lopuksi kysymyksittäin
+  p-arvon (oikein vastanneiden osuus) ja yleisimmän väärän vaihtoehdon.
+
+Kysymystunniste on kysymyksen "id"-kenttä tai sen järjestysnumero
+tenttitiedostossa (1, 2, ...).
+
+Lomakemuodot:
+    CSV:   student,exam,1,2,3,...   (exam-sarake on valinnainen)
+    JSONL: {"student": "...", "exam": "...", "answers": {"1": "B", ...}}
+           tai "answers": ["B", "C", ...] tiedoston järjestyksessä
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+from array import array
+from collections import Counter
+from operator import eq
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from tenttipankki import KysymysVirta, normalisoi_kysymys
+
+VASTAUSMUODOT = ("auto", "index", "text")
+OPISKELIJA_SARAKKEET = ("student", "opiskelija", "name", "nimi")
+TENTTI_SARAKKEET = ("exam", "tentti")
+PUSKURIN_KOKO = 1 << 16
+
+
+class ArviointiVirhe(ValueError):
+    """Lomake tai avain ei kelpaa (tuntematon kysymys tai tentti, rikkinäinen rivi)."""
+
+
+class Lomake(NamedTuple):
+    opiskelija: str
+    tentti: Optional[str]
+    # Kysymystunnisteet vastausten järjestyksessä tai None, jos vastaukset
+    # ovat tentin omassa järjestyksessä. CSV:ssä sama tuple kaikilla riveillä.
+    tunnisteet: Optional[Tuple[str, ...]]
+    vastaukset: List[Any]
+
+
+class Tulos(NamedTuple):
+    opiskelija: str
+    tentti: str
+    pisteet: int
+    maksimi: int
+    vastattu: int
+
+    @property
+    def prosentti(self) -> float:
+        return 100.0 * self.pisteet / self.maksimi if self.maksimi else 0.0
+
+
+class Kysymystilasto(NamedTuple):
+    tunniste: str
+    kysymys: str
+    vastauksia: int
+    oikein: int
+    p_arvo: Optional[float]
+    tyhjia: int
+    tuntemattomia: int
+    yleisin_vaara: Optional[str]
+    yleisin_vaara_maara: int
+
+
+class Vastausavain:
+    """Yhden tentin käännetty vastausavain.
+
+    Kysymyksellä i on koodit alut[i] .. alut[i] + n + 1: vaihtoehdot 0..n-1,
+    sitten "tuntematon vastaus" ja "tyhjä". oikeat[i] on oikean vaihtoehdon
+    koodi tai -1, jos kysymyksellä ei ole kelvollista oikeaa vastausta.
+    """
+
+    __slots__ = ("tentti", "tunnisteet", "paikat", "kysymykset", "alut", "oikeat", "hakutaulut", "maksimi")
+
+    def __init__(self, tentti: str, kysymykset: Iterable[Any], muoto: str = "auto"):
+        if muoto not in VASTAUSMUODOT:
+            raise ValueError(f"tuntematon vastausmuoto: {muoto}")
+        self.tentti = tentti
+        self.tunnisteet: List[str] = []
+        self.paikat: Dict[str, int] = {}
+        self.kysymykset: List[Tuple[str, Sequence[str]]] = []
+        self.alut = array("l")
+        self.oikeat = array("l")
+        self.hakutaulut: List[Dict[Any, int]] = []
+        self.maksimi = 0
+
+        alku = 0
+        for numero, q in enumerate(kysymykset, 1):
+            tunniste = str(q["id"]) if isinstance(q, dict) and "id" in q else str(numero)
+            if tunniste in self.paikat:
+                raise ArviointiVirhe(f"{tentti}: kysymystunniste {tunniste} esiintyy kahdesti")
+            normalisoitu = normalisoi_kysymys(q)
+            if normalisoitu is not None:
+                options = normalisoitu.vaihtoehdot
+                oikea = alku + normalisoitu.oikea
+                self.maksimi += 1
+            else:
+                options = [str(o) for o in q.get("options", [])] if isinstance(q, dict) else []
+                oikea = -1
+            self.paikat[tunniste] = len(self.tunnisteet)
+            self.tunnisteet.append(tunniste)
+            self.kysymykset.append((q.get("question", "") if isinstance(q, dict) else "", options))
+            self.alut.append(alku)
+            self.oikeat.append(oikea)
+            self.hakutaulut.append(self._hakutaulu(alku, options, muoto))
+            alku += len(options) + 2
+
+    @staticmethod
+    def _hakutaulu(alku: int, options: Sequence[str], muoto: str) -> Dict[Any, int]:
+        taulu: Dict[Any, int] = {"": alku + len(options) + 1, None: alku + len(options) + 1}
+        if muoto in ("auto", "index"):
+            for j in range(len(options)):
+                taulu[j + 1] = alku + j
+                taulu[str(j + 1)] = alku + j
+                if j < 26:
+                    taulu[chr(ord("A") + j)] = alku + j
+                    taulu[chr(ord("a") + j)] = alku + j
+        if muoto in ("auto", "text"):
+            # Teksti voittaa numeron, jos vaihtoehto on itse esim. "1"
+            for j in reversed(range(len(options))):
+                taulu[options[j]] = alku + j
+                taulu[str(options[j]).strip()] = alku + j
+        return taulu
+
+    def tuntematon(self, paikka: int) -> int:
+        return self.alut[paikka] + len(self.kysymykset[paikka][1])
+
+    def sarakkeet(self, tunnisteet: Optional[Tuple[str, ...]], maara: int):
+        """Palauttaa (hakutaulut, tuntemattoman koodit, tyhjän koodit, oikeat koodit) sarakkeille."""
+        if tunnisteet is None:
+            if maara > len(self.tunnisteet):
+                raise ArviointiVirhe(f"{self.tentti}: lomakkeella {maara} vastausta, tentissä {len(self.tunnisteet)} kysymystä")
+            paikat = range(maara)
+        else:
+            try:
+                paikat = [self.paikat[t] for t in tunnisteet]
+            except KeyError as exc:
+                raise ArviointiVirhe(f"{self.tentti}: tuntematon kysymystunniste {exc.args[0]}") from None
+        return (
+            [self.hakutaulut[p] for p in paikat],
+            [self.tuntematon(p) for p in paikat],
+            [self.tuntematon(p) + 1 for p in paikat],
+            [self.oikeat[p] for p in paikat],
+        )
+
+
+def kaanna_avain(polku: str, tentti: Optional[str] = None, muoto: str = "auto") -> Vastausavain:
+    """Kääntää tenttitiedoston vastausavaimeksi lukemalla sen virtana.
+
+    Rikkinäinen tai muu kuin UTF-8-tiedosto (JSONDecodeError,
+    UnicodeDecodeError) nostetaan ArviointiVirheenä tiedoston nimen kanssa.
+    """
+    try:
+        return Vastausavain(tentti or os.path.basename(polku), KysymysVirta(polku, siirtymat=False), muoto)
+    except ArviointiVirhe:
+        raise
+    except ValueError as exc:
+        raise ArviointiVirhe(f"{polku}: tenttiä ei voitu lukea ({exc})") from exc
+
+
+def _sarake(kentat: List[str], nimet: Tuple[str, ...]) -> Optional[int]:
+    for i, kentta in enumerate(kentat):
+        if kentta.strip().lower() in nimet:
+            return i
+    return None
+
+
+def lue_csv(polku: str) -> Iterator[Lomake]:
+    with open(polku, newline="", encoding="utf-8-sig") as f:
+        lukija = csv.reader(f, skipinitialspace=True)
+        otsake = next(lukija, None)
+        if otsake is None:
+            return
+        opiskelija = _sarake(otsake, OPISKELIJA_SARAKKEET)
+        tentti = _sarake(otsake, TENTTI_SARAKKEET)
+        if opiskelija is None:
+            raise ArviointiVirhe(f"{polku}: otsakkeesta puuttuu student-sarake")
+        vastaussarakkeet = [i for i in range(len(otsake)) if i not in (opiskelija, tentti)]
+        tunnisteet = tuple(otsake[i].strip() for i in vastaussarakkeet)
+        perakkaiset = vastaussarakkeet == list(range(vastaussarakkeet[0], len(otsake))) if vastaussarakkeet else True
+        eka = vastaussarakkeet[0] if vastaussarakkeet else len(otsake)
+        for rivi in lukija:
+            if not rivi:
+                continue
+            if len(rivi) < len(otsake):
+                rivi += [""] * (len(otsake) - len(rivi))
+            vastaukset = rivi[eka:len(otsake)] if perakkaiset else [rivi[i] for i in vastaussarakkeet]
+            yield Lomake(rivi[opiskelija], rivi[tentti] if tentti is not None else None, tunnisteet, vastaukset)
+
+
+def lue_jsonl(polku: str) -> Iterator[Lomake]:
+    with open(polku, encoding="utf-8-sig") as f:
+        for rivinumero, rivi in enumerate(f, 1):
+            if not rivi.strip():
+                continue
+            try:
+                data = json.loads(rivi)
+                vastaukset = data["answers"]
+                opiskelija = str(data.get("student", rivinumero))
+            except (ValueError, KeyError, TypeError, AttributeError) as exc:
+                raise ArviointiVirhe(f"{polku}:{rivinumero}: virheellinen lomake ({exc})") from None
+            if isinstance(vastaukset, dict):
+                yield Lomake(opiskelija, data.get("exam"), tuple(vastaukset), list(vastaukset.values()))
+            else:
+                yield Lomake(opiskelija, data.get("exam"), None, list(vastaukset))
+
+
+def lue_lomakkeet(polku: str, muoto: Optional[str] = None) -> Iterator[Lomake]:
+    """Lukee lomakkeet CSV- tai JSONL-tiedostosta (muoto päätellään päätteestä)."""
+    muoto = muoto or ("jsonl" if polku.lower().endswith((".jsonl", ".ndjson")) else "csv")
+    return lue_jsonl(polku) if muoto == "jsonl" else lue_csv(polku)
+
+
+class Arvioija:
+    """Pisteyttää lomakkeita ja kerää kysymyskohtaiset vastausjakaumat.
+
+    hae_avain(tentti) palauttaa tentin Vastausavaimen; kukin tentti käännetään
+    vain kerran. oletustentti käytetään lomakkeille, joissa tenttiä ei ole.
+    """
+
+    def __init__(
+        self,
+        hae_avain: Callable[[str], Vastausavain],
+        oletustentti: Optional[str] = None,
+        puskurin_koko: int = PUSKURIN_KOKO,
+    ):
+        self.hae_avain = hae_avain
+        self.oletustentti = oletustentti
+        self.puskurin_koko = puskurin_koko
+        self.avaimet: Dict[str, Vastausavain] = {}
+        self._puskurit: Dict[str, array] = {}
+        self._laskurit: Dict[str, Counter] = {}
+        self._sarakkeet: Dict[Tuple[str, Any, int], tuple] = {}
+        self.lomakkeita = 0
+
+    def _avain(self, tentti: str) -> Vastausavain:
+        avain = self.avaimet.get(tentti)
+        if avain is None:
+            avain = self.avaimet[tentti] = self.hae_avain(tentti)
+            self._puskurit[tentti] = array("l")
+            self._laskurit[tentti] = Counter()
+        return avain
+
+    def arvioi(self, lomake: Lomake) -> Tulos:
+        tentti = lomake.tentti or self.oletustentti
+        if not tentti:
+            raise ArviointiVirhe(f"lomakkeelta {lomake.opiskelija} puuttuu tentti")
+        avain = self._avain(tentti)
+        vastaukset = lomake.vastaukset
+        tunnus = (tentti, lomake.tunnisteet, len(vastaukset))
+        sarakkeet = self._sarakkeet.get(tunnus)
+        if sarakkeet is None:
+            sarakkeet = self._sarakkeet[tunnus] = avain.sarakkeet(lomake.tunnisteet, len(vastaukset))
+        hakutaulut, oletukset, tyhjat, oikeat = sarakkeet
+
+        try:
+            koodit = list(map(dict.get, hakutaulut, vastaukset, oletukset))
+        except TypeError:  # hajautumaton arvo (lista tms.) JSONL:ssä
+            koodit = [
+                taulu.get(v, oletus) if isinstance(v, (str, int, type(None))) else oletus
+                for taulu, v, oletus in zip(hakutaulut, vastaukset, oletukset)
+            ]
+        pisteet = sum(map(eq, koodit, oikeat))
+        puskuri = self._puskurit[tentti]
+        puskuri.extend(koodit)
+        if len(puskuri) >= self.puskurin_koko:
+            self._laskurit[tentti].update(puskuri)
+            del puskuri[:]
+        self.lomakkeita += 1
+        vastattu = len(koodit) - sum(map(eq, koodit, tyhjat))
+        return Tulos(lomake.opiskelija, tentti, pisteet, avain.maksimi, vastattu)
+
+    def arvioi_kaikki(self, lomakkeet: Iterable[Lomake]) -> Iterator[Tulos]:
+        for lomake in lomakkeet:
+            yield self.arvioi(lomake)
+
+    def tilastot(self) -> Dict[str, List[Kysymystilasto]]:
+        """Kysymyskohtaiset tilastot kaikista tähän mennessä arvioiduista lomakkeista."""
+        tulos = {}
+        for tentti, avain in self.avaimet.items():
+            laskuri = self._laskurit[tentti]
+            puskuri = self._puskurit[tentti]
+            if puskuri:
+                laskuri.update(puskuri)
+                del puskuri[:]
+            rivit = []
+            for paikka, (kysymys, options) in enumerate(avain.kysymykset):
+                alku = avain.alut[paikka]
+                jakauma = [laskuri.get(koodi, 0) for koodi in range(alku, alku + len(options) + 2)]
+                vastauksia = sum(jakauma)
+                oikea = avain.oikeat[paikka] - alku if avain.oikeat[paikka] >= 0 else -1
+                oikein = jakauma[oikea] if oikea >= 0 else 0
+                vaarat = [(maara, j) for j, maara in enumerate(jakauma[: len(options)]) if j != oikea and maara]
+                maara, j = max(vaarat, key=lambda x: (x[0], -x[1])) if vaarat else (0, None)
+                rivit.append(
+                    Kysymystilasto(
+                        tunniste=avain.tunnisteet[paikka],
+                        kysymys=kysymys,
+                        vastauksia=vastauksia,
+                        oikein=oikein,
+                        p_arvo=oikein / vastauksia if vastauksia and oikea >= 0 else None,
+                        tyhjia=jakauma[-1],
+                        tuntemattomia=jakauma[-2],
+                        yleisin_vaara=options[j] if j is not None else None,
+                        yleisin_vaara_maara=maara,
+                    )
+                )
+            tulos[tentti] = rivit
+        return tulos
+
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Eräarvioinnin (arviointi.py) läpäisykyvyn benchmark.
+
+Luo väliaikaiskansioon synteettisen tentin ja satunnaiset vastauslomakkeet
+CSV- ja JSONL-muodossa ja mittaa lomakkeiden lukemisen, pisteytyksen ja
+kysymystilastojen laskennan yhteisnopeuden.
+
+Käyttö:
+    python benchmarks/grading.py
+    python benchmarks/grading.py --sheets 200000 --questions 80 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from arviointi import Arvioija, kaanna_avain, lue_lomakkeet  # noqa: E402
+
+
+def kirjoita_aineisto(kansio: Path, lomakkeita: int, kysymyksia: int, seed: int) -> tuple[Path, Path, Path]:
+    rng = random.Random(seed)
+    tentti = kansio / "benchmark.json"
+    kysymykset = []
+    for i in range(kysymyksia):
+        options = [f"Vaihtoehto {j} kysymykseen {i}" for j in range(4)]
+        kysymykset.append({"question": f"Kysymys {i}?", "options": options, "correct": options[rng.randrange(4)]})
+    tentti.write_text(json.dumps({"TITLE": "Benchmark", "questions": kysymykset}), encoding="utf-8")
+
+    vastausvaihtoehdot = ["A", "B", "C", "D", ""]
+    csv_polku = kansio / "lomakkeet.csv"
+    jsonl_polku = kansio / "lomakkeet.jsonl"
+    with open(csv_polku, "w", newline="", encoding="utf-8") as f_csv, open(jsonl_polku, "w", encoding="utf-8") as f_jsonl:
+        kirjoittaja = csv.writer(f_csv)
+        kirjoittaja.writerow(["student", *range(1, kysymyksia + 1)])
+        for n in range(lomakkeita):
+            vastaukset = rng.choices(vastausvaihtoehdot, k=kysymyksia)
+            kirjoittaja.writerow([f"s{n}", *vastaukset])
+            f_jsonl.write(json.dumps({"student": f"s{n}", "answers": vastaukset}) + "\n")
+    return tentti, csv_polku, jsonl_polku
+
+
+def mittaa(tentti: Path, lomakkeet: Path) -> dict:
+    alku = time.perf_counter()
+    arvioija = Arvioija(lambda nimi: kaanna_avain(str(tentti), nimi), oletustentti=tentti.name)
+    pisteet = 0
+    for tulos in arvioija.arvioi_kaikki(lue_lomakkeet(str(lomakkeet))):
+        pisteet += tulos.pisteet
+    tilastot = arvioija.tilastot()
+    kesto = time.perf_counter() - alku
+    return {
+        "sheets": arvioija.lomakkeita,
+        "seconds": round(kesto, 3),
+        "sheets_per_second": round(arvioija.lomakkeita / kesto),
+        "mean_score": round(pisteet / arvioija.lomakkeita, 2) if arvioija.lomakkeita else 0.0,
+        "questions": len(tilastot[tentti.name]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Eräarvioinnin benchmark")
+    parser.add_argument("--sheets", type=int, default=50_000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Tulosta tulokset JSONina")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tentti, csv_polku, jsonl_polku = kirjoita_aineisto(Path(tmp), args.sheets, args.questions, args.seed)
+        tulokset = {"csv": mittaa(tentti, csv_polku), "jsonl": mittaa(tentti, jsonl_polku)}
+
+    if args.json:
+        print(json.dumps(tulokset, indent=2))
+        return
+    print(f"{args.sheets} lomaketta × {args.questions} kysymystä")
+    for muoto, tulos in tulokset.items():
+        print(
+            f"{muoto:<6} {tulos['seconds']:>7.3f} s  {tulos['sheets_per_second']:>9,} lomaketta/s  "
+            f"keskiarvo {tulos['mean_score']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Mukautuvan kertauksen (kertaus.py) arvonnan benchmark.
+
+Rakentaa synteettisen historian, luo Kertausajastimen ja mittaa yhden
+arvonnan ja painon päivityksen keston. Vertailuna on random.choices, joka
+käy kaikki painot läpi jokaisella arvonnalla.
+
+Käyttö:
+    python benchmarks/scheduler.py
+    python benchmarks/scheduler.py --questions 500000 --draws 20000 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from kertaus import Kertausajastin  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200_000)
+    parser.add_argument("--draws", type=int, default=10_000)
+    parser.add_argument("--baseline-draws", type=int, default=50, help="random.choices-arvontojen määrä")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    nyt = time.time()
+    avaimet = [f"k{i}" for i in range(args.questions)]
+    tilastot = {}
+    for avain in avaimet:
+        if rng.random() < 0.7:
+            yrityksia = rng.randint(1, 20)
+            tilastot[avain] = (yrityksia, rng.randint(0, yrityksia), nyt - rng.uniform(0, 60 * 86400), rng.randint(0, 6))
+
+    alku = time.perf_counter()
+    ajastin = Kertausajastin(avaimet, tilastot, nyt=nyt, rng=rng)
+    rakennus = time.perf_counter() - alku
+
+    alku = time.perf_counter()
+    for _ in range(args.draws):
+        i = ajastin.seuraava()
+        ajastin.kirjaa(i, rng.random() < 0.6, nyt)
+    kierros = (time.perf_counter() - alku) / args.draws
+
+    painot = list(ajastin._puu._painot)
+    alku = time.perf_counter()
+    for _ in range(args.baseline_draws):
+        rng.choices(range(len(painot)), weights=painot)
+    vertailu = (time.perf_counter() - alku) / args.baseline_draws
+
+    tulos = {
+        "questions": args.questions,
+        "build_ms": round(rakennus * 1000, 1),
+        "draw_and_update_us": round(kierros * 1e6, 2),
+        "random_choices_us": round(vertailu * 1e6, 2),
+    }
+    if args.json:
+        print(json.dumps(tulos))
+    else:
+        print(f"Kysymyksiä:                 {tulos['questions']}")
+        print(f"Painojen rakennus:          {tulos['build_ms']} ms")
+        print(f"Arvonta + päivitys:         {tulos['draw_and_update_us']} µs")
+        print(f"random.choices (vertailu):  {tulos['random_choices_us']} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
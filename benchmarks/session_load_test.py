@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Kuormitustesti start_web.py:n /api/-istunnoille (istunnot.py).
+
+Simuloi valvottua luokkatenttiä: jokainen virtuaaliopiskelija (asyncio-
+tehtävä) avaa oman pysyvän HTTP/1.1-yhteyden, aloittaa suorituksen, hakee
+kysymyksen, miettii (--think-ms) ja vastaa, kunnes tentti on valmis. Oletuksena käynnistetään
+oma palvelin erillisenä prosessina yhdelle prosessoriytimelle sidottuna
+(Linux), jolloin tulos kertoo yhden ytimen kapasiteetin.
+
+Lopuksi tulostetaan pyynnöt/s ja latenssin p50/p95/p99. Skripti palauttaa
+koodin 1, jos --target-rps tai --target-p99-ms ei täyty tai jokin
+suoritus epäonnistuu.
+
+Käyttö:
+    python benchmarks/session_load_test.py                       # 1000 istuntoa
+    python benchmarks/session_load_test.py --sessions 200 --questions 10 --think-ms 0
+    python benchmarks/session_load_test.py --url http://localhost:3000 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, exams: str, cpu: int | None) -> subprocess.Popen:
+    preexec = None
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        preexec = lambda: os.sched_setaffinity(0, {cpu})  # noqa: E731
+    process = subprocess.Popen(
+        [sys.executable, str(PROJECT_ROOT / "start_web.py"), "--no-browser", "--host", "127.0.0.1",
+         "--port", str(port), "--exams", exams],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        preexec_fn=preexec,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise SystemExit("Palvelin ei käynnistynyt")
+
+
+class Client:
+    """Kevyt HTTP/1.1-asiakas yhdelle pysyvälle yhteydelle.
+
+    Kaikki opiskelijat ajetaan yhdessä asyncio-säikeessä, jotta
+    kuormageneraattori ei vie palvelimelta prosessoriaikaa tuhannella
+    säikeellä.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.latencies: list[float] = []
+
+    async def request(self, method: str, path: str, body: dict | None = None) -> tuple[int, Any]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(data)}\r\n"
+        if data:
+            head += "Content-Type: application/json\r\n"
+        start = time.perf_counter()
+        self.writer.write(head.encode("ascii") + b"\r\n" + data)
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("yhteys suljettiin")
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        payload = await self.reader.readexactly(length)
+        self.latencies.append(time.perf_counter() - start)
+        return int(status_line.split()[1]), json.loads(payload)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_student(host, port, exam, questions, think, ramp, results, seed):
+    rng = random.Random(seed)
+    client = Client(host, port)
+    ok = False
+    await asyncio.sleep(rng.uniform(0, ramp))
+    try:
+        status, session = await client.request("POST", "/api/sessions", {"exam": exam, "count": questions})
+        if status != 201:
+            raise RuntimeError(session)
+        base = f"/api/sessions/{session['session']}"
+        while True:
+            status, question = await client.request("GET", f"{base}/question")
+            if status != 200:
+                raise RuntimeError(question)
+            if question.get("done"):
+                break
+            if think:
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * think)
+            status, answer = await client.request(
+                "POST", f"{base}/answer", {"index": question["index"], "option": rng.randrange(len(question["options"]))}
+            )
+            if status != 200:
+                raise RuntimeError(answer)
+        status, _ = await client.request("DELETE", base)
+        ok = status == 200
+    except (OSError, asyncio.IncompleteReadError, RuntimeError, ValueError):
+        ok = False
+    finally:
+        client.close()
+    results["latencies"].extend(client.latencies)
+    results["completed" if ok else "failed"] += 1
+
+
+async def run_all(host, port, args) -> tuple[dict, float]:
+    status, listing = await Client(host, port).request("GET", "/api/exams")
+    exams = [e for e in listing if e["questions"] >= args.questions] if status == 200 else []
+    if not exams:
+        raise SystemExit(f"Palvelimella ei ole tenttejä, joissa on vähintään {args.questions} kysymystä")
+    results = {"latencies": [], "completed": 0, "failed": 0}
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_student(host, port, exams[i % len(exams)]["file"], args.questions, args.think_ms / 1000,
+                        args.ramp, results, i)
+            for i in range(args.sessions)
+        )
+    )
+    return results, time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Kuormitustesti /api/-istunnoille")
+    parser.add_argument("--url", help="Olemassa olevan palvelimen osoite (oletus: käynnistä oma)")
+    parser.add_argument("--exams", default=str(PROJECT_ROOT / "WEB" / "tentit"), help="Oman palvelimen tenttikansio")
+    parser.add_argument("--cpu", type=int, default=0, help="Ydin, jolle oma palvelin sidotaan (-1 = ei sidontaa)")
+    parser.add_argument("--sessions", type=int, default=1000, help="Samanaikaiset suoritukset")
+    parser.add_argument("--questions", type=int, default=10, help="Kysymyksiä per suoritus")
+    parser.add_argument("--think-ms", type=float, default=1000, help="Keskimääräinen miettimisaika vastausta ennen")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Aloitukset jaetaan näin monelle sekunnille")
+    parser.add_argument("--target-rps", type=float, default=1000, help="Vaadittu läpäisy (pyyntöä/s)")
+    parser.add_argument("--target-p99-ms", type=float, default=100, help="Vaadittu latenssin p99")
+    parser.add_argument("--json", action="store_true", help="Tulosta tulokset JSONina")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        server = start_server(port, args.exams, None if args.cpu < 0 else args.cpu)
+
+    try:
+        results, elapsed = asyncio.run(run_all(host, port, args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies = sorted(results["latencies"])
+    summary = {
+        "sessions": args.sessions,
+        "completed": results["completed"],
+        "failed": results["failed"],
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+    failures = []
+    if summary["failed"]:
+        failures.append(f"{summary['failed']} suoritusta epäonnistui")
+    if summary["requests_per_second"] < args.target_rps:
+        failures.append(f"läpäisy {summary['requests_per_second']} < {args.target_rps} pyyntöä/s")
+    if summary["p99_ms"] > args.target_p99_ms:
+        failures.append(f"p99 {summary['p99_ms']} ms > {args.target_p99_ms} ms")
+    summary["ok"] = not failures
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"Istuntoja: {summary['sessions']} ({summary['completed']} valmis, {summary['failed']} epäonnistui)")
+        print(f"Pyyntöjä: {summary['requests']} ({summary['seconds']} s), {summary['requests_per_second']} pyyntöä/s")
+        print(f"Latenssi p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms")
+        for failure in failures:
+            print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Käynnistysajan benchmark titetenttaajalle (python -X importtime).
+
+Käynnistää uuden tulkin useita kertoja ja mittaa, kauanko
+`import titetenttaaja` kestää. Tulkin oma käynnistys (`python -c pass`)
+mitataan vertailuksi. Lisäksi tarkistetaan, ettei pelkkä tuonti lataa
+Richiä, ja näytetään hitaimmat tuonnit.
+
+Regressiot jäävät kiinni --budget-ms-rajalla. Skripti palauttaa
+virhekoodin 1, jos tuonnin mediaani ylittää rajan tai jos Rich latautuu
+tuonnissa.
+
+Käyttö:
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --runs 20 --budget-ms 40
+    python benchmarks/startup_time.py --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODULE = "titetenttaaja"
+# Moduulit, joita ei saa tuoda ennen ensimmäistä paneelia
+LAZY_MODULES = ("rich",)
+
+SCENARIOS = {
+    "tuonti": f"import {MODULE}",
+    "tuonti + Rich": f"import {MODULE}; {MODULE}.lataa_rich()",
+}
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """Palauttaa {moduuli: (oma µs, kumulatiivinen µs)} -X importtime -tulosteesta."""
+    result = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # otsikkorivi
+        result[fields[2].strip()] = (self_us, cumulative_us)
+    return result
+
+
+def run_once(code: str, importtime: bool) -> tuple[float, str]:
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", code]
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return time.perf_counter() - started, completed.stderr
+
+
+def measure(code: str, runs: int) -> dict:
+    walls = []
+    imports = []
+    modules: dict[str, tuple[int, int]] = {}
+    for _ in range(runs):
+        wall, _ = run_once(code, importtime=False)
+        walls.append(wall)
+        _, stderr = run_once(code, importtime=True)
+        modules = parse_importtime(stderr)
+        imports.append(modules.get(MODULE, (0, 0))[1])
+    return {
+        "wall_ms": round(statistics.median(walls) * 1000, 2),
+        "import_ms": round(statistics.median(imports) / 1000, 2),
+        "modules": modules,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="titetenttaajan käynnistysajan benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Mittauskertoja per skenaario")
+    parser.add_argument("--top", type=int, default=10, help="Näytettävien hitaimpien tuontien määrä")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Tuonnin mediaanin yläraja")
+    parser.add_argument("--json", action="store_true", help="Tulosta tulokset JSONina")
+    args = parser.parse_args()
+
+    baseline = statistics.median(run_once("pass", importtime=False)[0] for _ in range(args.runs))
+    results = {name: measure(code, args.runs) for name, code in SCENARIOS.items()}
+
+    plain_modules = results["tuonti"]["modules"]
+    eager = sorted(
+        name for name in plain_modules if name.split(".")[0] in LAZY_MODULES
+    )
+    slowest = sorted(plain_modules.items(), key=lambda item: item[1][0], reverse=True)[: args.top]
+    failures = []
+    if eager:
+        failures.append(f"tuonti lataa laiskasti ladattavat moduulit: {', '.join(eager)}")
+    if args.budget_ms is not None and results["tuonti"]["import_ms"] > args.budget_ms:
+        failures.append(f"tuonti {results['tuonti']['import_ms']} ms > raja {args.budget_ms} ms")
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "interpreter_ms": round(baseline * 1000, 2),
+                    "scenarios": {
+                        name: {k: v for k, v in result.items() if k != "modules"}
+                        for name, result in results.items()
+                    },
+                    "slowest_self_us": {name: times[0] for name, times in slowest},
+                    "failures": failures,
+                },
+                indent=2,
+                ensure_ascii=False,
+            )
+        )
+    else:
+        print(f"Tulkin käynnistys (python -c pass): {baseline * 1000:.1f} ms, {args.runs} kierrosta")
+        for name, result in results.items():
+            print(f"{name:<16} tuonti {result['import_ms']:>7.2f} ms   koko prosessi {result['wall_ms']:>7.2f} ms")
+        print(f"\nHitaimmat tuonnit (oma aika, {SCENARIOS['tuonti']}):")
+        for name, (self_us, cumulative_us) in slowest:
+            print(f"  {name:<28} {self_us / 1000:>6.2f} ms  (kumulatiivinen {cumulative_us / 1000:.2f} ms)")
+        for failure in failures:
+            print(f"❌ {failure}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
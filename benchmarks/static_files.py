@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Isojen tiedostojen palvelun CPU-kustannus: sendfile vs. kopiointi Pythonin kautta.
+
+Luo väliaikaiskansioon --size-mb megatavun tiedoston ja käynnistää
+start_web.py:n palvelimen omaan prosessiinsa kerran kummallakin tavalla
+(sendfile ja --no-sendfile). --clients yhtäaikaista asiakasta lataa
+tiedoston --requests kertaa (tai --range-tilassa satunnaisia välejä).
+Palvelinprosessin käyttämä CPU-aika luetaan sen päätyttyä
+(resource.getrusage), joten asiakkaiden oma työ ei sekoitu tulokseen.
+Käynnistyksen CPU-aika vähennetään. Tulostaa MB/s ja palvelimen
+CPU-millisekunnit megatavua kohden.
+
+Käyttö (Unix):
+    python benchmarks/static_files.py
+    python benchmarks/static_files.py --size-mb 256 --requests 20 --clients 8
+    python benchmarks/static_files.py --range                # 206-vastaukset
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+FILE_NAME = "large.bin"
+
+
+def serve(directory: str, use_sendfile: bool, ready) -> None:
+    import start_web
+
+    start_web.MyHTTPRequestHandler.use_sendfile = use_sendfile
+    server = start_web.QuizServer(
+        ("127.0.0.1", 0), partial(start_web.MyHTTPRequestHandler, directory=directory)
+    )
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # Käynnistyksen (tuonnit) CPU-aika vähennetään tuloksesta
+    ready.put((server.server_address[1], usage.ru_utime + usage.ru_stime))
+    server.serve_forever()
+
+
+def download(port: int, requests: int, size: int, use_range: bool, seed: int, received: list) -> None:
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    total = 0
+    for _ in range(requests):
+        headers = {"Accept-Encoding": "identity"}
+        if use_range:
+            start = rng.randrange(size)
+            headers["Range"] = f"bytes={start}-{rng.randrange(start, size)}"
+        conn.request("GET", f"/{FILE_NAME}", headers=headers)
+        response = conn.getresponse()
+        while chunk := response.read(1 << 20):
+            total += len(chunk)
+    conn.close()
+    received.append(total)
+
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(directory: str, size: int, use_sendfile: bool, args) -> dict:
+    ready = multiprocessing.Queue()
+    before = children_cpu()
+    server = multiprocessing.Process(target=serve, args=(directory, use_sendfile, ready))
+    server.start()
+    try:
+        port, startup_cpu = ready.get(timeout=30)
+        received: list[int] = []
+        clients = [
+            threading.Thread(target=download, args=(port, args.requests, size, args.range, n, received))
+            for n in range(args.clients)
+        ]
+        started = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.join()
+    cpu = children_cpu() - before - startup_cpu
+    megabytes = sum(received) / 1e6
+    return {
+        "mode": "sendfile" if use_sendfile else "copy",
+        "megabytes": round(megabytes, 1),
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(megabytes / elapsed, 1) if elapsed else 0.0,
+        "server_cpu_ms": round(cpu * 1000, 1),
+        "cpu_ms_per_mb": round(cpu * 1000 / megabytes, 3) if megabytes else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="sendfile vs. kopiointi: palvelimen CPU-aika tavua kohden")
+    parser.add_argument("--size-mb", type=int, default=64, help="Tiedoston koko megatavuina")
+    parser.add_argument("--requests", type=int, default=10, help="Latauksia per asiakas")
+    parser.add_argument("--clients", type=int, default=4, help="Yhtäaikaiset asiakkaat")
+    parser.add_argument("--range", action="store_true", help="Pyydä satunnaisia tavuvälejä (206)")
+    parser.add_argument("--json", action="store_true", help="Tulosta tulokset JSONina")
+    args = parser.parse_args()
+
+    import start_web
+
+    modes = [True, False] if start_web.SENDFILE else [False]
+    with tempfile.TemporaryDirectory() as directory:
+        size = args.size_mb * 1_000_000
+        with open(os.path.join(directory, FILE_NAME), "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1_000_000))
+        results = [run(directory, size, mode, args) for mode in modes]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'Tapa':<10}{'MB':>10}{'MB/s':>10}{'CPU ms':>10}{'CPU ms/MB':>12}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['megabytes']:>10}{r['mb_per_second']:>10}{r['server_cpu_ms']:>10}{r['cpu_ms_per_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
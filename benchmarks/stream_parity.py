@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Virtalukijan (tenttipankki.KysymysVirta) vertailu json.loadiin.
+
+Kirjoittaa väliaikaiskansioon tenttitiedostoja, joissa on liukulukuja,
+eksponentteja, negatiivisia lukuja, BOM ja monitavuisia merkkejä, ja
+lukee ne pienillä palakoilla (--max-chunk), jolloin jokainen luku osuu
+jossain ajossa palan rajalle. Kysymysten ja otsikon täytyy olla samat kuin
+koko tiedoston json.loadilla. Poikkeamat tulostetaan ja paluukoodi on 1.
+
+Käyttö:
+    python benchmarks/stream_parity.py
+    python benchmarks/stream_parity.py --max-chunk 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tenttipankki import PALAN_KOKO, UTF8_BOM, KysymysVirta, etsi_otsikko  # noqa: E402
+
+QUESTION = {"question": "Jännite?", "options": ["1.5 V", "3 V"], "correct": "3 V", "weight": 2.5}
+CASES = {
+    "float_list": b"[2.5]",
+    "float_value": b'{"b": 2.5}',
+    "exponents": b'{"v": -1.25e-3, "w": 6E+2, "questions": [' + json.dumps(QUESTION).encode() + b"]}",
+    "nested_floats": json.dumps(
+        {"TITLE": "Liukuluvut", "questions": [{**QUESTION, "score": [0.5, -12.75, 1e10]}] * 3}
+    ).encode(),
+    "bom_float": UTF8_BOM + b'[{"question": "\xc3\xa4", "options": [1.5, 2], "correct": 1.5}]',
+}
+# Luku katkeaa oletuspalan rajalle: BOM-tunnustelun (3 tavua) ja ensimmäisen palan jälkeen puskuri päättyy "12."
+_PREFIX, _SUFFIX = b'{"title": "', b'", "version": '
+BOUNDARY = (
+    _PREFIX
+    + b"x" * (len(UTF8_BOM) + PALAN_KOKO - len(_PREFIX) - len(_SUFFIX) - len(b"12."))
+    + _SUFFIX
+    + b'12.75, "questions": ['
+    + json.dumps(QUESTION).encode()
+    + b"]}"
+)
+
+
+def expected(data: bytes) -> tuple[list, object]:
+    parsed = json.loads(data.decode("utf-8-sig"))
+    if isinstance(parsed, list):
+        questions = parsed
+    elif isinstance(parsed, dict) and isinstance(parsed.get("questions"), list):
+        questions = parsed["questions"]
+    else:
+        questions = []
+    return questions, etsi_otsikko(parsed)
+
+
+def check(path: Path, data: bytes, chunk: int) -> str | None:
+    stream = KysymysVirta(str(path), palan_koko=chunk, siirtymat=False)
+    try:
+        questions = list(stream)
+    except (ValueError, OSError) as exc:
+        return f"{type(exc).__name__}: {exc}"
+    want, title = expected(data)
+    if questions != want:
+        return "kysymykset eroavat"
+    if stream.otsikko != title:
+        return f"otsikko {stream.otsikko!r} != {title!r}"
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Vertaa KysymysVirtaa json.loadiin pienillä palakoilla")
+    parser.add_argument("--max-chunk", type=int, default=16, help="Suurin kokeiltava palakoko")
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [(name, data, range(1, args.max_chunk + 1)) for name, data in CASES.items()]
+        runs.append(("boundary", BOUNDARY, [PALAN_KOKO]))
+        for name, data, chunks in runs:
+            path = Path(directory) / f"{name}.json"
+            path.write_bytes(data)
+            for chunk in chunks:
+                error = check(path, data, chunk)
+                if error:
+                    failures += 1
+                    print(f"{name} (pala {chunk}): {error}")
+    print("✅ Virtalukija vastaa json.loadia" if not failures else f"❌ {failures} poikkeamaa")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Benchmark-kokoelma kysymyspankkien lukemiselle ja synkronoinnille.
+
+Luo synteettiset pankit (synthetic_bank.py) kaikille --sizes-koille
+molemmissa muodoissa (lista ja {"TITLE", "questions"}) ja mittaa oikeita
+sisäänkäyntejä:
+
+- titetenttaaja: hae_tentit, lue_kysymykset, hae_tenttiotsikko ja
+  suorita_tentti validoinnista arvontaan (input() korvataan: ensimmäinen
+  kysely vastaa kysymysten määrän, toinen keskeyttää tentin)
+- tenttipankki: TenttiIndeksi.paivita tyhjällä ja valmiilla indeksillä
+- update_tentit: gather_entries ja copy_to_web (täysi kopio ja
+  muuttumaton inkrementaalinen ajo)
+- near_duplicates: MinHash-allekirjoitukset ja LSH-ryhmittely ilman
+  välimuistia
+
+Jokainen tapaus ajetaan --repeat kertaa; tuloksiin tallennetaan paras ja
+mediaani. --output tallentaa tulokset JSONina, ja --compare vertaa niitä
+aiempaan tiedostoon: hidastuminen yli --threshold prosenttia (ja yli
+--min-ms millisekuntia) on regressio, jolloin skripti palauttaa koodin 1.
+Jos ajojen hajonta (mediaani vs. paras) on rajaa suurempi, raja nousee
+hajonnan verran; kohinaisella koneella kannattaa kasvattaa --repeatia.
+
+Käyttö:
+    python benchmarks/suite.py --output base.json
+    python benchmarks/suite.py --compare base.json
+    python benchmarks/suite.py --sizes 10,1000,100000,1000000 --repeat 1 --workdir /tmp/pankit
+    python benchmarks/suite.py --compare base.json new.json     # vertaa kahta tiedostoa ajamatta
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "tentit"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import near_duplicates  # noqa: E402
+import titetenttaaja  # noqa: E402
+import update_tentit  # noqa: E402
+from synthetic_bank import SHAPES, write_bank  # noqa: E402
+from tenttipankki import KysymysVirta, TenttiIndeksi  # noqa: E402
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = "10,1000,100000"
+QUIZ_QUESTIONS = 20
+
+
+class StopQuiz(Exception):
+    """Keskeyttää suorita_tentin ensimmäisen kysymyksen kohdalla."""
+
+
+def measure(func: Callable[[], object], repeat: int, setup: Callable[[], object] | None = None) -> dict:
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        # Kuten timeit: roskienkeruun kesto riippuisi edellisten tapausten jättämästä keosta
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return {
+        "best_ms": round(min(times) * 1000, 3),
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "runs": repeat,
+    }
+
+
+def run_quiz_until_first_question(questions) -> None:
+    """Ajaa suorita_tentin validoinnin ja arvonnan; input() vastaa määrän ja keskeyttää sitten."""
+    answers = iter([str(QUIZ_QUESTIONS)])
+
+    def stub_input(prompt=""):
+        for answer in answers:
+            return answer
+        raise StopQuiz
+
+    titetenttaaja.input = stub_input
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            titetenttaaja.suorita_tentti(questions)
+    except StopQuiz:
+        pass
+    finally:
+        del titetenttaaja.input
+
+
+def prepare_banks(workdir: Path, sizes: list[int], shapes: list[str], seed: int) -> dict[tuple[int, str], Path]:
+    """Luo puuttuvat pankit: jokainen omaan kansioonsa ja kovana linkkinä yhteiseen all/-kansioon."""
+    banks = {}
+    everything = workdir / "all"
+    everything.mkdir(parents=True, exist_ok=True)
+    for size in sizes:
+        for shape in shapes:
+            name = f"bank-{size}-{shape}-s{seed}.json"
+            path = workdir / "banks" / f"{size}-{shape}" / name
+            if not path.exists():
+                print(f"Luodaan {name} ...", file=sys.stderr)
+                write_bank(path, size, shape, seed)
+            link = everything / name
+            if not link.exists():
+                try:
+                    os.link(path, link)
+                except OSError:
+                    shutil.copyfile(path, link)
+            banks[size, shape] = path
+    return banks
+
+
+def run_cases(workdir: Path, banks: dict[tuple[int, str], Path], repeat: int, selected: list[str]) -> dict:
+    results = {}
+
+    def case(name: str, func: Callable[[], object], setup: Callable[[], object] | None = None) -> None:
+        if selected and not any(part in name for part in selected):
+            return
+        results[name] = measure(func, repeat, setup)
+        print(f"  {name:<44} {results[name]['best_ms']:>12.3f} ms", file=sys.stderr)
+
+    titetenttaaja.TENTTIKANSIO = str(workdir / "all")
+    case("hae_tentit", titetenttaaja.hae_tentit)
+
+    for (size, shape), path in sorted(banks.items()):
+        suffix = f"{shape}/{size}"
+        bank_dir = path.parent
+        titetenttaaja.TENTTIKANSIO = str(bank_dir)
+        case(f"lue_kysymykset/{suffix}", lambda: titetenttaaja.lue_kysymykset(path.name))
+        case(f"hae_tenttiotsikko/{suffix}", lambda: titetenttaaja.hae_tenttiotsikko(path.name))
+        case(
+            f"suorita_tentti/{suffix}",
+            lambda: run_quiz_until_first_question(KysymysVirta(str(path), siirtymat=False)),
+        )
+
+        index_path = workdir / f"index-{size}-{shape}.sqlite"
+
+        def refresh_index():
+            index = TenttiIndeksi(str(bank_dir), str(index_path))
+            try:
+                index.paivita()
+            finally:
+                index.sulje()
+
+        case(f"indeksi_kylma/{suffix}", refresh_index, setup=lambda: index_path.unlink(missing_ok=True))
+        refresh_index()
+        case(f"indeksi_lammin/{suffix}", refresh_index)
+
+        case(f"gather_entries/{suffix}", lambda: update_tentit.gather_entries([path]))
+        case(
+            f"near_duplicates/{suffix}",
+            lambda: near_duplicates.find_groups([near_duplicates.sign_bank(str(path))], 0.7),
+        )
+
+        target = workdir / "web" / f"{size}-{shape}"
+
+        def copy_full():
+            with contextlib.redirect_stdout(io.StringIO()):
+                update_tentit.copy_to_web(bank_dir, target, None, "copy")
+
+        case(f"copy_to_web_taysi/{suffix}", copy_full, setup=lambda: shutil.rmtree(target, ignore_errors=True))
+        state = update_tentit.SyncState(path=None)
+
+        def copy_incremental():
+            with contextlib.redirect_stdout(io.StringIO()):
+                update_tentit.copy_to_web(bank_dir, target, state, "copy")
+
+        copy_incremental()
+        case(f"copy_to_web_muuttumaton/{suffix}", copy_incremental)
+    return results
+
+
+def spread(result: dict) -> float:
+    """Ajojen hajonta prosentteina: mediaanin ero parhaaseen."""
+    return (result["median_ms"] - result["best_ms"]) / result["best_ms"] * 100 if result["best_ms"] else 0.0
+
+
+def compare(old: dict, new: dict, threshold: float, min_ms: float) -> tuple[list[tuple], list[str]]:
+    """Vertaa parhaita aikoja. Palauttaa (rivit, regressiot).
+
+    Muutoksen pitää ylittää sekä threshold että kummankin mittauksen oma
+    hajonta, jotta kohinainen kone ei tuota vääriä hälytyksiä.
+    """
+    rows = []
+    regressions = []
+    for name in sorted(old["results"].keys() & new["results"].keys()):
+        before = old["results"][name]["best_ms"]
+        after = new["results"][name]["best_ms"]
+        change = (after - before) / before * 100 if before else 0.0
+        limit = max(threshold, spread(old["results"][name]), spread(new["results"][name]))
+        status = ""
+        if change > limit and after - before > min_ms:
+            status = "REGRESSIO"
+            regressions.append(name)
+        elif change < -limit and before - after > min_ms:
+            status = "nopeampi"
+        rows.append((name, before, after, change, status))
+    return rows, regressions
+
+
+def print_comparison(rows: list[tuple], old: dict, new: dict) -> None:
+    print(f"Vertailu: {old.get('created', '?')} → {new.get('created', '?')}")
+    print(f"{'Tapaus':<44}{'ennen ms':>12}{'nyt ms':>12}{'muutos':>9}")
+    for name, before, after, change, status in rows:
+        print(f"{name:<44}{before:>12.3f}{after:>12.3f}{change:>+8.1f}%  {status}")
+    added = sorted(new["results"].keys() - old["results"].keys())
+    if added:
+        print(f"Uudet tapaukset (ei vertailukohtaa): {', '.join(added)}")
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != RESULTS_VERSION:
+        raise SystemExit(f"{path}: tuntematon tulostiedoston versio {data.get('version')}")
+    return data
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Kysymyspankkien benchmark-kokoelma")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Pankkien koot pilkuin eroteltuna (10 - 1000000)")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help="Pankkien muodot: list, titled")
+    parser.add_argument("--repeat", type=int, default=5, help="Ajokertoja per tapaus")
+    parser.add_argument("--cases", default="", help="Aja vain tapaukset, joiden nimessä on jokin näistä (pilkuin)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workdir", help="Kansio pankeille; säilyy ajojen välillä (oletus: väliaikainen)")
+    parser.add_argument("--output", help="Tallenna tulokset JSON-tiedostoon")
+    parser.add_argument(
+        "--compare", nargs="+", metavar="TULOS", help="Vertaa aiempaan tulokseen (tai kahta tulosta keskenään)"
+    )
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regressioraja prosentteina")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="Pienempiä muutoksia ei lasketa regressioiksi")
+    parser.add_argument("--json", action="store_true", help="Tulosta tulokset JSONina")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        old, new = load_results(args.compare[0]), load_results(args.compare[1])
+    else:
+        old = load_results(args.compare[0]) if args.compare else None
+        sizes = [int(s) for s in args.sizes.split(",") if s]
+        shapes = [s for s in args.shapes.split(",") if s]
+        with contextlib.ExitStack() as stack:
+            workdir = Path(args.workdir or stack.enter_context(tempfile.TemporaryDirectory()))
+            banks = prepare_banks(workdir, sizes, shapes, args.seed)
+            selected = [c for c in args.cases.split(",") if c]
+            new = {
+                "version": RESULTS_VERSION,
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "sizes": sizes,
+                "shapes": shapes,
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "results": run_cases(workdir, banks, args.repeat, selected),
+            }
+        if args.output:
+            Path(args.output).write_text(json.dumps(new, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        if args.json:
+            print(json.dumps(new, indent=2, ensure_ascii=False))
+
+    if old is None:
+        return 0
+    rows, regressions = compare(old, new, args.threshold, args.min_ms)
+    print_comparison(rows, old, new)
+    for name in regressions:
+        print(f"❌ {name} hidastui yli {args.threshold:g} %")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Synteettisten kysymyspankkien generaattori benchmarkeille.
+
+Kirjoittaa tenttitiedoston, jossa on haluttu määrä kysymyksiä, jommassakummassa
+repossa käytetyssä muodossa:
+
+- list:   [{"question": ..., "options": [...], "correct": ...}, ...]
+- titled: {"TITLE": ..., "questions": [...]}
+
+Kysymykset kirjoitetaan yksi kerrallaan, joten miljoonankin kysymyksen
+pankki ei vie muistia. Sama siemen tuottaa tavulleen saman tiedoston.
+Osa kysymyksistä (--invalid) on tahallaan virheellisiä (oikea vastaus
+puuttuu vaihtoehdoista), jotta validointikin tulee mitatuksi.
+
+Käyttö:
+    python benchmarks/synthetic_bank.py 100000 -o /tmp/pankki.json
+    python benchmarks/synthetic_bank.py 1000000 --shape list -o /tmp/iso.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+SHAPES = ("list", "titled")
+WORDS = (
+    "jännite virta vastus teho energia liike voima massa kiihtyvyys nopeus aalto taajuus "
+    "funktio muuttuja silmukka lista sanakirja luokka olio periaate rajapinta testi versio "
+    "protokolla verkko paketti reititin palvelin asiakas muisti prosessori välimuisti levy "
+    "vaatimus suunnittelu arkkitehtuuri moduuli riippuvuus kytkentä koheesio malli kaavio"
+).split()
+
+
+def make_question(rng: random.Random, number: int, invalid_ratio: float) -> dict:
+    text = " ".join(rng.choices(WORDS, k=rng.randint(6, 16))).capitalize()
+    options = [
+        f"{' '.join(rng.choices(WORDS, k=rng.randint(1, 5)))} ({number}.{i})"
+        for i in range(rng.choice((2, 3, 4, 4, 4, 5)))
+    ]
+    correct = f"ei mikään ({number})" if rng.random() < invalid_ratio else rng.choice(options)
+    return {"question": f"{text} #{number}?", "options": options, "correct": correct}
+
+
+def write_bank(
+    path: Path,
+    count: int,
+    shape: str = "titled",
+    seed: int = 1,
+    invalid_ratio: float = 0.01,
+    title: str | None = None,
+) -> Path:
+    """Kirjoittaa count kysymyksen pankin tiedostoon path ja palauttaa polun."""
+    if shape not in SHAPES:
+        raise ValueError(f"tuntematon muoto: {shape}")
+    rng = random.Random(f"{seed}:{count}:{shape}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if shape == "titled":
+            f.write(json.dumps({"TITLE": title or f"Synteettinen pankki ({count})"}, ensure_ascii=False)[:-1])
+            f.write(', "questions": [\n')
+        else:
+            f.write("[\n")
+        for number in range(count):
+            if number:
+                f.write(",\n")
+            f.write(json.dumps(make_question(rng, number, invalid_ratio), ensure_ascii=False))
+        f.write("\n]}\n" if shape == "titled" else "\n]\n")
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Luo synteettisen kysymyspankin")
+    parser.add_argument("count", type=int, help="Kysymysten määrä (esim. 10 - 1000000)")
+    parser.add_argument("-o", "--output", default="synthetic.json", help="Kohdetiedosto")
+    parser.add_argument("--shape", choices=SHAPES, default="titled", help="Lista vai {TITLE, questions}")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--invalid", type=float, default=0.01, help="Virheellisten kysymysten osuus")
+    args = parser.parse_args()
+    path = write_bank(Path(args.output), args.count, args.shape, args.seed, args.invalid)
+    print(f"{path}: {args.count} kysymystä, {path.stat().st_size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
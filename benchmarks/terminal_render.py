@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Mikrobenchmark titetenttaajan kysymysnäkymän piirtämiselle.
+
+Vertaa kysymystä kohden kuluvaa aikaa ja päätteelle kirjoitettuja tavuja:
+
+- vanha: os.system("clear") jokaiselle kysymykselle, paneelit ja taulukko
+  luodaan alusta ja edistymispalkki tulostetaan kahdesti.
+- uusi: tenttinaytto.Naytto + TenttiNakyma, eli vaihtoehtoinen näyttö,
+  uudelleenkäytetyt renderöitävät ja vain muuttuneiden rivien päivitys.
+
+Tuloste ohjataan muistiin, joten mitattava aika on renderöinti ja clear-
+prosessin käynnistys, ei päätteen piirto. Tavumäärä kertoo, paljonko
+SSH-yhteyden yli siirtyisi.
+
+Käyttö:
+    python benchmarks/terminal_render.py
+    python benchmarks/terminal_render.py --questions 500 --width 120 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from tenttinaytto import Naytto, TenttiNakyma  # noqa: E402
+from titetenttaaja import render_progress  # noqa: E402
+
+try:
+    from rich.align import Align
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich.table import Table
+    from rich.text import Text
+except ImportError:
+    Console = None
+
+
+def synteettiset_kysymykset(maara):
+    return [
+        {
+            "question": f"Kysymys numero {i}: mikä seuraavista väittämistä pitää paikkansa? " * 2,
+            "options": [f"Vaihtoehto {j} kysymykselle {i}" for j in range(4)],
+        }
+        for i in range(maara)
+    ]
+
+
+def clear_aliprosessi():
+    # Sama kuin vanha clear_screen(), mutta tuloste ei päädy benchmarkin päätteelle
+    subprocess.run("cls" if os.name == "nt" else "clear", shell=True, stdout=subprocess.DEVNULL)
+
+
+def vanha_kysymys(console, otsikko, index, total, q, score):
+    """Vanhan suorita_tentti-silmukan yhden kysymyksen piirto."""
+    clear_aliprosessi()
+    width = max(40, console.width - 4)
+    console.rule(
+        Text.assemble((otsikko, "bold cyan"), ("    "), (f"Kysymys {index}/{total}", "bold yellow"))
+    )
+    console.print(
+        Panel(Text(q["question"]), title=Text("Kysymys", style="bold yellow"), border_style="cyan",
+              padding=(1, 2), width=width)
+    )
+    table = Table(box=None, show_header=False, padding=(0, 1))
+    table.add_column(" ", justify="right", style="bold")
+    table.add_column("Vaihtoehto", overflow="fold")
+    for opt_index, option in enumerate(q["options"], 1):
+        table.add_row(str(opt_index), option)
+    console.print(Panel(table, title=Text("Vaihtoehdot", style="bold magenta"), border_style="magenta",
+                        padding=(0, 2), width=width))
+    for answered in (index - 1, index):
+        console.print()
+        text = Text.from_markup(render_progress(answered, total, score))
+        text.justify = "center"
+        console.print(Align.left(text, width=width))
+        if answered == index - 1:
+            console.print(Text(f"Valitse vaihtoehto (1-{len(q['options'])}): ", style="bold magenta"))
+            console.print("[green]Oikein![/]")
+
+
+def mittaa(nimi, kysymykset, kierros):
+    ajat = []
+    for index, q in enumerate(kysymykset, 1):
+        alku = time.perf_counter()
+        kierros(index, q)
+        ajat.append(time.perf_counter() - alku)
+    ajat.sort()
+    return {
+        "name": nimi,
+        "questions": len(ajat),
+        "mean_ms": round(sum(ajat) / len(ajat) * 1000, 3),
+        "p50_ms": round(ajat[len(ajat) // 2] * 1000, 3),
+        "p95_ms": round(ajat[min(len(ajat) - 1, int(len(ajat) * 0.95))] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kysymysnäkymän piirron mikrobenchmark")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--height", type=int, default=40)
+    parser.add_argument("--json", action="store_true", help="Tulosta tulokset JSONina")
+    args = parser.parse_args()
+
+    kysymykset = synteettiset_kysymykset(args.questions)
+    otsikko = "TiTentti : Benchmark"
+    total = len(kysymykset)
+    tulokset = []
+
+    def konsoli(out):
+        return Console(file=out, force_terminal=True, width=args.width, color_system="truecolor")
+
+    if Console is not None:
+        vanha_out = io.StringIO()
+        vanha_konsoli = konsoli(vanha_out)
+        tulos = mittaa(
+            "vanha (clear + uudet paneelit)",
+            kysymykset,
+            lambda index, q: vanha_kysymys(vanha_konsoli, otsikko, index, total, q, index - 1),
+        )
+        tulos["bytes_per_question"] = len(vanha_out.getvalue()) // total
+        tulokset.append(tulos)
+
+    for nimi, rich in (("uusi (Rich, vain muuttuneet rivit)", True), ("uusi (teksti)", False)):
+        if rich and Console is None:
+            continue
+        out = io.StringIO()
+        nakyma = TenttiNakyma(otsikko, total, konsoli(io.StringIO()) if rich else None)
+        naytto = Naytto(out=out, interaktiivinen=True, korkeus=args.height)
+        naytto.avaa()
+
+        def kierros(index, q):
+            # Yksi kehys per kysymys; edellisen vastauksen tulos on sen viestirivillä
+            viesti = [("Edellinen: ", None), ("Oikein!", "green")] if index > 1 else None
+            naytto.piirra(
+                nakyma.kehys(index, q["question"], q["options"], render_progress(index - 1, total, index - 1), viesti)
+            )
+
+        tulos = mittaa(nimi, kysymykset, kierros)
+        naytto.sulje()
+        tulos["bytes_per_question"] = naytto.kirjoitettu // total
+        tulokset.append(tulos)
+
+    if args.json:
+        print(json.dumps(tulokset, indent=2, ensure_ascii=False))
+        return
+    print(f"{total} kysymystä, pääte {args.width}x{args.height}")
+    for tulos in tulokset:
+        print(
+            f"{tulos['name']:<36} keskiarvo {tulos['mean_ms']:>8.3f} ms  p50 {tulos['p50_ms']:>8.3f} ms  "
+            f"p95 {tulos['p95_ms']:>8.3f} ms  {tulos['bytes_per_question']:>6} B/kysymys"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Kuormitustesti start_web.py:n palvelimelle.
+
+Simuloi luokallista opiskelijoita, jotka avaavat tentin yhtä aikaa: jokainen
+virtuaalikäyttäjä hakee sovelluksen, manifest.jsonin, tenttien JSONit ja
+kuvat pysyvällä HTTP/1.1-yhteydellä. Lopuksi tulostetaan pyynnöt/s sekä
+latenssin p50/p95/p99.
+
+Käyttö:
+    python benchmarks/web_load_test.py                      # käynnistää palvelimen itse
+    python benchmarks/web_load_test.py --url http://localhost:3000 --users 60
+    python benchmarks/web_load_test.py --single-threaded    # vertailu vanhaan HTTPServeriin
+    python benchmarks/web_load_test.py --revalidate         # lähetä If-None-Match (304-polku)
+    python benchmarks/web_load_test.py --no-metrics         # mittarien kustannus: vertaa ilman /metrics-kirjausta
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def default_paths() -> list[str]:
+    """Kokoaa sivun latauksessa haettavat polut WEB-kansion sisällöstä."""
+    web = PROJECT_ROOT / "WEB"
+    paths = ["/WEB/index.html", "/WEB/app.js", "/WEB/styles.css", "/WEB/tentit/manifest.json"]
+    manifest = web / "tentit" / "manifest.json"
+    if manifest.exists():
+        for entry in json.loads(manifest.read_text(encoding="utf-8")):
+            paths.append(quote(f"/WEB/tentit/{entry['file']}"))
+    for image in sorted((web / "tentit" / "images").rglob("*.png")):
+        paths.append(quote("/" + image.relative_to(PROJECT_ROOT).as_posix()))
+    return paths
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_user(host, port, paths, rounds, accept_encoding, revalidate, results, lock):
+    latencies = []
+    statuses: dict[int, int] = {}
+    received = 0
+    etags: dict[str, str] = {}
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    for _ in range(rounds):
+        for path in paths:
+            headers = {"Accept-Encoding": accept_encoding}
+            if revalidate and path in etags:
+                headers["If-None-Match"] = etags[path]
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                statuses[-1] = statuses.get(-1, 0) + 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            received += len(body)
+            etag = response.getheader("ETag")
+            if etag:
+                etags[path] = etag
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.close()
+    with lock:
+        results["latencies"].extend(latencies)
+        results["bytes"] += received
+        for status, count in statuses.items():
+            results["statuses"][status] = results["statuses"].get(status, 0) + count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Kuormitustesti start_web.py:lle")
+    parser.add_argument("--url", help="Olemassa olevan palvelimen osoite (oletus: käynnistä oma)")
+    parser.add_argument("--users", type=int, default=60, help="Samanaikaiset käyttäjät")
+    parser.add_argument("--rounds", type=int, default=3, help="Sivulatauksia per käyttäjä")
+    parser.add_argument("--single-threaded", action="store_true", help="Testaa yksisäikeistä palvelinta")
+    parser.add_argument("--revalidate", action="store_true", help="Lähetä If-None-Match toistoissa")
+    parser.add_argument("--encoding", default="br, gzip", help="Accept-Encoding-otsake")
+    parser.add_argument("--no-metrics", action="store_true", help="Oma palvelin ilman pyyntömittareita (vertailua varten)")
+    parser.add_argument("--json", action="store_true", help="Tulosta tulokset JSONina")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        import start_web
+
+        start_web.MyHTTPRequestHandler.compressed_cache.warm(start_web.WEB_ROOT)
+        metrics = None if args.no_metrics else start_web.RequestMetrics()
+        server = start_web.create_server("127.0.0.1", 0, threaded=not args.single_threaded, metrics=metrics)
+        host, port = server.server_address[:2]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    paths = default_paths()
+    results = {"latencies": [], "bytes": 0, "statuses": {}}
+    lock = threading.Lock()
+    users = [
+        threading.Thread(
+            target=run_user,
+            args=(host, port, paths, args.rounds, args.encoding, args.revalidate, results, lock),
+        )
+        for _ in range(args.users)
+    ]
+
+    started = time.perf_counter()
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.perf_counter() - started
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+    latencies = sorted(results["latencies"])
+    summary = {
+        "users": args.users,
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mb_per_second": round(results["bytes"] / elapsed / 1e6, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "statuses": {str(k): v for k, v in sorted(results["statuses"].items())},
+    }
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"Käyttäjiä: {summary['users']}, pyyntöjä: {summary['requests']} ({summary['seconds']} s)")
+    print(f"Pyyntöjä/s: {summary['requests_per_second']}  ({summary['mb_per_second']} MB/s)")
+    print(f"Latenssi p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms")
+    print(f"Tilakoodit: {summary['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Kysymysten kokotekstihaku kaikista tenteistä.
+
+update_tentit.py rakentaa käänteisen indeksin (kirjoita_hakuindeksi)
+kansioon TENTIT/search/, josta se kopioidaan myös WEB/tentit/search/.
+Indeksi on pilkottu osiin, jotta sekä komentorivi että selain lataavat vain
+tarvitsemansa:
+
+- index.json: tentit, osien tiedostonimet ja asetukset
+- terms-<merkki>.<hash>.json: sanat, jotka alkavat merkillä, ja niiden
+  dokumenttilistat {sana: [dokumentti, ...]}
+- docs-<n>.<hash>.json: DOKUMENTTEJA_OSASSA dokumenttia muodossa
+  [tentin indeksi, kysymyksen järjestysnumero, kysymysteksti]
+
+Dokumentti on yksi kelvollinen kysymys (normalisoi_kysymys); järjestysnumero
+lasketaan kelvollisista kysymyksistä, joten se on sama kuin
+TenttiIndeksin siirtymissä. Sanat ovat kysymyksen ja vaihtoehtojen sanoja
+normalisoituna: diakriitit poistetaan kuten slugifyssa (ä -> a), kirjainkoko
+yhdistetään casefoldilla ja yhden merkin sanat ohitetaan. Haku on
+etuliitehaku: jokaisen hakusanan pitää olla jonkin kysymyksen sanan alku.
+WEB/app.js normalisoi hakusanat samalla tavalla.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from tenttipankki import normalisoi_kysymys
+
+HAKUKANSIO = "search"
+HAKUINDEKSI = "index.json"
+HAKUINDEKSIN_VERSIO = 1
+DOKUMENTTEJA_OSASSA = 500
+LYHIN_SANA = 2
+TIIVISTEEN_PITUUS = 12
+
+_SANA = re.compile(r"[^\W_]+")
+_OSAN_AVAIN = re.compile(r"[a-z0-9]")
+
+
+def normalisoi(teksti: str) -> str:
+    """Poistaa diakriitit ja yhdistää kirjainkoon: "Ohmin LÄKI" -> "ohmin laki"."""
+    hajotettu = unicodedata.normalize("NFKD", teksti)
+    return "".join(m for m in hajotettu if not unicodedata.combining(m)).casefold()
+
+
+def sanat(teksti: str) -> List[str]:
+    return [s for s in _SANA.findall(normalisoi(teksti)) if len(s) >= LYHIN_SANA]
+
+
+def osan_avain(sana: str) -> str:
+    """Sanan osa: ensimmäinen merkki, tai "_" muille kuin a-z ja 0-9."""
+    return sana[0] if _OSAN_AVAIN.match(sana) else "_"
+
+
+def kysymyslista(data: Any) -> list:
+    """Tenttitiedoston kysymykset: pelkkä lista tai {"questions": [...]}."""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and isinstance(data.get("questions"), list):
+        return data["questions"]
+    return []
+
+
+def hakudokumentit(data: Any) -> List[Tuple[str, List[str]]]:
+    """Palauttaa tentin kelvollisista kysymyksistä (kysymysteksti, sanat) järjestyksessä."""
+    dokumentit = []
+    for q in kysymyslista(data):
+        normalisoitu = normalisoi_kysymys(q)
+        if normalisoitu is None:
+            continue
+        teksti = normalisoitu.kysymys
+        loydetyt = set(sanat(teksti))
+        for vaihtoehto in normalisoitu.vaihtoehdot:
+            loydetyt.update(sanat(vaihtoehto))
+        dokumentit.append((teksti, sorted(loydetyt)))
+    return dokumentit
+
+
+def _kirjoita_osa(kansio: str, etuliite: str, sisalto: Any, sailyta: set) -> Tuple[str, bool]:
+    """Kirjoittaa osan tiivisteellä nimettynä; muuttumatonta osaa ei kirjoiteta uudelleen."""
+    teksti = json.dumps(sisalto, ensure_ascii=False, separators=(",", ":"))
+    tiiviste = hashlib.sha256(teksti.encode("utf-8")).hexdigest()[:TIIVISTEEN_PITUUS]
+    nimi = f"{etuliite}.{tiiviste}.json"
+    sailyta.add(nimi)
+    polku = os.path.join(kansio, nimi)
+    if os.path.exists(polku):
+        return nimi, False
+    with open(polku + ".tmp", "w", encoding="utf-8") as f:
+        f.write(teksti)
+    os.replace(polku + ".tmp", polku)
+    return nimi, True
+
+
+def kirjoita_hakuindeksi(
+    kansio: str,
+    tentit: Iterable[Tuple[str, str, Optional[str], Sequence[Tuple[str, List[str]]]]],
+) -> Tuple[Dict[str, Any], int, int]:
+    """Kirjoittaa indeksin tenteistä (tiedosto, otsikko, tiiviste, hakudokumentit).
+
+    Palauttaa (index.json-sisältö, kirjoitetut osat, poistetut osat).
+    """
+    os.makedirs(kansio, exist_ok=True)
+    tenttilista = []
+    dokumentit: List[list] = []
+    osat: Dict[str, Dict[str, List[int]]] = {}
+    for tiedosto, otsikko, tiiviste, tentin_dokumentit in tentit:
+        tentti = len(tenttilista)
+        tenttilista.append({"file": tiedosto, "title": otsikko, "hash": tiiviste})
+        for kohta, (teksti, tentin_sanat) in enumerate(tentin_dokumentit):
+            dokumentti = len(dokumentit)
+            dokumentit.append([tentti, kohta, teksti])
+            for sana in tentin_sanat:
+                osat.setdefault(osan_avain(sana), {}).setdefault(sana, []).append(dokumentti)
+
+    sailyta: set = set()
+    kirjoitettu = 0
+    termit = {}
+    for avain in sorted(osat):
+        sisalto = dict(sorted(osat[avain].items()))
+        termit[avain], uusi = _kirjoita_osa(kansio, f"terms-{avain}", sisalto, sailyta)
+        kirjoitettu += uusi
+    dokumenttiosat = []
+    for alku in range(0, len(dokumentit), DOKUMENTTEJA_OSASSA):
+        nimi, uusi = _kirjoita_osa(
+            kansio, f"docs-{alku // DOKUMENTTEJA_OSASSA}", dokumentit[alku:alku + DOKUMENTTEJA_OSASSA], sailyta
+        )
+        dokumenttiosat.append(nimi)
+        kirjoitettu += uusi
+
+    indeksi = {
+        "version": HAKUINDEKSIN_VERSIO,
+        "min_token": LYHIN_SANA,
+        "docs_per_shard": DOKUMENTTEJA_OSASSA,
+        "count": len(dokumentit),
+        "exams": tenttilista,
+        "terms": termit,
+        "docs": dokumenttiosat,
+    }
+    teksti = json.dumps(indeksi, ensure_ascii=False, indent=1)
+    polku = os.path.join(kansio, HAKUINDEKSI)
+    try:
+        with open(polku, encoding="utf-8") as f:
+            vanha = f.read()
+    except OSError:
+        vanha = None
+    if vanha != teksti:
+        with open(polku + ".tmp", "w", encoding="utf-8") as f:
+            f.write(teksti)
+        os.replace(polku + ".tmp", polku)
+
+    poistettu = 0
+    for nimi in os.listdir(kansio):
+        if nimi != HAKUINDEKSI and nimi not in sailyta:
+            os.remove(os.path.join(kansio, nimi))
+            poistettu += 1
+    return indeksi, kirjoitettu, poistettu
+
+
+class Osuma(NamedTuple):
+    tiedosto: str
+    otsikko: str
+    kohta: int  # kysymyksen järjestysnumero tentin kelvollisten kysymysten joukossa
+    kysymys: str
+    pisteet: int
+
+
+class Hakuindeksi:
+    """Lukee update_tentit.py:n kirjoittamaa indeksiä; osat ladataan vasta tarvittaessa."""
+
+    def __init__(self, kansio: str):
+        self.kansio = os.path.join(kansio, HAKUKANSIO)
+        with open(os.path.join(self.kansio, HAKUINDEKSI), encoding="utf-8") as f:
+            self._indeksi = json.load(f)
+        if self._indeksi.get("version") != HAKUINDEKSIN_VERSIO:
+            raise ValueError(f"tuntematon hakuindeksin versio {self._indeksi.get('version')}")
+        self._termit: Dict[str, Tuple[List[str], Dict[str, List[int]]]] = {}
+        self._dokumentit: Dict[int, list] = {}
+
+    def __len__(self) -> int:
+        return self._indeksi["count"]
+
+    def _lue(self, nimi: str) -> Any:
+        with open(os.path.join(self.kansio, nimi), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _osa(self, avain: str) -> Tuple[List[str], Dict[str, List[int]]]:
+        if avain not in self._termit:
+            nimi = self._indeksi["terms"].get(avain)
+            postit = self._lue(nimi) if nimi else {}
+            self._termit[avain] = (sorted(postit), postit)
+        return self._termit[avain]
+
+    def _dokumentti(self, dokumentti: int) -> list:
+        osa = dokumentti // self._indeksi["docs_per_shard"]
+        if osa not in self._dokumentit:
+            self._dokumentit[osa] = self._lue(self._indeksi["docs"][osa])
+        return self._dokumentit[osa][dokumentti % self._indeksi["docs_per_shard"]]
+
+    def etuliite(self, sana: str) -> Dict[int, int]:
+        """Dokumentit, joissa on sanalla alkava sana: {dokumentti: 2 täsmälleen, 1 etuliitteenä}."""
+        termit, postit = self._osa(osan_avain(sana))
+        osumat: Dict[int, int] = {}
+        i = bisect.bisect_left(termit, sana)
+        while i < len(termit) and termit[i].startswith(sana):
+            pisteet = 2 if termit[i] == sana else 1
+            for dokumentti in postit[termit[i]]:
+                if osumat.get(dokumentti, 0) < pisteet:
+                    osumat[dokumentti] = pisteet
+            i += 1
+        return osumat
+
+    def hae(self, kysely: str, maara: Optional[int] = 20, tiedosto: Optional[str] = None) -> List[Osuma]:
+        """Kysymykset, joissa on kaikki kyselyn sanat (etuliitteinä), parhaat ensin."""
+        tulos: Optional[Dict[int, int]] = None
+        # Harvinaisimmasta sanasta alkaen, jotta leikkaus pysyy pienenä
+        for osumat in sorted((self.etuliite(s) for s in set(sanat(kysely))), key=len):
+            if tulos is None:
+                tulos = osumat
+            else:
+                tulos = {d: p + osumat[d] for d, p in tulos.items() if d in osumat}
+            if not tulos:
+                break
+        if not tulos:
+            return []
+
+        tentit = self._indeksi["exams"]
+        osumat = []
+        for dokumentti in sorted(tulos, key=lambda d: (-tulos[d], d)):
+            tentti, kohta, kysymys = self._dokumentti(dokumentti)
+            if tiedosto and tentit[tentti]["file"] != tiedosto:
+                continue
+            osumat.append(Osuma(tentit[tentti]["file"], tentit[tentti]["title"], kohta, kysymys, tulos[dokumentti]))
+            if maara is not None and len(osumat) >= maara:
+                break
+        return osumat
@@ -0,0 +1,242 @@
+"""
+Tenttisuoritusten historia ja kysymyskohtaiset tilastot.
+
+Jokainen vastaus lisätään SQLite-tietokannan vastaukset-tauluun
+(TENTIT/.tenttihistoria.sqlite, WAL-tila). Samassa transaktiossa
+päivitetään tilastot-taulun juoksevat summat: yritykset, oikeat,
+viimeisin vastaus ja vastausajan summa. Historiaa ei siis tarvitse
+käydä läpi raporttia varten.
+
+Vastaukset kirjoitetaan erissä (ERAN_KOKO vastausta tai suorituksen loppu).
+Heikoimmat kysymykset -raportti käyttää lausekeindeksiä arvioidusta
+osaamisesta ((oikein + 1) / (yrityksia + 2)), joten se palautuu heti
+historian koosta riippumatta.
+
+Tilastoissa pidetään myös peräkkäisten oikeiden vastausten putkea, josta
+kertaus.py laskee Leitner-lokeron ja seuraavan kertauksen ajankohdan.
+
+Kysymys tunnistetaan tiedostonimestä ja kysymystekstin tiivisteestä, joten
+kysymysten järjestyksen muuttaminen tiedostossa ei sekoita tilastoja.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+HISTORIA_TIEDOSTO = ".tenttihistoria.sqlite"
+HISTORIAN_VERSIO = "2"
+ERAN_KOKO = 20
+
+
+def kysymyksen_avain(kysymys: str) -> str:
+    """Kysymystekstin tiiviste; välilyöntien määrä ei vaikuta."""
+    return hashlib.sha1(" ".join(kysymys.split()).encode("utf-8")).hexdigest()[:16]
+
+
+class Kysymyshistoria(NamedTuple):
+    tiedosto: str
+    avain: str
+    kysymys: str
+    yrityksia: int
+    oikein: int
+    viimeksi: float
+    viimeksi_oikein: bool
+    keskimaarainen_kesto_ms: Optional[int]
+
+    @property
+    def osuus(self) -> float:
+        return self.oikein / self.yrityksia if self.yrityksia else 0.0
+
+
+class Historia:
+    """Suoritushistoria yhdelle tenttikansiolle."""
+
+    def __init__(self, kansio: str, polku: Optional[str] = None, eran_koko: int = ERAN_KOKO):
+        self.polku = polku or os.path.join(kansio, HISTORIA_TIEDOSTO)
+        self.eran_koko = eran_koko
+        self._jono: List[tuple] = []
+        self._suoritus: Optional[int] = None
+        self.pysyva = True
+        try:
+            self._yhteys = sqlite3.connect(self.polku)
+            self._alusta()
+        except sqlite3.Error:
+            # Kirjoitussuojattu kansio tms. -> historia vain tämän ajon ajan
+            self._yhteys = sqlite3.connect(":memory:")
+            self._alusta()
+            self.pysyva = False
+
+    def _alusta(self) -> None:
+        c = self._yhteys
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        c.execute("CREATE TABLE IF NOT EXISTS meta (avain TEXT PRIMARY KEY, arvo TEXT)")
+        versio = c.execute("SELECT arvo FROM meta WHERE avain = 'versio'").fetchone()
+        if versio and versio[0] not in ("1", HISTORIAN_VERSIO):
+            raise sqlite3.DatabaseError(f"tuntematon historian versio {versio[0]}")
+        c.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS suoritukset (
+                id INTEGER PRIMARY KEY,
+                tiedosto TEXT NOT NULL,
+                alku REAL NOT NULL,
+                loppu REAL,
+                kysymyksia INTEGER NOT NULL,
+                oikein INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS vastaukset (
+                id INTEGER PRIMARY KEY,
+                suoritus INTEGER NOT NULL,
+                aika REAL NOT NULL,
+                tiedosto TEXT NOT NULL,
+                avain TEXT NOT NULL,
+                oikein INTEGER NOT NULL,
+                valinta TEXT,
+                kesto_ms INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS tilastot (
+                tiedosto TEXT NOT NULL,
+                avain TEXT NOT NULL,
+                kysymys TEXT NOT NULL,
+                yrityksia INTEGER NOT NULL,
+                oikein INTEGER NOT NULL,
+                viimeksi REAL NOT NULL,
+                viimeksi_oikein INTEGER NOT NULL,
+                kesto_ms_summa INTEGER NOT NULL,
+                kesto_ms_maara INTEGER NOT NULL,
+                putki INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (tiedosto, avain)
+            );
+            CREATE INDEX IF NOT EXISTS tilastot_osaaminen
+                ON tilastot ((oikein + 1.0) / (yrityksia + 2.0));
+            """
+        )
+        if versio and versio[0] == "1":
+            # Versiossa 1 ei ollut putkea; viimeisin vastaus on paras arvio
+            c.execute("ALTER TABLE tilastot ADD COLUMN putki INTEGER NOT NULL DEFAULT 0")
+            c.execute("UPDATE tilastot SET putki = viimeksi_oikein")
+        c.execute("INSERT OR REPLACE INTO meta (avain, arvo) VALUES ('versio', ?)", (HISTORIAN_VERSIO,))
+        c.commit()
+
+    def aloita(self, tiedosto: str, kysymyksia: int) -> int:
+        """Aloittaa suorituksen ja palauttaa sen tunnisteen."""
+        self.tallenna()
+        kursori = self._yhteys.execute(
+            "INSERT INTO suoritukset (tiedosto, alku, kysymyksia) VALUES (?, ?, ?)",
+            (tiedosto, time.time(), kysymyksia),
+        )
+        self._yhteys.commit()
+        self._suoritus = kursori.lastrowid
+        return self._suoritus
+
+    def kirjaa(
+        self,
+        tiedosto: str,
+        kysymys: str,
+        oikein: bool,
+        valinta: Optional[str] = None,
+        kesto_ms: Optional[int] = None,
+    ) -> None:
+        """Lisää vastauksen jonoon; jono kirjoitetaan, kun ERAN_KOKO täyttyy."""
+        self._jono.append(
+            (self._suoritus or 0, time.time(), tiedosto, kysymyksen_avain(kysymys), kysymys, int(oikein), valinta, kesto_ms)
+        )
+        if len(self._jono) >= self.eran_koko:
+            self.tallenna()
+
+    def tallenna(self) -> None:
+        """Kirjoittaa jonossa olevat vastaukset ja päivittää tilastot yhdessä transaktiossa."""
+        if not self._jono:
+            return
+        jono, self._jono = self._jono, []
+        with self._yhteys:
+            self._yhteys.executemany(
+                "INSERT INTO vastaukset (suoritus, aika, tiedosto, avain, oikein, valinta, kesto_ms)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(s, aika, tiedosto, avain, oikein, valinta, kesto) for s, aika, tiedosto, avain, _, oikein, valinta, kesto in jono],
+            )
+            self._yhteys.executemany(
+                """
+                INSERT INTO tilastot VALUES (?, ?, ?, 1, ?, ?, ?, COALESCE(?, 0), ? IS NOT NULL, ?)
+                ON CONFLICT (tiedosto, avain) DO UPDATE SET
+                    kysymys = excluded.kysymys,
+                    yrityksia = yrityksia + 1,
+                    oikein = oikein + excluded.oikein,
+                    viimeksi = excluded.viimeksi,
+                    viimeksi_oikein = excluded.viimeksi_oikein,
+                    kesto_ms_summa = kesto_ms_summa + excluded.kesto_ms_summa,
+                    kesto_ms_maara = kesto_ms_maara + excluded.kesto_ms_maara,
+                    putki = CASE WHEN excluded.oikein THEN putki + 1 ELSE 0 END
+                """,
+                [
+                    (tiedosto, avain, kysymys, oikein, aika, oikein, kesto, kesto, oikein)
+                    for _, aika, tiedosto, avain, kysymys, oikein, _, kesto in jono
+                ],
+            )
+            suoritukset = {}
+            for s, _, _, _, _, oikein, _, _ in jono:
+                suoritukset[s] = suoritukset.get(s, 0) + oikein
+            self._yhteys.executemany(
+                "UPDATE suoritukset SET oikein = oikein + ?, loppu = ? WHERE id = ?",
+                [(oikein, time.time(), s) for s, oikein in suoritukset.items()],
+            )
+
+    def lopeta(self) -> None:
+        """Päättää suorituksen ja kirjoittaa jäljellä olevat vastaukset."""
+        self.tallenna()
+        self._suoritus = None
+
+    def sulje(self) -> None:
+        self.lopeta()
+        self._yhteys.close()
+
+    def heikoimmat(
+        self,
+        maara: int = 20,
+        tiedosto: Optional[str] = None,
+        vahintaan: int = 1,
+    ) -> List[Kysymyshistoria]:
+        """Kysymykset heikoimmasta alkaen arvioidun osaamisen mukaan."""
+        self.tallenna()
+        ehdot = ["yrityksia >= ?"]
+        parametrit: list = [vahintaan]
+        if tiedosto:
+            ehdot.append("tiedosto = ?")
+            parametrit.append(tiedosto)
+        parametrit.append(maara)
+        rivit = self._yhteys.execute(
+            f"""
+            SELECT tiedosto, avain, kysymys, yrityksia, oikein, viimeksi, viimeksi_oikein,
+                   CASE WHEN kesto_ms_maara THEN kesto_ms_summa / kesto_ms_maara END
+            FROM tilastot
+            WHERE {' AND '.join(ehdot)}
+            ORDER BY (oikein + 1.0) / (yrityksia + 2.0), viimeksi DESC
+            LIMIT ?
+            """,
+            parametrit,
+        )
+        return [Kysymyshistoria(r[0], r[1], r[2], r[3], r[4], r[5], bool(r[6]), r[7]) for r in rivit]
+
+    def kysymystilastot(self, tiedosto: str) -> Dict[str, Tuple[int, int, float, int]]:
+        """Palauttaa tiedoston kysymyksistä avain -> (yrityksia, oikein, viimeksi, putki)."""
+        self.tallenna()
+        return {
+            r[0]: (r[1], r[2], r[3], r[4])
+            for r in self._yhteys.execute(
+                "SELECT avain, yrityksia, oikein, viimeksi, putki FROM tilastot WHERE tiedosto = ?",
+                (tiedosto,),
+            )
+        }
+
+    def yhteenveto(self) -> tuple:
+        """Palauttaa (suorituksia, vastauksia, oikein) koko historiasta."""
+        self.tallenna()
+        suorituksia = self._yhteys.execute("SELECT COUNT(*) FROM suoritukset").fetchone()[0]
+        vastauksia, oikein = self._yhteys.execute(
+            "SELECT COALESCE(SUM(yrityksia), 0), COALESCE(SUM(oikein), 0) FROM tilastot"
+        ).fetchone()
+        return suorituksia, vastauksia, oikein
@@ -0,0 +1,246 @@
+"""
+Palvelimella pidettävät tenttisuoritukset (start_web.py:n /api/-rajapinta).
+
+Valvotussa tentissä selain ei saa oikeita vastauksia: palvelin arpoo
+kysymykset, lähettää ne yksi kerrallaan ilman vastausta ja tarkistaa
+vastaukset itse.
+
+- Tenttivarasto lataa kunkin tentin kerran ja jakaa sen kaikille
+  suorituksille. Tentti ladataan uudelleen vain, jos tiedoston mtime tai
+  koko muuttuu. Kysymykset ovat samoja Kysymys-olioita kuin
+  komentorivillä (tenttipankki.py).
+- Istunto tallentaa vain kysymysten järjestyksen (array), vastaukset
+  (array("H")), pisteet ja satunnaissiemenen. Vaihtoehtojen järjestys
+  johdetaan siemenestä aina samaksi, joten sitä ei tarvitse tallentaa.
+- Istunnot vanhenevat, kun niitä ei ole käytetty ISTUNNON_IKA sekuntiin.
+- Vastaukset pysyvät poissa selaimesta vain, jos tenttien JSON-tiedostoja
+  ei palvella suoraan: käynnistä palvelin valitsimella
+  ``start_web.py --proctored``, jolloin tentit-kansioiden .json-tiedostot
+  (myös niput ja hakuosat) saavat 404:n ja vain manifest.json näkyy.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import secrets
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from tenttipankki import Kysymys, KysymysVirta, normalisoi_kysymys
+
+ISTUNNON_IKA = 4 * 3600
+SIIVOUSVALI = 60
+ENINTAAN_ISTUNTOJA = 100_000
+# Vastaukset tallennetaan 16-bittisinä; kysymykset, joissa on tätä enemmän
+# vaihtoehtoja, jätetään pois, joten EI_VASTATTU ei voi olla valinta.
+EI_VASTATTU = 0xFFFF
+
+
+class IstuntoVirhe(ValueError):
+    """Virheellinen pyyntö; tila on vastaava HTTP-tilakoodi."""
+
+    def __init__(self, viesti: str, tila: int = 400):
+        super().__init__(viesti)
+        self.tila = tila
+
+
+class Tentti:
+    __slots__ = ("tiedosto", "otsikko", "kysymykset", "mtime_ns", "koko")
+
+    def __init__(self, tiedosto: str, otsikko: str, kysymykset: List[Kysymys], mtime_ns: int, koko: int):
+        self.tiedosto = tiedosto
+        self.otsikko = otsikko
+        self.kysymykset = kysymykset
+        self.mtime_ns = mtime_ns
+        self.koko = koko
+
+
+def lue_tentti(polku: str, tiedosto: str, stat: os.stat_result) -> Tentti:
+    virta = KysymysVirta(polku, siirtymat=False)
+    kysymykset = [
+        k for k in map(normalisoi_kysymys, virta) if k is not None and len(k.vaihtoehdot) < EI_VASTATTU
+    ]
+    otsikko = virta.otsikko or os.path.splitext(tiedosto)[0]
+    return Tentti(tiedosto, otsikko, kysymykset, stat.st_mtime_ns, stat.st_size)
+
+
+class Tenttivarasto:
+    """Jaettu, säieturvallinen välimuisti kansion tenteille."""
+
+    def __init__(self, kansio: str):
+        self.kansio = kansio
+        self._tentit: Dict[str, Tentti] = {}
+        self._lukko = threading.Lock()
+
+    def hae(self, tiedosto: str) -> Tentti:
+        if not isinstance(tiedosto, str) or os.path.basename(tiedosto) != tiedosto or not tiedosto.endswith(".json"):
+            raise IstuntoVirhe(f"tuntematon tentti '{tiedosto}'", 404)
+        polku = os.path.join(self.kansio, tiedosto)
+        try:
+            stat = os.stat(polku)
+        except OSError:
+            raise IstuntoVirhe(f"tuntematon tentti '{tiedosto}'", 404) from None
+        tentti = self._tentit.get(tiedosto)
+        if tentti and tentti.mtime_ns == stat.st_mtime_ns and tentti.koko == stat.st_size:
+            return tentti
+        with self._lukko:
+            tentti = self._tentit.get(tiedosto)
+            if not tentti or tentti.mtime_ns != stat.st_mtime_ns or tentti.koko != stat.st_size:
+                try:
+                    tentti = lue_tentti(polku, tiedosto, stat)
+                except (OSError, UnicodeDecodeError, ValueError):
+                    raise IstuntoVirhe(f"tenttiä '{tiedosto}' ei voitu lukea", 422) from None
+                self._tentit[tiedosto] = tentti
+        return tentti
+
+    def luettelo(self) -> List[Dict[str, Any]]:
+        """Kansion tentit, joissa on kelvollisia kysymyksiä."""
+        tentit = []
+        for nimi in sorted(os.listdir(self.kansio)):
+            if not nimi.endswith(".json") or nimi == "manifest.json" or nimi.startswith("."):
+                continue
+            try:
+                tentti = self.hae(nimi)
+            except IstuntoVirhe:
+                continue
+            if tentti.kysymykset:
+                tentit.append({"file": tentti.tiedosto, "title": tentti.otsikko, "questions": len(tentti.kysymykset)})
+        return tentit
+
+
+class Istunto:
+    __slots__ = ("tentti", "jarjestys", "vastaukset", "kohta", "pisteet", "siemen", "palaute", "luotu", "kaytetty")
+
+    def __init__(self, tentti: Tentti, jarjestys: array, siemen: int, palaute: bool, nyt: float):
+        self.tentti = tentti
+        self.jarjestys = jarjestys
+        self.vastaukset = array("H", [EI_VASTATTU]) * len(jarjestys)
+        self.kohta = 0
+        self.pisteet = 0
+        self.siemen = siemen
+        self.palaute = palaute
+        self.luotu = nyt
+        self.kaytetty = nyt
+
+    def vaihtoehtojen_jarjestys(self, kohta: int) -> List[int]:
+        """Kohdan kysymyksen vaihtoehtojen järjestys; sama joka kerta samalla siemenellä."""
+        jarjestys = list(range(len(self.tentti.kysymykset[self.jarjestys[kohta]].vaihtoehdot)))
+        random.Random(self.siemen * 1_000_003 + kohta).shuffle(jarjestys)
+        return jarjestys
+
+    def tila(self) -> Dict[str, Any]:
+        tulos = {
+            "exam": self.tentti.tiedosto,
+            "title": self.tentti.otsikko,
+            "total": len(self.jarjestys),
+            "answered": self.kohta,
+            "done": self.kohta >= len(self.jarjestys),
+        }
+        if self.palaute or tulos["done"]:
+            tulos["score"] = self.pisteet
+        return tulos
+
+
+class Istunnot:
+    """Kaikki käynnissä olevat suoritukset muistissa."""
+
+    def __init__(self, varasto: Tenttivarasto, ika: float = ISTUNNON_IKA, enintaan: int = ENINTAAN_ISTUNTOJA):
+        self.varasto = varasto
+        self.ika = ika
+        self.enintaan = enintaan
+        self._istunnot: Dict[str, Istunto] = {}
+        self._lukko = threading.Lock()
+        self._siivottu = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._istunnot)
+
+    def _siivoa(self, nyt: float) -> None:
+        if nyt - self._siivottu < SIIVOUSVALI:
+            return
+        self._siivottu = nyt
+        raja = nyt - self.ika
+        for tunnus in [t for t, i in self._istunnot.items() if i.kaytetty < raja]:
+            del self._istunnot[tunnus]
+
+    def _hae(self, tunnus: str) -> Istunto:
+        istunto = self._istunnot.get(tunnus)
+        if istunto is None:
+            raise IstuntoVirhe("tuntematon tai vanhentunut istunto", 404)
+        istunto.kaytetty = time.monotonic()
+        return istunto
+
+    def aloita(self, tiedosto: str, maara: Optional[int] = None, palaute: bool = True) -> Dict[str, Any]:
+        tentti = self.varasto.hae(tiedosto)
+        kaikki = len(tentti.kysymykset)
+        if not kaikki:
+            raise IstuntoVirhe("tentissä ei ole kelvollisia kysymyksiä", 422)
+        maara = kaikki if maara is None else maara
+        if not isinstance(maara, int) or not 1 <= maara <= kaikki:
+            raise IstuntoVirhe(f"kysymysten määrän pitää olla 1-{kaikki}")
+        siemen = secrets.randbits(32)
+        jarjestys = array("I", random.Random(siemen).sample(range(kaikki), maara))
+        nyt = time.monotonic()
+        tunnus = secrets.token_urlsafe(12)
+        with self._lukko:
+            self._siivoa(nyt)
+            if len(self._istunnot) >= self.enintaan:
+                raise IstuntoVirhe("liikaa käynnissä olevia istuntoja", 503)
+            self._istunnot[tunnus] = Istunto(tentti, jarjestys, siemen, bool(palaute), nyt)
+        return {"session": tunnus, **self._istunnot[tunnus].tila()}
+
+    def tila(self, tunnus: str) -> Dict[str, Any]:
+        return self._hae(tunnus).tila()
+
+    def kysymys(self, tunnus: str) -> Dict[str, Any]:
+        """Seuraava kysymys ilman oikeaa vastausta."""
+        istunto = self._hae(tunnus)
+        kohta = istunto.kohta
+        if kohta >= len(istunto.jarjestys):
+            return istunto.tila()
+        q = istunto.tentti.kysymykset[istunto.jarjestys[kohta]]
+        tulos = {
+            "index": kohta,
+            "total": len(istunto.jarjestys),
+            "question": q.kysymys,
+            "options": [q.vaihtoehdot[i] for i in istunto.vaihtoehtojen_jarjestys(kohta)],
+        }
+        if q.kuva:
+            tulos["image"] = q.kuva
+        return tulos
+
+    def vastaa(self, tunnus: str, kohta: Any, valinta: Any) -> Dict[str, Any]:
+        """Kirjaa vastauksen nykyiseen kysymykseen. valinta on näytetyn vaihtoehdon indeksi (0-)."""
+        istunto = self._hae(tunnus)
+        with self._lukko:
+            if istunto.kohta >= len(istunto.jarjestys):
+                raise IstuntoVirhe("tentti on jo päättynyt", 409)
+            # Kohta estää saman vastauksen kirjaamisen kahdesti (esim. uusittu pyyntö)
+            if kohta is not None and kohta != istunto.kohta:
+                raise IstuntoVirhe(f"odotettiin vastausta kysymykseen {istunto.kohta}", 409)
+            jarjestys = istunto.vaihtoehtojen_jarjestys(istunto.kohta)
+            if not isinstance(valinta, int) or isinstance(valinta, bool) or not 0 <= valinta < len(jarjestys):
+                raise IstuntoVirhe(f"vaihtoehdon pitää olla 0-{len(jarjestys) - 1}")
+            oikea = istunto.tentti.kysymykset[istunto.jarjestys[istunto.kohta]].oikea
+            oikein = jarjestys[valinta] == oikea
+            istunto.vastaukset[istunto.kohta] = valinta
+            istunto.pisteet += oikein
+            istunto.kohta += 1
+        tulos = istunto.tila()
+        if istunto.palaute:
+            tulos["correct"] = oikein
+            tulos["correct_option"] = jarjestys.index(oikea)
+        return tulos
+
+    def lopeta(self, tunnus: str) -> Dict[str, Any]:
+        with self._lukko:
+            istunto = self._istunnot.pop(tunnus, None)
+        if istunto is None:
+            raise IstuntoVirhe("tuntematon tai vanhentunut istunto", 404)
+        tulos = istunto.tila()
+        # Valitut vaihtoehdot näytetyssä järjestyksessä, None = ei vastattu
+        tulos["answers"] = [None if v == EI_VASTATTU else v for v in istunto.vastaukset]
+        return tulos
@@ -0,0 +1,157 @@
+"""
+Mukautuva kertaus: kysymysten painotettu arvonta historian perusteella.
+
+Jokaisen kysymyksen paino on sen arvioitu virheosuus kerrottuna sillä,
+kuinka myöhässä kysymyksen kertaus on Leitner-lokeroiden mukaan. Lokero on
+peräkkäisten oikeiden vastausten putki (historia.py), ja lokeron väli
+kertoo, milloin kysymys on seuraavan kerran kertausvuorossa. Uudet
+kysymykset saavat kiinteän, melko suuren painon.
+
+Painot pidetään Fenwick-puussa (Summapuu), joten yksi painotettu arvonta ja
+yhden painon päivitys vievät O(log n) aikaa. Painot lasketaan kerran
+suorituksen alussa; vastauksen jälkeen vain kyseisen kysymyksen paino
+lasketaan uudelleen, joten väärin vastattu kysymys voi tulla uudelleen
+vielä saman suorituksen aikana.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from historia import kysymyksen_avain
+from tenttipankki import Kysymys
+
+# Lokeron n kertausväli sekunteina; viimeistä käytetään pidemmille putkille
+VALIT = (10 * 60, 86400, 3 * 86400, 7 * 86400, 14 * 86400, 30 * 86400, 90 * 86400)
+ALIN_KERROIN = 0.05  # juuri kerrattu kysymys voi silti tulla arvotuksi
+YLIN_KERROIN = 4.0
+UUDEN_KERROIN = 2.0
+
+
+def kertausvali(putki: int) -> int:
+    return VALIT[min(putki, len(VALIT) - 1)]
+
+
+def paino(yrityksia: int, oikein: int, viimeksi: float, putki: int, nyt: float) -> float:
+    """Virheosuuden arvio (oikein + 1) / (yrityksia + 2):n komplementti kertaa erääntymiskerroin."""
+    virhe = (yrityksia - oikein + 1) / (yrityksia + 2)
+    if not yrityksia:
+        return virhe * UUDEN_KERROIN
+    kerroin = (nyt - viimeksi) / kertausvali(putki)
+    return virhe * min(max(kerroin, ALIN_KERROIN), YLIN_KERROIN)
+
+
+class Summapuu:
+    """Fenwick-puu ei-negatiivisille painoille: päivitys ja painotettu haku O(log n)."""
+
+    def __init__(self, painot: Iterable[float]):
+        self._painot = array("d", painot)
+        n = len(self._painot)
+        self._puu = array("d", bytes(8 * (n + 1)))
+        # O(n) rakennus: jokainen solmu lisää summansa vanhemmalleen
+        for i in range(1, n + 1):
+            self._puu[i] += self._painot[i - 1]
+            j = i + (i & -i)
+            if j <= n:
+                self._puu[j] += self._puu[i]
+        self._ylin_bitti = 1 << (n.bit_length() - 1) if n else 0
+
+    def __len__(self) -> int:
+        return len(self._painot)
+
+    def __getitem__(self, i: int) -> float:
+        return self._painot[i]
+
+    def aseta(self, i: int, paino: float) -> None:
+        erotus = paino - self._painot[i]
+        self._painot[i] = paino
+        n = len(self._painot)
+        i += 1
+        while i <= n:
+            self._puu[i] += erotus
+            i += i & -i
+
+    def summa(self) -> float:
+        """Kaikkien painojen summa."""
+        s = 0.0
+        i = len(self._painot)
+        while i:
+            s += self._puu[i]
+            i -= i & -i
+        return s
+
+    def hae(self, arvo: float) -> int:
+        """Palauttaa pienimmän indeksin i, jolla painojen 0..i summa ylittää arvon."""
+        n = len(self._painot)
+        i = 0
+        askel = self._ylin_bitti
+        while askel:
+            j = i + askel
+            if j <= n and self._puu[j] <= arvo:
+                i = j
+                arvo -= self._puu[j]
+            askel >>= 1
+        # Liukulukuvirhe voi viedä summan ohi tai nollapainoiselle kohdalle
+        i = min(i, n - 1)
+        while i > 0 and not self._painot[i]:
+            i -= 1
+        return i
+
+    def arvo(self, rng: random.Random = random) -> int:
+        return self.hae(rng.random() * self.summa())
+
+
+class Kertausajastin:
+    """Arpoo tentin kysymykset painotetusti ja päivittää painon jokaisen vastauksen jälkeen."""
+
+    def __init__(
+        self,
+        avaimet: List[str],
+        tilastot: Dict[str, Tuple[int, int, float, int]],
+        nyt: Optional[float] = None,
+        rng: random.Random = random,
+    ):
+        nyt = time.time() if nyt is None else nyt
+        self.rng = rng
+        self.viimeisin: Optional[int] = None
+        # Vain historiassa olevien kysymysten tila pidetään muistissa
+        self._tila = {i: tilastot[a] for i, a in enumerate(avaimet) if a in tilastot}
+        uuden_paino = paino(0, 0, 0.0, 0, nyt)
+        self._puu = Summapuu(
+            paino(*self._tila[i], nyt) if i in self._tila else uuden_paino for i in range(len(avaimet))
+        )
+
+    @classmethod
+    def historiasta(cls, historia, tiedosto: str, kysymykset: Iterable[Kysymys], **kwargs) -> "Kertausajastin":
+        """Luo ajastimen kysymysten (järjestyksessä) ja historian tiedostokohtaisten tilastojen pohjalta."""
+        avaimet = [kysymyksen_avain(q.kysymys) for q in kysymykset]
+        tilastot = historia.kysymystilastot(tiedosto) if historia is not None else {}
+        return cls(avaimet, tilastot, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._puu)
+
+    def seuraava(self) -> int:
+        """Arpoo seuraavan kysymyksen indeksin painojen suhteessa."""
+        return self._puu.arvo(self.rng)
+
+    def kirjaa(self, i: int, oikein: bool, nyt: Optional[float] = None) -> None:
+        """Päivittää kysymyksen i tilan ja painon vastauksen perusteella."""
+        nyt = time.time() if nyt is None else nyt
+        yrityksia, oikeita, _, putki = self._tila.get(i, (0, 0, 0.0, 0))
+        tila = (yrityksia + 1, oikeita + int(oikein), nyt, putki + 1 if oikein else 0)
+        self._tila[i] = tila
+        self._puu.aseta(i, paino(*tila, nyt))
+
+    def kysymykset(self, kysymykset, maara: int) -> Iterator[Kysymys]:
+        """Tuottaa maara arvottua kysymystä; vastaus kirjataan kirjaa(viimeisin, ...)-kutsulla.
+
+        Arvonta tehdään vasta edellisen vastauksen jälkeen, joten päivitetyt
+        painot vaikuttavat heti seuraavaan kysymykseen.
+        """
+        for _ in range(maara):
+            self.viimeisin = self.seuraava()
+            yield kysymykset[self.viimeisin]
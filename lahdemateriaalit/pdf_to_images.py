@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 """
 Muuntaa PDF:n yksittäisiksi PNG-kuviksi.
-Käyttö: python pdf_to_images.py <pdf-tiedosto> [aloitusnumero]
+Käyttö: python pdf_to_images.py <pdf-tiedosto> [aloitusnumero] [--pages 3-40] [--jobs N]
 
 Esim: python pdf_to_images.py slides.pdf 8
       -> Luo kuvat 8.png, 9.png, 10.png, ...
+
+Ilman argumentteja skripti kysyy tiedot interaktiivisesti.
+
+Sivut renderöidään paloissa (--chunk sivua kerrallaan) rinnakkain: jokainen
+pala on oma pdftoppm-prosessinsa, joka kirjoittaa PNG:t suoraan levylle.
+Kuvia ei siis pidetä muistissa, ja keskeneräisiä paloja on kerrallaan
+korkeintaan --jobs kappaletta.
 """
 
+import argparse
 import sys
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import os
 import glob
 
@@ -27,7 +37,62 @@ def find_poppler_path():
 
 POPPLER_PATH = find_poppler_path()
 
-def pdf_to_images(pdf_path: str, start_number: int = 1, subfolder: str | None = None):
+DEFAULT_DPI = 300
+DEFAULT_CHUNK = 4
+DEFAULT_JOBS = max(1, min(8, os.cpu_count() or 1))
+
+
+def parse_page_range(value: str | None, page_count: int) -> tuple[int, int]:
+    """Tulkitsee sivuvälin muodossa "5", "5-10", "5-" tai "-10" (1-pohjainen, suljettu)."""
+    if not value:
+        return 1, page_count
+    first_str, sep, last_str = value.partition("-")
+    first = int(first_str) if first_str.strip() else 1
+    last = int(last_str) if sep and last_str.strip() else (page_count if sep else first)
+    first = max(1, first)
+    last = min(page_count, last)
+    if first > last:
+        raise ValueError(f"Virheellinen sivuväli: {value} (PDF:ssä {page_count} sivua)")
+    return first, last
+
+
+def render_chunk(
+    pdf_path: str,
+    first_page: int,
+    last_page: int,
+    output_dir: Path,
+    output_start: int,
+    dpi: int = DEFAULT_DPI,
+) -> list[Path]:
+    """Renderöi sivut first_page..last_page ja tallentaa ne nimillä output_start, output_start+1, ..."""
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=".render-") as tmp:
+        paths = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=first_page,
+            last_page=last_page,
+            fmt="png",
+            output_folder=tmp,
+            paths_only=True,
+            poppler_path=POPPLER_PATH,
+        )
+        saved = []
+        for offset, rendered in enumerate(sorted(paths)):
+            target = output_dir / f"{output_start + offset}.png"
+            os.replace(rendered, target)
+            saved.append(target)
+    return saved
+
+
+def pdf_to_images(
+    pdf_path: str,
+    start_number: int = 1,
+    subfolder: str | None = None,
+    pages: str | None = None,
+    jobs: int = DEFAULT_JOBS,
+    chunk_size: int = DEFAULT_CHUNK,
+    dpi: int = DEFAULT_DPI,
+):
     """
     Muuntaa PDF:n PNG-kuviksi.
     
@@ -35,6 +100,10 @@ def pdf_to_images(pdf_path: str, start_number: int = 1, subfolder: str | None =
         pdf_path: Polku PDF-tiedostoon (suhteessa nykyiseen hakemistoon)
         start_number: Ensimmäisen kuvan numero (oletus: 1)
         subfolder: Alikansio tentit/images/-hakemiston alla
+        pages: Sivuväli, esim. "3-40" (oletus: kaikki sivut)
+        jobs: Rinnakkaisten renderöintien määrä
+        chunk_size: Sivuja per renderöintipala
+        dpi: Renderöintitarkkuus
     """
     pdf_file = Path(pdf_path)
     
@@ -48,10 +117,10 @@ def pdf_to_images(pdf_path: str, start_number: int = 1, subfolder: str | None =
     
     print(f"📄 Käsitellään: {pdf_file.name}")
     
-    # Muunnetaan PDF kuviksi (käytetään Poppler-polkua)
+    # Luetaan vain sivumäärä; sivut renderöidään myöhemmin paloissa
     try:
-        images = convert_from_path(pdf_path, dpi=300, poppler_path=POPPLER_PATH)
-        print(f"✅ Löydettiin {len(images)} sivua")
+        page_count = int(pdfinfo_from_path(pdf_path, poppler_path=POPPLER_PATH)["Pages"])
+        print(f"✅ Löydettiin {page_count} sivua")
     except Exception as e:
         print(f"❌ Virhe PDF:n lukemisessa: {e}")
         print("\n💡 Varmista että Poppler on asennettu:")
@@ -63,6 +132,12 @@ def pdf_to_images(pdf_path: str, start_number: int = 1, subfolder: str | None =
         print("\n   Linux: sudo apt-get install poppler-utils")
         print("   macOS: brew install poppler")
         return
+
+    try:
+        first_page, last_page = parse_page_range(pages, page_count)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
     
     # Tallennetaan kuvat TENTIT/images/-kansioon
     # Skripti on LAHDEMATERIAALIT-kansiossa, joten mennään ../TENTIT/images/
@@ -71,16 +146,92 @@ def pdf_to_images(pdf_path: str, start_number: int = 1, subfolder: str | None =
     
     output_dir = images_base / subfolder if subfolder else images_base
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    for i, image in enumerate(images):
-        output_number = start_number + i
-        output_path = output_dir / f"{output_number}.png"
-        image.save(output_path, 'PNG')
-        print(f"💾 Tallennettu: {output_path.name}")
-    
-    print(f"\n✨ Valmis! Luotiin kuvat {start_number}-{start_number + len(images) - 1} -> {output_dir}")
+
+    # Pala = (ensimmäinen sivu, viimeinen sivu); numerointi alkaa start_numberista
+    chunk_size = max(1, chunk_size)
+    chunks = [
+        (first, min(first + chunk_size - 1, last_page))
+        for first in range(first_page, last_page + 1, chunk_size)
+    ]
+    jobs = max(1, jobs)
+    print(f"⚙️  Renderöidään sivut {first_page}-{last_page} ({len(chunks)} palaa, {jobs} rinnakkain)")
+
+    saved_count = 0
+    failed = False
+    pending = iter(chunks)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        in_flight = set()
+
+        def submit_next() -> bool:
+            chunk = next(pending, None)
+            if chunk is None:
+                return False
+            first, last = chunk
+            in_flight.add(
+                pool.submit(
+                    render_chunk,
+                    pdf_path,
+                    first,
+                    last,
+                    output_dir,
+                    start_number + (first - first_page),
+                    dpi,
+                )
+            )
+            return True
+
+        # Pidetään korkeintaan jobs palaa kesken kerrallaan
+        for _ in range(jobs):
+            if not submit_next():
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    saved = future.result()
+                except Exception as e:
+                    print(f"❌ Renderöinti epäonnistui: {e}")
+                    failed = True
+                    continue
+                for path in saved:
+                    print(f"💾 Tallennettu: {path.name}")
+                saved_count += len(saved)
+                if not failed:
+                    submit_next()
+
+    if failed:
+        print(f"\n⚠️ Keskeytettiin virheen vuoksi, tallennettiin {saved_count} kuvaa -> {output_dir}")
+        return
+    print(f"\n✨ Valmis! Luotiin kuvat {start_number}-{start_number + saved_count - 1} -> {output_dir}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Muuntaa PDF:n PNG-kuviksi tentit/images/-kansioon.")
+    parser.add_argument("pdf", help="PDF-tiedosto")
+    parser.add_argument("start", nargs="?", type=int, default=1, help="Ensimmäisen kuvan numero")
+    parser.add_argument("--folder", help="Alikansio images/-hakemiston alla (oletus: PDF:n nimi)")
+    parser.add_argument("--pages", help='Sivuväli, esim. "3-40", "5-" tai "7"')
+    parser.add_argument("--jobs", "-j", type=int, default=DEFAULT_JOBS, help="Rinnakkaiset renderöinnit")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="Sivuja per pala")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        args = parse_args()
+        folder = args.folder or Path(args.pdf).stem.lower().replace(" ", "_")
+        pdf_to_images(
+            args.pdf,
+            args.start,
+            subfolder=folder,
+            pages=args.pages,
+            jobs=args.jobs,
+            chunk_size=args.chunk,
+            dpi=args.dpi,
+        )
+        sys.exit(0)
+
     # Interaktiivinen käyttöliittymä terminaaliin
     print("=== PDF -> PNG Muunnin ===\n")
     
@@ -116,6 +267,9 @@ if __name__ == "__main__":
     default_folder = pdf_stem.lower().replace(" ", "_")
     subfolder_str = input(f"Kansion nimi kuvien tallennukseen (oletus: {default_folder}): ").strip() or default_folder
     
+    # Sivuväli - oletuksena kaikki sivut
+    pages_str = input("Sivuväli, esim. 3-40 (oletus: kaikki): ").strip() or None
+
     # Lasketaan tallennuspolku
     images_base = project_root / "tentit" / "images"
     output_path = images_base / subfolder_str
@@ -123,4 +277,4 @@ if __name__ == "__main__":
     print(f"\n📁 Tallennetaan: {output_path}/")
     print(f"🔢 Numeroidaan: {start_num}, {start_num+1}, {start_num+2}...\n")
     
-    pdf_to_images(pdf_path, start_num, subfolder=subfolder_str)
+    pdf_to_images(pdf_path, start_num, subfolder=subfolder_str, pages=pages_str)
@@ -0,0 +1,171 @@
+"""
+Komentorivitentin vaiheiden ajanotto (titetenttaaja.py --profile).
+
+Koodi merkitsee vaiheet nimetyillä jaksoilla:
+
+    with vaihe("piirto"):
+        naytto.piirra(...)
+
+Kun profilointi ei ole päällä, vaihe() palauttaa aina saman tyhjän
+kontekstinhallinnan ja vaiheittain() iteroitavan sellaisenaan, joten
+merkinnät eivät maksa käytännössä mitään.
+
+Jaksot voivat olla sisäkkäisiä (yhdessä säikeessä). Yhteenvetotaulukko
+näyttää kullekin vaiheelle kokonaisajan ja oman ajan (ilman sisäkkäisiä
+jaksoja), joten esimerkiksi käyttäjän syötteen odotus ("syöte") erottuu
+piirrosta ("piirto"), vaikka molemmat ovat tentin ("tentti") sisällä.
+Jaksot voi lisäksi tallentaa Chromen trace-muodossa (chrome://tracing,
+Perfetto) tai koko ajon cProfile-tilastot pstats-tiedostoon.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_TYHJA = nullcontext()
+_aktiivinen: Optional["Profiloija"] = None
+
+
+class Profiloija:
+    """Kerää vaiheiden kestot ja tapahtumat; yksi kerrallaan aktiivisena (aloita/lopeta)."""
+
+    def __init__(self, cprofile: bool = False):
+        self.alku = time.perf_counter()
+        self.loppu: Optional[float] = None
+        # nimi -> [kertoja, kokonaisaika, oma aika]
+        self.vaiheet: Dict[str, List[float]] = {}
+        # (nimi, alku, kesto, syvyys) Chrome-tracea varten
+        self.tapahtumat: List[Tuple[str, float, float, int]] = []
+        self._pino: List[List[float]] = []  # [alku, lasten aika]
+        self._profiili = None
+        if cprofile:
+            import cProfile
+
+            self._profiili = cProfile.Profile()
+
+    @contextmanager
+    def vaihe(self, nimi: str) -> Iterator[None]:
+        kehys = [time.perf_counter(), 0.0]
+        self._pino.append(kehys)
+        try:
+            yield
+        finally:
+            loppu = time.perf_counter()
+            self._pino.pop()
+            kesto = loppu - kehys[0]
+            if self._pino:
+                self._pino[-1][1] += kesto
+            tilasto = self.vaiheet.setdefault(nimi, [0, 0.0, 0.0])
+            tilasto[0] += 1
+            tilasto[1] += kesto
+            tilasto[2] += kesto - kehys[1]
+            self.tapahtumat.append((nimi, kehys[0] - self.alku, kesto, len(self._pino)))
+
+    def kaynnista(self) -> None:
+        if self._profiili is not None:
+            self._profiili.enable()
+
+    def pysayta(self) -> None:
+        if self._profiili is not None:
+            self._profiili.disable()
+        self.loppu = time.perf_counter()
+
+    @property
+    def kesto(self) -> float:
+        return (self.loppu if self.loppu is not None else time.perf_counter()) - self.alku
+
+    def taulukko(self) -> str:
+        """Vaiheet kokonaisajan mukaan järjestettynä tekstitaulukkona."""
+        rivit = [f"{'Vaihe':<24}{'kertoja':>8}{'yht. ms':>12}{'oma ms':>12}{'ka. ms':>10}"]
+        for nimi, (kertoja, yhteensa, oma) in sorted(self.vaiheet.items(), key=lambda v: -v[1][1]):
+            rivit.append(
+                f"{nimi:<24}{int(kertoja):>8}{yhteensa * 1000:>12.1f}{oma * 1000:>12.1f}{yhteensa * 1000 / kertoja:>10.2f}"
+            )
+        # Ajo ilman vaiheita: aika, jota mikään jakso ei kata (tuonnit, tulostus, ...)
+        merkitty = sum(kesto for _, _, kesto, syvyys in self.tapahtumat if syvyys == 0)
+        rivit.append(f"{'(muu)':<24}{'':>8}{(self.kesto - merkitty) * 1000:>12.1f}")
+        rivit.append(f"{'yhteensä':<24}{'':>8}{self.kesto * 1000:>12.1f}")
+        return "\n".join(rivit)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": nimi,
+                    "cat": "titetenttaaja",
+                    "ph": "X",
+                    "ts": round(alku * 1e6, 1),
+                    "dur": round(kesto * 1e6, 1),
+                    "pid": pid,
+                    "tid": 1,
+                }
+                for nimi, alku, kesto, _ in sorted(self.tapahtumat, key=lambda t: (t[1], t[3]))
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def tallenna(self, polku: str) -> None:
+        """.json -> Chrome trace, muut päätteet -> cProfile-tilastot (pstats)."""
+        if polku.lower().endswith(".json"):
+            with open(polku, "w", encoding="utf-8") as f:
+                json.dump(self.chrome_trace(), f)
+        elif self._profiili is not None:
+            self._profiili.dump_stats(polku)
+        else:
+            raise ValueError(f"{polku}: cProfile ei ollut käytössä")
+
+
+def vaihe(nimi: str):
+    """Kontekstinhallinta, joka ajastaa jakson, jos profilointi on päällä."""
+    if _aktiivinen is None:
+        return _TYHJA
+    return _aktiivinen.vaihe(nimi)
+
+
+def vaiheittain(nimi: str, iteroitava: Iterable[Any]) -> Iterable[Any]:
+    """Ajastaa jokaisen alkion haun (esim. laiskasti luettavat kysymykset) vaiheena nimi."""
+    if _aktiivinen is None:
+        return iteroitava
+    return _vaiheittain(_aktiivinen, nimi, iter(iteroitava))
+
+
+def _vaiheittain(profiloija: Profiloija, nimi: str, iteraattori: Iterator[Any]) -> Iterator[Any]:
+    while True:
+        with profiloija.vaihe(nimi):
+            try:
+                alkio = next(iteraattori)
+            except StopIteration:
+                return
+        yield alkio
+
+
+def aloita(cprofile: bool = False) -> Profiloija:
+    global _aktiivinen
+    _aktiivinen = Profiloija(cprofile)
+    _aktiivinen.kaynnista()
+    return _aktiivinen
+
+
+def lopeta(polku: Optional[str] = None, ulos: IO[str] = sys.stderr) -> Optional[Profiloija]:
+    """Pysäyttää profiloinnin, tulostaa taulukon ja tallentaa tarvittaessa tiedoston polku."""
+    global _aktiivinen
+    profiloija, _aktiivinen = _aktiivinen, None
+    if profiloija is None:
+        return None
+    profiloija.pysayta()
+    print("\n=== Profiili ===", file=ulos)
+    print(profiloija.taulukko(), file=ulos)
+    if polku:
+        try:
+            profiloija.tallenna(polku)
+        except (OSError, ValueError) as exc:
+            print(f"Profiilia ei voitu tallentaa: {exc}", file=ulos)
+        else:
+            print(f"Profiili tallennettu: {polku}", file=ulos)
+    return profiloija
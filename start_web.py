@@ -1,43 +1,1028 @@
 #!/usr/bin/env python3
 """
 Käynnistää HTTP-palvelimen ja avaa WEB-sovelluksen selaimessa
+
+- Palvelee pyynnöt rinnakkain (ThreadingHTTPServer), joten kuvat ja
+  tenttien JSONit eivät jonota toistensa perässä.
+- Lähettää ETag- ja Last-Modified-otsakkeet ja vastaa ehdollisiin
+  pyyntöihin 304:llä.
+- Sisältötiivisteellä nimetyt tiedostot (esim. app.3f2a9c1d.js tai ?v=...)
+  saavat pitkän välimuistiajan, muut tarkistetaan aina ETagilla.
+- JSON-, JS-, CSS- ja HTML-tiedostoista lasketaan gzip- (ja brotli-, jos
+  asennettu) versiot käynnistyksessä.
+- Tiedostot lähetetään sendfile-kutsulla suoraan ytimessä (ei Pythonin
+  puskureiden kautta), ja viimeksi palvellut tiedostot pidetään auki
+  (OpenFileCache). Range-pyynnöt (yksi tai useampi väli, If-Range)
+  saavat 206-vastauksen, joten isojen kuvien ja materiaalien lataus voi
+  jatkua katkenneesta kohdasta.
+- /api/ tarjoaa valvottuja tenttejä varten palvelimella pidettävät
+  suoritukset (istunnot.py): selain saa kysymykset ilman oikeita vastauksia.
+
+      GET    /api/exams                       tentit ja kysymysmäärät
+      POST   /api/sessions                    {"exam", "count", "feedback"}
+      GET    /api/sessions/<id>               suorituksen tila
+      GET    /api/sessions/<id>/question      seuraava kysymys ilman vastausta
+      POST   /api/sessions/<id>/answer        {"index", "option"}
+      DELETE /api/sessions/<id>               päättää suorituksen
+
+  --proctored estää lisäksi tenttien JSON-tiedostot (vastauksineen)
+  tiedostopalvelusta: kaikki tentit-nimisten kansioiden .json-tiedostot
+  manifest.jsonia lukuun ottamatta saavat 404:n.
+
+- /events on Server-Sent Events -virta: kun WEB/tentit/manifest.json
+  muuttuu (esim. update_tentit.py --watch), palvelin lähettää "exam"-
+  tapahtuman jokaisesta tentistä, jonka tiiviste muuttui, ja avoimet
+  välilehdet lataavat sen uudelleen ilman sivun päivitystä.
+- /metrics palauttaa pyyntömäärät, lähetetyt tavut, tilakoodit ja
+  latenssihistogrammit reiteittäin Prometheuksen tekstimuodossa, ja
+  konsoliin tulostetaan yhteenveto --metrics-interval sekunnin välein.
 """
+import argparse
+import bisect
+import email.utils
+import gzip
+import json
 import os
+import re
 import sys
-import webbrowser
+import threading
 import time
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import webbrowser
+from array import array
+from collections import OrderedDict
+from functools import partial
+from http import HTTPStatus
+from http.server import HTTPServer, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from stat import S_ISDIR, S_ISREG
+from urllib.parse import parse_qs, urlsplit
+
+from istunnot import Istunnot, IstuntoVirhe, Tenttivarasto
+
+try:
+    import brotli
+except ImportError:  # brotli ei ole pakollinen, gzip riittää
+    brotli = None
 
 # Projektin juurikansio
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
-
-# Vaihdeta projektikansion juuri työhakemistoksi
-os.chdir(PROJECT_ROOT)
+WEB_ROOT = os.path.join(PROJECT_ROOT, "WEB")
+EXAMS_ROOT = os.path.join(WEB_ROOT, "tentit")
 
 PORT = 3000
 URL = f"http://localhost:{PORT}/WEB/index.html"
 
+COMPRESSIBLE_SUFFIXES = (".json", ".js", ".css", ".html", ".svg", ".txt")
+MIN_COMPRESS_SIZE = 512
+
+# Windowsissa avoinna olevaa tiedostoa ei voi korvata (update_tentit.py), joten siellä ei pidetä tiedostoja auki
+MAX_OPEN_FILES = 0 if os.name == "nt" else 128
+MAX_RANGES = 16
+SENDFILE = hasattr(os, "sendfile")
+COPY_CHUNK = 256 * 1024
+
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDATE = "no-cache"
+# name.<hash>.ext, jossa hash on vähintään 8 heksamerkkiä
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+VARIANT_SUFFIX = re.compile(r'-(?:gzip|br)"$')
+
+API_PREFIX = "/api/"
+MAX_API_BODY = 64 * 1024
+
+EVENTS_PATH = "/events"
+MANIFEST_PATH = os.path.join(EXAMS_ROOT, "manifest.json")
+EXAM_DIRNAME = "tentit"
+EVENT_POLL_INTERVAL = 0.5
+EVENT_KEEPALIVE = 15
+EVENT_HISTORY = 100
+
+METRICS_PATH = "/metrics"
+METRICS_INTERVAL = 60
+METRICS_PREFIX = "titetenttaaja_http"
+# Histogrammin ylärajat sekunteina; viimeinen lokero on +Inf
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+MAX_ROUTES = 256
+OTHER_ROUTE = "(other)"
+NOT_FOUND_ROUTE = "(not found)"
+SESSION_ROUTE = re.compile(r"^/api/sessions/[^/]+")
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+class CompressedVariant:
+    __slots__ = ("mtime_ns", "size", "encodings")
+
+    def __init__(self, mtime_ns, size, encodings):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.encodings = encodings
+
+
+class PrecompressedCache:
+    """Pitää muistissa tekstitiedostojen gzip/brotli-versiot.
+
+    Versio lasketaan uudelleen, jos tiedoston mtime tai koko muuttuu.
+    """
+
+    def __init__(self):
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _compress(data):
+        encodings = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            encodings["br"] = brotli.compress(data, quality=11)
+        # Säilytetään vain versiot, jotka ovat oikeasti pienempiä
+        return {name: body for name, body in encodings.items() if len(body) < len(data)}
+
+    def get(self, path, stat):
+        variant = self._variants.get(path)
+        if variant and variant.mtime_ns == stat.st_mtime_ns and variant.size == stat.st_size:
+            return variant.encodings
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return {}
+        variant = CompressedVariant(stat.st_mtime_ns, stat.st_size, self._compress(data))
+        with self._lock:
+            self._variants[path] = variant
+        return variant.encodings
+
+    def warm(self, root):
+        """Laskee pakatut versiot valmiiksi kaikille pakattaville tiedostoille."""
+        count = 0
+        total = 0
+        compressed = 0
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if not name.lower().endswith(COMPRESSIBLE_SUFFIXES):
+                    continue
+                path = os.path.join(dirpath, name)
+                stat = os.stat(path)
+                if stat.st_size < MIN_COMPRESS_SIZE:
+                    continue
+                encodings = self.get(path, stat)
+                count += 1
+                total += stat.st_size
+                compressed += min((len(b) for b in encodings.values()), default=stat.st_size)
+        return count, total, compressed
+
+
+class CachedFile:
+    __slots__ = ("file", "stat", "key", "refs", "retired", "lock")
+
+    def __init__(self, file, stat):
+        self.file = file
+        self.stat = stat
+        self.key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self.refs = 1
+        self.retired = False
+        # Vain ilman sendfileä: seek + read pitää tehdä yhdessä, koska tiedosto on jaettu
+        self.lock = threading.Lock()
+
+
+class OpenFileCache:
+    """Pitää enintään max_files viimeksi palveltua tiedostoa auki (LRU).
+
+    Pyyntö tekee vain yhden stat-kutsun: jos tiedoston inode, mtime ja koko
+    ovat samat, käytetään jo avattua tiedostoa ja sen fstat-tietoja. Muuten
+    (esim. update_tentit.py korvasi tiedoston) avataan uusi. Välimuistista
+    poistuva tiedosto suljetaan vasta, kun viimeinenkin sitä lähettävä
+    pyyntö on vapauttanut sen (release).
+    """
+
+    def __init__(self, max_files=MAX_OPEN_FILES):
+        self.max_files = max_files
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, path, stat):
+        key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None and entry.key == key:
+                self._files.move_to_end(path)
+                entry.refs += 1
+                self.hits += 1
+                return entry
+        f = open(path, "rb")
+        try:
+            entry = CachedFile(f, os.fstat(f.fileno()))
+        except OSError:
+            f.close()
+            raise
+        with self._lock:
+            self.misses += 1
+            old = self._files.pop(path, None)
+            if old is not None:
+                self._retire(old)
+            if self.max_files > 0:
+                self._files[path] = entry
+            else:
+                entry.retired = True
+            while len(self._files) > self.max_files:
+                self._retire(self._files.popitem(last=False)[1])
+        return entry
+
+    def release(self, entry):
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs == 0 and entry.retired:
+                entry.file.close()
+
+    def _retire(self, entry):
+        entry.retired = True
+        if entry.refs == 0:
+            entry.file.close()
+
+
+class FileBody:
+    """send_headin palauttama tiedoston runko: lähetettävät välit (otsake, alku, pituus) ja loppu."""
+
+    __slots__ = ("cache", "entry", "parts", "trailer")
+
+    def __init__(self, cache, entry):
+        self.cache = cache
+        self.entry = entry
+        self.parts = []
+        self.trailer = b""
+
+    def close(self):
+        if self.entry is not None:
+            self.cache.release(self.entry)
+            self.entry = None
+
+
+def parse_ranges(header, size):
+    """Palauttaa Range-otsakkeen tavuvälit [(alku, loppu), ...] järjestettyinä ja yhdistettyinä.
+
+    Loppu kuuluu väliin. None tarkoittaa puuttuvaa tai virheellistä otsaketta
+    (vastataan koko tiedostolla), [] ettei mikään väli osu tiedostoon (416).
+    """
+    unit, _, spec = (header or "").partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    ranges = []
+    parsed = 0
+    for part in spec.split(","):
+        first, sep, last = part.strip().partition("-")
+        first, last = first.strip(), last.strip()
+        if not sep and not first:
+            continue
+        if not sep or (first and not first.isdigit()) or (last and not last.isdigit()) or not (first or last):
+            return None
+        parsed += 1
+        if not first:
+            # Loppuosa: "-500" = viimeiset 500 tavua
+            if int(last) > 0 and size > 0:
+                ranges.append((max(0, size - int(last)), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, min(int(last), size - 1) if last else size - 1))
+    if not parsed:
+        return None
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class ExamEvents:
+    """Seuraa manifestia ja julkaisee muuttuneet tentit SSE-kuuntelijoille.
+
+    update_tentit.py vaihtaa manifestin atomisesti, ja jokaisen tentin
+    "hash" muuttuu sen sisällön mukana. Taustasäie vertaa tiivisteitä
+    edelliseen versioon; se käynnistyy vasta ensimmäisen kuuntelijan myötä.
+    """
+
+    def __init__(self, manifest_path=MANIFEST_PATH, interval=EVENT_POLL_INTERVAL):
+        self.manifest_path = manifest_path
+        self.interval = interval
+        self._condition = threading.Condition()
+        self._events = []  # (numero, nimi, data), viimeiset EVENT_HISTORY
+        self._seq = 0
+        self._thread = None
+        self._stat = None
+        self._hashes = self._read()
+
+    def _read(self):
+        try:
+            stat = os.stat(self.manifest_path)
+            with open(self.manifest_path, encoding="utf-8") as f:
+                entries = json.load(f)
+            hashes = {e["file"]: e.get("hash") for e in entries if isinstance(e, dict) and "file" in e}
+        except (OSError, ValueError, TypeError):
+            return None
+        self._stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return hashes
+
+    def _changed(self):
+        try:
+            stat = os.stat(self.manifest_path)
+        except OSError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._stat
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            if not self._changed():
+                continue
+            hashes = self._read()
+            if hashes is None:
+                continue  # kesken kirjoituksen; yritetään uudelleen
+            old = self._hashes or {}
+            self._hashes = hashes
+            for name in sorted(old.keys() | hashes.keys()):
+                if old.get(name) != hashes.get(name):
+                    self.publish("exam", {"file": name, "hash": hashes.get(name)})
+
+    def publish(self, name, data):
+        with self._condition:
+            self._seq += 1
+            self._events.append((self._seq, name, json.dumps(data, ensure_ascii=False)))
+            del self._events[:-EVENT_HISTORY]
+            self._condition.notify_all()
+
+    def subscribe(self):
+        """Palauttaa viimeisimmän tapahtuman numeron; käynnistää seurannan tarvittaessa."""
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name="exam-events", daemon=True)
+                self._thread.start()
+            return self._seq
+
+    def wait(self, after, timeout=EVENT_KEEPALIVE):
+        """Odottaa tapahtumia numeron after jälkeen. Palauttaa (uusin numero, tapahtumat)."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > after, timeout)
+            return self._seq, [event for event in self._events if event[0] > after]
+
+
+def route_label(path, status):
+    """Reitin nimi mittareille: ilman kyselyä ja istuntotunnuksia, jotta nimiä on rajallisesti."""
+    if status == HTTPStatus.NOT_FOUND:
+        return NOT_FOUND_ROUTE
+    path = path.split("?", 1)[0]
+    if path.startswith("/api/sessions/"):
+        return SESSION_ROUTE.sub("/api/sessions/:id", path, count=1)
+    return path
+
+
+class RouteStats:
+    __slots__ = ("buckets", "count", "seconds", "bytes", "statuses")
+
+    def __init__(self):
+        self.buckets = array("Q", bytes(8 * (len(LATENCY_BUCKETS) + 1)))
+        self.count = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.statuses = {}
+
+    def copy(self):
+        other = RouteStats()
+        other.buckets = array("Q", self.buckets)
+        other.count = self.count
+        other.seconds = self.seconds
+        other.bytes = self.bytes
+        other.statuses = dict(self.statuses)
+        return other
+
+
+def histogram_quantile(buckets, count, q):
+    """Kvantiilin yläraja-arvio lokeroista; None, jos se osuu +Inf-lokeroon."""
+    rank = q * count
+    total = 0
+    for bound, n in zip(LATENCY_BUCKETS, buckets):
+        total += n
+        if total >= rank:
+            return bound
+    return None
+
+
+class RequestMetrics:
+    """Pyyntömäärät, tavut, tilakoodit ja latenssihistogrammi (metodi, reitti) -pareittain.
+
+    Lokerot ovat kiinteät, joten kirjaus on yksi bisect ja muutama
+    yhteenlasku lyhyen lukon alla. Reittejä pidetään enintään MAX_ROUTES;
+    loput kirjataan reitille OTHER_ROUTE.
+    """
+
+    def __init__(self, max_routes=MAX_ROUTES):
+        self.max_routes = max_routes
+        self.started = time.time()
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method, route, status, seconds, sent):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        key = (method, route)
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                if len(self._routes) >= self.max_routes:
+                    key = (method, OTHER_ROUTE)
+                    stats = self._routes.get(key)
+                if stats is None:
+                    stats = self._routes[key] = RouteStats()
+            stats.buckets[bucket] += 1
+            stats.count += 1
+            stats.seconds += seconds
+            stats.bytes += sent
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: stats.copy() for key, stats in self._routes.items()}
+
+    def prometheus(self, gauges=()):
+        """Mittarit Prometheuksen tekstimuodossa. gauges: (nimi, ohje, arvo) -kolmikot."""
+        routes = sorted(self.snapshot().items())
+        lines = [
+            f"# HELP {METRICS_PREFIX}_requests_total HTTP requests by route, method and status.",
+            f"# TYPE {METRICS_PREFIX}_requests_total counter",
+        ]
+        for (method, route), stats in routes:
+            labels = f'route="{escape_label(route)}",method="{method}"'
+            for status, n in sorted(stats.statuses.items()):
+                lines.append(f'{METRICS_PREFIX}_requests_total{{{labels},status="{status}"}} {n}')
+        lines += [
+            f"# HELP {METRICS_PREFIX}_response_bytes_total Response body bytes by route and method.",
+            f"# TYPE {METRICS_PREFIX}_response_bytes_total counter",
+        ]
+        for (method, route), stats in routes:
+            labels = f'route="{escape_label(route)}",method="{method}"'
+            lines.append(f"{METRICS_PREFIX}_response_bytes_total{{{labels}}} {stats.bytes}")
+        lines += [
+            f"# HELP {METRICS_PREFIX}_request_duration_seconds Request handling time by route and method.",
+            f"# TYPE {METRICS_PREFIX}_request_duration_seconds histogram",
+        ]
+        for (method, route), stats in routes:
+            labels = f'route="{escape_label(route)}",method="{method}"'
+            total = 0
+            for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                total += n
+                lines.append(f'{METRICS_PREFIX}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {total}')
+            lines.append(f"{METRICS_PREFIX}_request_duration_seconds_sum{{{labels}}} {stats.seconds:.6f}")
+            lines.append(f"{METRICS_PREFIX}_request_duration_seconds_count{{{labels}}} {stats.count}")
+        for name, help_text, value in (
+            ("uptime_seconds", "Seconds since the server started.", round(time.time() - self.started, 3)),
+            *gauges,
+        ):
+            lines += [
+                f"# HELP {METRICS_PREFIX}_{name} {help_text}",
+                f"# TYPE {METRICS_PREFIX}_{name} gauge",
+                f"{METRICS_PREFIX}_{name} {value}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def report(self, interval=METRICS_INTERVAL, out=sys.stdout):
+        """Tulostaa interval sekunnin välein yhteenvedon, jos pyyntöjä tuli."""
+        previous = self.snapshot()
+        while True:
+            time.sleep(interval)
+            current = self.snapshot()
+            summary = summarize(previous, current, interval)
+            previous = current
+            if summary:
+                print(summary, file=out, flush=True)
+
+    def start_reporter(self, interval=METRICS_INTERVAL):
+        thread = threading.Thread(target=self.report, args=(interval,), name="metrics-report", daemon=True)
+        thread.start()
+        return thread
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def summarize(previous, current, interval, slowest=3):
+    """Yksi rivi välin previous -> current pyynnöistä; tyhjä, jos pyyntöjä ei ollut."""
+    requests = 0
+    sent = 0
+    errors = 0
+    routes = []
+    for key, stats in current.items():
+        before = previous.get(key)
+        count = stats.count - (before.count if before else 0)
+        if not count:
+            continue
+        requests += count
+        sent += stats.bytes - (before.bytes if before else 0)
+        errors += sum(
+            n - (before.statuses.get(status, 0) if before else 0)
+            for status, n in stats.statuses.items()
+            if status >= 500
+        )
+        buckets = [n - (before.buckets[i] if before else 0) for i, n in enumerate(stats.buckets)]
+        p95 = histogram_quantile(buckets, count, 0.95)
+        routes.append((float("inf") if p95 is None else p95, count, key))
+    if not requests:
+        return ""
+    routes.sort(key=lambda r: (-r[0], -r[1]))
+    slow = ", ".join(
+        f"{method} {route} ≤{p95 * 1000:g} ms" if p95 != float("inf") else f"{method} {route} >{LATENCY_BUCKETS[-1]} s"
+        for p95, _, (method, route) in routes[:slowest]
+    )
+    return (
+        f"📊 {requests} requests in {interval:g} s ({requests / interval:.1f}/s), "
+        f"{sent / 1e6:.1f} MB, {errors} server errors; slowest p95: {slow}"
+    )
+
+
+def accepted_encodings(header):
+    """Palauttaa Accept-Encoding-otsakkeen koodaukset, joiden q > 0."""
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+    return accepted
+
+
 class MyHTTPRequestHandler(SimpleHTTPRequestHandler):
     """Yksinkertainen HTTP-palvelin, joka tulostaa pyynnöt"""
+
+    protocol_version = "HTTP/1.1"
+    # Otsakkeet ja runko kirjoitetaan erikseen; ilman TCP_NODELAYta Nagle ja
+    # viivästetty ACK lisäisivät pysyvän yhteyden vastauksiin ~40 ms
+    disable_nagle_algorithm = True
+    compressed_cache = PrecompressedCache()
+    open_files = OpenFileCache()
+    use_sendfile = SENDFILE
+
+    def __init__(self, *args, sessions=None, events=None, metrics=None, proctored=False, **kwargs):
+        # Asetetaan ennen yliluokkaa, joka käsittelee pyynnön jo konstruktorissa
+        self.sessions = sessions
+        self.proctored = proctored
+        self.events = events
+        self.metrics = metrics
+        self._started = None
+        self._status = None
+        self._sent = 0
+        super().__init__(*args, **kwargs)
+
+    def parse_request(self):
+        # Ajanotto alkaa vasta pyyntörivin saavuttua, ei pysyvän yhteyden odotuksesta
+        self._started = time.perf_counter()
+        self._status = None
+        self._sent = 0
+        return super().parse_request()
+
+    def handle_one_request(self):
+        self._started = None
+        super().handle_one_request()
+        if self.metrics is not None and self._started is not None and self._status is not None:
+            self.metrics.observe(
+                self.command,
+                route_label(self.path, self._status),
+                self._status,
+                time.perf_counter() - self._started,
+                0 if self.command == "HEAD" else self._sent,
+            )
+
+    def send_response_only(self, code, message=None):
+        self._status = int(code)
+        super().send_response_only(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword == "Content-Length":
+            self._sent = int(value)
+        super().send_header(keyword, value)
+
     def log_message(self, format, *args):
-        # Jätetään oletuslokit pois, mutta näytetään virheet
-        if "GET" in format or "POST" in format:
+        # Jätetään oletuslokit pois, mutta näytetään virheet. Pyyntörivi
+        # tulee argumenttina, ei format-merkkijonossa.
+        message = format % args
+        if message.startswith(('"GET', '"HEAD', '"POST', '"DELETE')) and not message.split('" ')[-1].startswith(("4", "5")):
             return
         super().log_message(format, *args)
 
-try:
-    server = HTTPServer(("localhost", PORT), MyHTTPRequestHandler)
-    print(f"🚀 Open page: {URL}")
-    print(f"Press Ctrl+C to stop the server")
-    
-    # Avaa selain automaattisesti (valinnainen)
-    webbrowser.open(URL, new=2)
-    
-    server.serve_forever()
-except KeyboardInterrupt:
-    print("\n✅ Server stopped")
-    sys.exit(0)
-except OSError as e:
-    print(f"❌ Error: {e}")
-    print(f"Make sure port {PORT} is available")
-    sys.exit(1)
+    def do_GET(self):
+        if self.path.startswith(API_PREFIX):
+            self.handle_api("GET")
+        elif urlsplit(self.path).path == EVENTS_PATH and self.events is not None:
+            self.handle_events()
+        elif urlsplit(self.path).path == METRICS_PATH and self.metrics is not None:
+            self.handle_metrics()
+        else:
+            super().do_GET()
+
+    def handle_events(self):
+        """Pitää SSE-yhteyden auki ja kirjoittaa tapahtumat sitä mukaa kuin niitä tulee."""
+        seq = self.events.subscribe()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            self.wfile.write(b"retry: 2000\n\n")
+            self.wfile.flush()
+            while True:
+                seq, events = self.events.wait(seq)
+                # Kommenttirivi pitää yhteyden auki välityspalvelinten läpi
+                message = "".join(f"id: {n}\nevent: {name}\ndata: {data}\n\n" for n, name, data in events)
+                self.wfile.write((message or ": keepalive\n\n").encode("utf-8"))
+                self.wfile.flush()
+        except OSError:  # selain sulki välilehden
+            pass
+        # Minuuttien mittainen virta vääristäisi latenssihistogrammin
+        self._status = None
+
+    def handle_metrics(self):
+        gauges = []
+        if self.sessions is not None:
+            gauges.append(("sessions_active", "Quiz sessions currently held in memory.", len(self.sessions)))
+        body = self.metrics.prometheus(gauges).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.handle_api("POST")
+
+    def do_DELETE(self):
+        self.handle_api("DELETE")
+
+    def read_json_body(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_API_BODY:
+            self.close_connection = True
+            raise IstuntoVirhe("pyynnön runko on liian suuri", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise IstuntoVirhe("runko ei ole JSONia") from None
+        if not isinstance(body, dict):
+            raise IstuntoVirhe("rungon pitää olla JSON-objekti")
+        return body
+
+    def route_api(self, method, parts):
+        # Runko luetaan aina, jotta pysyvä yhteys pysyy tahdissa myös virheissä
+        body = self.read_json_body() if method == "POST" else None
+        if self.sessions is None or not self.path.startswith(API_PREFIX):
+            raise IstuntoVirhe("tuntematon osoite", HTTPStatus.NOT_FOUND)
+        sessions = self.sessions
+        if parts == ["exams"] and method == "GET":
+            return HTTPStatus.OK, sessions.varasto.luettelo()
+        if parts == ["sessions"] and method == "POST":
+            return HTTPStatus.CREATED, sessions.aloita(
+                body.get("exam"), body.get("count"), body.get("feedback", True)
+            )
+        if len(parts) == 2 and parts[0] == "sessions":
+            if method == "GET":
+                return HTTPStatus.OK, sessions.tila(parts[1])
+            if method == "DELETE":
+                return HTTPStatus.OK, sessions.lopeta(parts[1])
+        if len(parts) == 3 and parts[0] == "sessions":
+            if parts[2] == "question" and method == "GET":
+                return HTTPStatus.OK, sessions.kysymys(parts[1])
+            if parts[2] == "answer" and method == "POST":
+                return HTTPStatus.OK, sessions.vastaa(parts[1], body.get("index"), body.get("option"))
+        raise IstuntoVirhe("tuntematon osoite tai metodi", HTTPStatus.NOT_FOUND)
+
+    def handle_api(self, method):
+        parts = urlsplit(self.path).path[len(API_PREFIX):].strip("/").split("/")
+        try:
+            status, data = self.route_api(method, parts)
+        except IstuntoVirhe as error:
+            status, data = error.tila, {"error": str(error)}
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def cache_control(self, path):
+        query = parse_qs(urlsplit(self.path).query)
+        if HASHED_NAME.search(os.path.basename(path)) or "v" in query:
+            return CACHE_IMMUTABLE
+        return CACHE_REVALIDATE
+
+    def not_modified(self, etag, stat):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # Pakatun version tunniste ("...-gzip") viittaa samaan tiedostoversioon
+            tags = {
+                VARIANT_SUFFIX.sub('"', tag.strip().removeprefix("W/"))
+                for tag in if_none_match.split(",")
+            }
+            return "*" in tags or etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(stat.st_mtime) <= since.timestamp()
+        return False
+
+    def range_applies(self, etag, stat):
+        """If-Range: välit palvellaan vain, jos asiakkaan versio on sama kuin nykyinen."""
+        if_range = (self.headers.get("If-Range") or "").strip()
+        if not if_range:
+            return True
+        if if_range.startswith(("W/", '"')):
+            return if_range == etag
+        try:
+            since = email.utils.parsedate_to_datetime(if_range)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        return int(stat.st_mtime) == int(since.timestamp())
+
+    def is_exam_json(self, path):
+        """Tenttitiedosto vastauksineen (myös niput, hakuosat ja varaston objektit), ei manifestia."""
+        parts = os.path.normcase(os.path.relpath(path, self.directory)).split(os.sep)
+        name = parts[-1]
+        return name.lower().endswith(".json") and name != "manifest.json" and EXAM_DIRNAME in parts[:-1]
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if self.proctored and self.is_exam_json(path):
+            # Valvotussa tilassa vastaukset saa vain /api/:n kautta
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if path.endswith("/") or (stat is not None and S_ISDIR(stat.st_mode)):
+            return super().send_head()
+        try:
+            if stat is None or not S_ISREG(stat.st_mode):
+                raise FileNotFoundError(path)
+            body = FileBody(self.open_files, self.open_files.acquire(path, stat))
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            stat = body.entry.stat
+            size = stat.st_size
+            etag = file_etag(stat)
+            ctype = self.guess_type(path)
+            cache_control = self.cache_control(path)
+            encoding = None
+
+            ranges = None
+            if self.headers.get("Range") and self.range_applies(etag, stat):
+                ranges = parse_ranges(self.headers["Range"], size)
+                if ranges is not None and len(ranges) > MAX_RANGES:
+                    ranges = None  # liian pilkottu pyyntö: koko tiedosto on halvempi
+
+            # Välit lasketaan pakkaamattomasta tiedostosta
+            if ranges is None and size >= MIN_COMPRESS_SIZE and path.lower().endswith(COMPRESSIBLE_SUFFIXES):
+                variants = self.compressed_cache.get(path, stat)
+                accepted = accepted_encodings(self.headers.get("Accept-Encoding"))
+                for name in ("br", "gzip"):
+                    if name in variants and name in accepted:
+                        encoding = name
+                        break
+            response_etag = f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+            if self.not_modified(etag, stat):
+                body.close()
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", response_etag)
+                self.send_header("Cache-Control", cache_control)
+                self.end_headers()
+                return None
+
+            if ranges == []:
+                body.close()
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+
+            if encoding:
+                data = variants[encoding]
+                body.close()
+                body = BytesIO(data)
+                length = len(data)
+                self.send_response(HTTPStatus.OK)
+            elif ranges and len(ranges) == 1:
+                start, end = ranges[0]
+                length = end - start + 1
+                body.parts.append((b"", start, length))
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            elif ranges:
+                boundary = os.urandom(12).hex()
+                for n, (start, end) in enumerate(ranges):
+                    # Ensimmäisen osan edessä ei ole edellisen osan päättävää rivinvaihtoa
+                    header = (
+                        ("\r\n" if n else "") + f"--{boundary}\r\n"
+                        f"Content-Type: {ctype}\r\n"
+                        f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                    ).encode("latin-1")
+                    body.parts.append((header, start, end - start + 1))
+                body.trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+                length = sum(len(header) + count for header, _, count in body.parts) + len(body.trailer)
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                ctype = f"multipart/byteranges; boundary={boundary}"
+            else:
+                length = size
+                body.parts.append((b"", 0, size))
+                self.send_response(HTTPStatus.OK)
+
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(length))
+            self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+            self.send_header("ETag", response_etag)
+            self.send_header("Cache-Control", cache_control)
+            self.send_header("Accept-Ranges", "bytes")
+            if path.lower().endswith(COMPRESSIBLE_SUFFIXES):
+                self.send_header("Vary", "Accept-Encoding")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.end_headers()
+            return body
+        except Exception:
+            body.close()
+            raise
+
+    def copyfile(self, source, outputfile):
+        if not isinstance(source, FileBody):
+            return super().copyfile(source, outputfile)
+        for header, offset, count in source.parts:
+            if header:
+                outputfile.write(header)
+            self.send_file_range(source.entry, offset, count)
+        if source.trailer:
+            outputfile.write(source.trailer)
+
+    def send_file_range(self, entry, offset, count):
+        """Lähettää tiedoston välin: sendfile ytimessä tai varalla seek + read paloittain."""
+        if count <= 0:
+            return  # tyhjä tiedosto; socket.sendfile ei hyväksy count=0
+        if self.use_sendfile:
+            # Eksplisiittinen offset: jaetun tiedoston sijainti ei vaikuta lähetykseen
+            sent = self.connection.sendfile(entry.file, offset, count)
+        else:
+            sent = 0
+            while sent < count:
+                with entry.lock:
+                    entry.file.seek(offset + sent)
+                    chunk = entry.file.read(min(COPY_CHUNK, count - sent))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                sent += len(chunk)
+        if sent < count:
+            # Tiedosto lyheni kesken lähetyksen; Content-Length ei enää pidä
+            self.close_connection = True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Käynnistää TiTeTenttaajan web-palvelimen.")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--no-browser", action="store_true", help="Älä avaa selainta")
+    parser.add_argument(
+        "--single-threaded",
+        action="store_true",
+        help="Käytä vanhaa yksisäikeistä HTTPServeriä (vertailua varten)",
+    )
+    parser.add_argument("--exams", default=EXAMS_ROOT, help="Kansio, jonka tentit /api/ tarjoaa")
+    parser.add_argument("--no-api", action="store_true", help="Palvele vain tiedostoja, ei /api/-istuntoja")
+    parser.add_argument(
+        "--proctored",
+        action="store_true",
+        help="Valvottu tila: älä palvele tenttien JSON-tiedostoja (vain manifest.json), vastaukset vain /api/:n kautta",
+    )
+    parser.add_argument("--no-live-reload", action="store_true", help="Älä ilmoita selaimille muuttuneista tenteistä")
+    parser.add_argument("--no-metrics", action="store_true", help="Älä kerää pyyntömittareita (/metrics)")
+    parser.add_argument(
+        "--no-sendfile",
+        action="store_true",
+        help="Kopioi tiedostot Pythonin kautta sendfilen sijaan (vertailua varten)",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=METRICS_INTERVAL,
+        help="Mittariyhteenvedon tulostusväli sekunteina (0 = ei tulostusta)",
+    )
+    args = parser.parse_args(argv)
+    if args.proctored and args.no_api:
+        parser.error("--proctored vaatii /api/-istunnot (ei --no-api)")
+    return args
+
+
+class SingleThreadedHandler(MyHTTPRequestHandler):
+    # Vanha HTTPServer + HTTP/1.0: yksi pyyntö kerrallaan, ei pysyviä yhteyksiä
+    protocol_version = "HTTP/1.0"
+
+
+class QuizServer(ThreadingHTTPServer):
+    # Luokallinen avaa yhteytensä yhtä aikaa; oletusjono (5) pudottaisi niitä
+    request_queue_size = 1024
+
+
+def create_server(host, port, threaded=True, exams_dir=None, live_reload=True, metrics=None, proctored=False):
+    """Luo palvelimen. exams_dir ottaa käyttöön /api/-istunnot kyseisen kansion tenteille.
+
+    metrics on RequestMetrics, johon pyynnöt kirjataan (None = ei mittareita).
+    proctored estää tenttien JSON-tiedostot tiedostopalvelusta.
+    """
+    sessions = Istunnot(Tenttivarasto(exams_dir)) if exams_dir else None
+    if threaded:
+        events = ExamEvents() if live_reload else None
+        return QuizServer(
+            (host, port),
+            partial(
+                MyHTTPRequestHandler,
+                directory=PROJECT_ROOT,
+                sessions=sessions,
+                events=events,
+                metrics=metrics,
+                proctored=proctored,
+            ),
+        )
+    # Yksisäikeinen palvelin jumittuisi auki pysyvään SSE-yhteyteen
+    return HTTPServer(
+        (host, port),
+        partial(
+            SingleThreadedHandler, directory=PROJECT_ROOT, sessions=sessions, metrics=metrics, proctored=proctored
+        ),
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    url = f"http://{args.host}:{args.port}/WEB/index.html"
+
+    count, total, compressed = MyHTTPRequestHandler.compressed_cache.warm(WEB_ROOT)
+    encodings = "gzip + brotli" if brotli is not None else "gzip"
+    print(f"🗜️  Precompressed {count} files ({encodings}): {total // 1024} KiB → {compressed // 1024} KiB")
+
+    metrics = None if args.no_metrics else RequestMetrics()
+    if args.no_sendfile:
+        MyHTTPRequestHandler.use_sendfile = False
+    try:
+        server = create_server(
+            args.host,
+            args.port,
+            threaded=not args.single_threaded,
+            exams_dir=None if args.no_api else args.exams,
+            live_reload=not args.no_live_reload,
+            metrics=metrics,
+            proctored=args.proctored,
+        )
+        if metrics is not None and args.metrics_interval > 0:
+            metrics.start_reporter(args.metrics_interval)
+        print(f"🚀 Open page: {url}")
+        print(f"Press Ctrl+C to stop the server")
+
+        # Avaa selain automaattisesti (valinnainen)
+        if not args.no_browser:
+            webbrowser.open(url, new=2)
+
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n✅ Server stopped")
+        sys.exit(0)
+    except OSError as e:
+        print(f"❌ Error: {e}")
+        print(f"Make sure port {args.port} is available")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 #!/usr/bin/env node
 /**
  * Synchronises shared JSON exams into the Tauri frontend (src/tentit).
+ *
+ * Runs ../tentit/update_tentit.py --tauri-only, which links src/tentit to the
+ * same content-addressed objects as WEB/tentit (tentit/.store) without
+ * touching the manifest, WEB/ or the image variants. Falls back to a plain
+ * copy when Python is not available.
  */
 
 const fs = require("fs");
 const path = require("path");
+const { spawnSync } = require("child_process");
 
 const projectRoot = path.resolve(__dirname, "..");
 const sourceDir = path.resolve(projectRoot, "..", "tentit");
@@ -17,8 +23,29 @@ if (!fs.existsSync(sourceDir)) {
   process.exit(1);
 }
 
+const python = process.env.PYTHON || (process.platform === "win32" ? "python" : "python3");
+const result = spawnSync(python, [path.join(sourceDir, "update_tentit.py"), "--tauri-only"], {
+  stdio: "inherit",
+});
+
+if (result.status === 0) {
+  console.log(`Tentit päivitetty Tauri-frontille (${targetDir}).`);
+  process.exit(0);
+}
+
+console.warn(
+  `update_tentit.py epäonnistui (${result.error ? result.error.message : `koodi ${result.status}`}), kopioidaan tentit suoraan.`
+);
 fs.rmSync(targetDir, { recursive: true, force: true });
 fs.mkdirSync(targetDir, { recursive: true });
-fs.cpSync(sourceDir, targetDir, { recursive: true });
+// Only what update_tentit.py publishes: no local state (.store, .update_state.json,
+// SQLite indexes) and no Python modules.
+fs.cpSync(sourceDir, targetDir, {
+  recursive: true,
+  filter: (source) => {
+    const name = path.basename(source);
+    return source === sourceDir || !(name.startsWith(".") || name.endsWith(".py") || name === "__pycache__");
+  },
+});
 
 console.log(`Tentit päivitetty Tauri-frontille (${targetDir}).`);
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Sisältöosoitteellinen varasto tenttien tiedostoille (update_tentit.py).
+
+- Jokainen sisältö tallennetaan kerran: objects/<sha256[:2]>/<sha256[2:]><pääte>.
+  WEB/tentit/ ja tauri-app/src/tentit/ kootaan linkeiksi näihin
+  objekteihin, joten levytila ja synkronointiaika kasvavat erilaisen
+  sisällön eivätkä kopioiden mukaan.
+- Lähdetiedostosta (TENTIT/) objekti tehdään reflinkkinä tai kopiona, ei
+  koskaan kovana linkkinä: paikallaan muokattu lähde muuttaisi muuten
+  objektin sisällön sen tiivisteen alta. Päivityksen itse kirjoittamat
+  tiedostot (kuvaversiot, niput) otetaan varastoon kovina linkkeinä
+  (adopt), koska ne korvataan aina uudella tiedostolla.
+- Kuvat (Pillow asennettuna) saavat lisäksi havaintotiivisteen (dHash,
+  64 bit). Jos varastossa on saman kokoinen kuva samalla tiivisteellä ja
+  kuvat ovat pikseleittäin lähes samat (suurin ero enintään
+  PIXEL_TOLERANCE), uusi kuva viittaa olemassa olevaan objektiin (alias).
+  Näin esim. uudelleen renderöidyt samat diat tallentuvat vain kerran.
+- prune() poistaa objektit, joihin mikään synkronoitu tiedosto ei enää viittaa.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import stat
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    from PIL import Image, ImageChops
+except ImportError:  # Pillow ei ole pakollinen, kuvat deduplikoidaan silloin vain tavuittain
+    Image = None
+    ImageChops = None
+
+STORE_DIRNAME = ".store"
+OBJECTS_DIRNAME = "objects"
+INDEX_FILENAME = "index.json"
+INDEX_VERSION = 1
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+PIXEL_TOLERANCE = 16  # 0-255; riittää häviöllisen uudelleenpakkauksen kohinaan mutta ei muuttuneeseen tekstiin
+FICLONE = 0x40049409  # Linuxin ioctl reflink-kopiolle (btrfs, xfs)
+
+
+def reflink(source: Path, target: Path) -> bool:
+    """Kopioi tiedoston jakamalla levylohkot (copy-on-write). False, jos tiedostojärjestelmä ei tue."""
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        return False
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        target.unlink(missing_ok=True)
+        return False
+    shutil.copystat(source, target)
+    return True
+
+
+def perceptual_hash(path: Path) -> Optional[str]:
+    """Kuvan koko ja dHash ("LxK:heksa") tai None, jos kuvaa ei voi avata."""
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            small = image.convert("L").resize((9, 8), Image.BILINEAR)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] < pixels[row * 9 + col + 1])
+    return f"{width}x{height}:{bits:016x}"
+
+
+def same_pixels(a: Path, b: Path, tolerance: int = PIXEL_TOLERANCE) -> bool:
+    try:
+        with Image.open(a) as first, Image.open(b) as second:
+            if first.size != second.size:
+                return False
+            difference = ImageChops.difference(first.convert("RGBA"), second.convert("RGBA"))
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return False
+    return max(high for _, high in difference.getextrema()) <= tolerance
+
+
+def _copy_or_reflink(source: Path, target: Path) -> None:
+    if not reflink(source, target):
+        shutil.copy2(source, target)
+
+
+class AssetStore:
+    """Tiedostot sisällön SHA-256-tiivisteen mukaan; hakemisto tallennetaan index.jsoniin."""
+
+    def __init__(self, root: Path, perceptual: bool = True):
+        self.root = root
+        self.objects = root / OBJECTS_DIRNAME
+        self.perceptual = perceptual and Image is not None
+        self.stored = 0
+        self.reused = 0
+        self.aliased = 0
+        try:
+            index = json.loads((root / INDEX_FILENAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            index = {}
+        if index.get("version") != INDEX_VERSION:
+            index = {"version": INDEX_VERSION}
+        self._index: Dict[str, Any] = index
+        # tiiviste -> samannäköisen kuvan tiiviste, jonka objektia käytetään
+        self.aliases: Dict[str, str] = index.setdefault("aliases", {})
+        # havaintotiiviste -> varastossa olevien kuvien tiivisteet
+        self.images: Dict[str, list] = index.setdefault("images", {})
+
+    def object_path(self, digest: str, suffix: str) -> Path:
+        return self.objects / digest[:2] / f"{digest[2:]}{suffix.lower()}"
+
+    def put(self, source: Path, digest: str, adopt: bool = False) -> Path:
+        """Palauttaa sisällön objektin polun ja tallentaa sisällön, jos sitä ei vielä ole."""
+        suffix = source.suffix
+        canonical = self.aliases.get(digest)
+        if canonical is not None and self.object_path(canonical, suffix).exists():
+            self.reused += 1
+            return self.object_path(canonical, suffix)
+        path = self.object_path(digest, suffix)
+        if path.exists():
+            self.reused += 1
+            return path
+
+        key = None
+        if self.perceptual and suffix.lower() in IMAGE_SUFFIXES:
+            key = perceptual_hash(source)
+            for other in self.images.get(key, []) if key else []:
+                candidate = self.object_path(other, suffix)
+                if candidate.exists() and same_pixels(source, candidate):
+                    self.aliases[digest] = other
+                    self.aliased += 1
+                    return candidate
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        if adopt:
+            try:
+                os.link(source, tmp)
+            except OSError:
+                _copy_or_reflink(source, tmp)
+        else:
+            _copy_or_reflink(source, tmp)
+            # Objektia ei muokata; kirjoitussuojaus estää vahingot linkkien kautta. Windowsissa
+            # kirjoitussuojattua tiedostoa (tai sen linkkiä WEB-kansiossa) ei voisi korvata.
+            if os.name != "nt":
+                os.chmod(tmp, stat.S_IMODE(tmp.stat().st_mode) & ~0o222)
+        os.replace(tmp, path)
+        if key:
+            self.images.setdefault(key, []).append(digest)
+        self.stored += 1
+        return path
+
+    def prune(self, live: Iterable[str]) -> int:
+        """Poistaa objektit, joiden tiivistettä (tai aliasta) ei ole live-joukossa. Palauttaa määrän."""
+        live = set(live)
+        for digest in list(self.aliases):
+            if digest not in live:
+                del self.aliases[digest]
+        live.update(self.aliases.values())
+        removed = 0
+        if self.objects.is_dir():
+            for path in self.objects.glob("*/*"):
+                digest = path.parent.name + path.name.split(".", 1)[0]
+                if path.name.endswith(".tmp") or digest not in live:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        for key in list(self.images):
+            kept = [digest for digest in self.images[key] if digest in live]
+            if kept:
+                self.images[key] = kept
+            else:
+                del self.images[key]
+        return removed
+
+    def usage(self) -> tuple[int, int]:
+        """(objekteja, tavuja) varastossa."""
+        count = size = 0
+        if self.objects.is_dir():
+            for path in self.objects.glob("*/*"):
+                count += 1
+                size += path.stat().st_size
+        return count, size
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (INDEX_FILENAME + ".tmp")
+        tmp.write_text(json.dumps(self._index, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.root / INDEX_FILENAME)
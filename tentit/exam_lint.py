@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Tenttitiedostojen tarkistus julkaisun yhteydessä (update_tentit.py).
+
+- Jokainen tentti jäsennetään kerran prosessipoolissa samalla
+  läpikäynnillä, jolla komentoriviversion indeksi (tenttipankki.py,
+  skannaa_tentti) laskee kelvollisten kysymysten siirtymät.
+- Virheet raportoidaan kääntäjän tapaan muodossa tiedosto:rivi:sarake:
+  JSON-virheet, puuttuva tai vaihtoehdoista puuttuva oikea vastaus,
+  puuttuvat tai toistuvat vaihtoehdot, kuvat joita ei ole ja saman
+  kysymyksen toistuminen tentissä.
+- Skannatut rivit tallennetaan tenttikansion indeksiin, joten
+  komentoriviversio löytää tentit valmiiksi validoituina eikä jäsennä niitä
+  uudelleen tenttiä aloittaessaan.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from image_variants import normalize_ref
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tenttipankki import UTF8_BOM, IndeksiRivi, Kysymys, skannaa_tentti  # noqa: E402
+
+# Kasvatetaan, kun tarkistukset muuttuvat, jotta update_tentit.py:n välimuisti vanhenee
+LINT_VERSION = 2
+ERROR = "virhe"
+WARNING = "varoitus"
+
+
+class Issue(NamedTuple):
+    line: int
+    column: int
+    severity: str
+    message: str
+
+
+@dataclass
+class LintResult:
+    file: str
+    row: IndeksiRivi
+    issues: List[Issue] = field(default_factory=list)
+    # Kuvat tarkistetaan pääprosessissa, koska ne voivat muuttua ilman tenttiä
+    images: List[Tuple[str, int, int]] = field(default_factory=list)
+
+
+class Positions:
+    """Muuntaa tavusiirtymän riviksi ja sarakkeeksi (1-alkuisia, sarake merkkeinä)."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.newlines = [m.start() for m in re.finditer(b"\n", data)]
+
+    def __call__(self, offset: int) -> Tuple[int, int]:
+        line = bisect.bisect_left(self.newlines, offset)
+        start = self.newlines[line - 1] + 1 if line else 0
+        if start == 0 and self.data.startswith(UTF8_BOM):
+            start = len(UTF8_BOM)
+        return line + 1, len(self.data[start:offset].decode("utf-8", "replace")) + 1
+
+
+def question_key(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def short(text: Any, limit: int = 50) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def check_question(q: Any, line: int, column: int, seen: dict, result: LintResult) -> None:
+    issues = result.issues
+
+    def report(severity: str, message: str) -> None:
+        issues.append(Issue(line, column, severity, message))
+
+    if not isinstance(q, dict):
+        report(ERROR, "kysymys ei ole JSON-objekti")
+        return
+    text = q.get("question")
+    if not isinstance(text, str) or not text.strip():
+        report(WARNING, "kysymysteksti (question) puuttuu")
+    else:
+        key = question_key(text)
+        if key in seen:
+            report(WARNING, f"sama kysymys kuin rivillä {seen[key]}: \"{short(text)}\"")
+        else:
+            seen[key] = line
+
+    options = q.get("options")
+    if not isinstance(options, list) or not options:
+        report(ERROR, "vaihtoehdot (options) puuttuvat")
+        options = None
+    else:
+        counted = set()
+        for option in options:
+            label = json.dumps(option, ensure_ascii=False)
+            if label not in counted and options.count(option) > 1:
+                report(ERROR, f"vaihtoehto {short(label)} on listassa {options.count(option)} kertaa")
+            counted.add(label)
+
+    if "correct" not in q:
+        report(ERROR, "oikea vastaus (correct) puuttuu")
+    elif options is not None and q["correct"] not in options:
+        report(ERROR, f"oikea vastaus {short(json.dumps(q['correct'], ensure_ascii=False))} ei ole vaihtoehdoissa")
+
+    image = q.get("image")
+    if image is not None:
+        if isinstance(image, str) and image.strip():
+            result.images.append((image, line, column))
+        else:
+            report(ERROR, "image ei ole kuvan polku")
+
+
+def parse_error(data: bytes, row: IndeksiRivi, positions: Positions) -> Issue:
+    """Jäsennysvirhe json.loadsin sijainnilla; jos se hyväksyy tiedoston, virtalukijan oma virhe."""
+    try:
+        json.loads(data.decode("utf-8-sig"))
+    except UnicodeDecodeError as exc:
+        return Issue(1, 1, ERROR, f"tiedosto ei ole UTF-8:aa ({exc.reason} tavussa {exc.start})")
+    except json.JSONDecodeError as exc:
+        return Issue(exc.lineno, exc.colno, ERROR, f"JSON-virhe: {exc.msg}")
+    # Kelvollinen JSON, jota virtalukija ei osannut lukea: vika on lukijassa, ei tentissä
+    offset, message = row.virhe or (0, "tuntematon virhe")
+    return Issue(*positions(offset), ERROR, f"virtalukija ei pystynyt lukemaan kelvollista JSONia ({message})")
+
+
+def is_reading_material(data: bytes) -> bool:
+    """Lukumateriaalissa ({"isReadingMaterial": true, "content": [...]}) ei ole kysymyksiä."""
+    try:
+        parsed = json.loads(data.decode("utf-8-sig"))
+    except ValueError:
+        return False
+    return isinstance(parsed, dict) and parsed.get("isReadingMaterial") is True
+
+
+def lint_file(path: str) -> LintResult:
+    """Tarkistaa yhden tentin ja skannaa sen indeksiriviksi. Ajetaan prosessipoolissa."""
+    name = os.path.basename(path)
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    positions = Positions(data)
+    seen: dict = {}
+    result = LintResult(name, IndeksiRivi(name, stat.st_mtime_ns, stat.st_size, None, 0, False))
+
+    def check(start: int, end: int, q: Any, normalized: Optional[Kysymys]) -> None:
+        check_question(q, *positions(start), seen, result)
+
+    result.row = skannaa_tentti(path, name, stat, check)
+    if not result.row.kelvollinen:
+        result.issues.append(parse_error(data, result.row, positions))
+    elif not result.row.siirtymat and not is_reading_material(data):
+        result.issues.append(Issue(1, 1, ERROR, "tentissä ei ole yhtään kelvollista kysymystä"))
+    return result
+
+
+def lint_files(paths: Sequence[Path], jobs: Optional[int] = None) -> List[LintResult]:
+    """Tarkistaa tentit rinnakkain; tulokset ovat samassa järjestyksessä kuin polut."""
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    if jobs <= 1:
+        return [lint_file(str(path)) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(lint_file, map(str, paths)))
+
+
+def check_images(images: Sequence[Sequence[Any]], source_dir: Path) -> List[Issue]:
+    issues = []
+    for ref, line, column in images:
+        if not (source_dir / normalize_ref(ref)).is_file():
+            issues.append(Issue(line, column, ERROR, f"kuvaa {ref} ei löydy"))
+    return issues
+
+
+def format_issue(file: str, issue: Issue) -> str:
+    return f"{file}:{issue.line}:{issue.column}: {issue.severity}: {issue.message}"
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Luo tenttikuvista verkkoon optimoidut versiot (WebP/AVIF useassa leveydessä).
+
+- Versiot kirjoitetaan WEB/tentit/variants/ -kansioon, joten images/
+  pysyy lähteen peilinä.
+- Jokaisesta kuvasta palautetaan metatiedot (mitat ja versiot), jotka
+  update_tentit.py liittää manifest.jsonin merkintöihin. Selain voi niiden
+  avulla käyttää srcsetiä ja varata kuvalle tilan etukäteen.
+- Vain uudet ja muuttuneet lähdekuvat enkoodataan (tiiviste tilatiedostossa),
+  ja enkoodaus tehdään prosessipoolissa.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow ei ole pakollinen, kuvat kopioidaan silloin sellaisenaan
+    Image = None
+    features = None
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+VARIANT_WIDTHS: tuple[int, ...] = (480, 960, 1600)
+VARIANT_DIRNAME = "variants"
+TYPICAL_WIDTH = 960  # raportointiin: tavallisen näytön lataama versio
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+ENCODE_OPTIONS: Dict[str, Dict[str, Any]] = {
+    "avif": {"quality": 55, "speed": 6},
+    "webp": {"quality": 80, "method": 5},
+}
+
+
+def available_formats() -> List[str]:
+    """Palauttaa Pillow-asennuksen tukemat formaatit parhaasta huonoimpaan."""
+    if Image is None:
+        return []
+    return [fmt for fmt in ("avif", "webp") if features.check(fmt)]
+
+
+def variant_widths(width: int, widths: tuple[int, ...] = VARIANT_WIDTHS) -> List[int]:
+    """Leveydet, joihin kuva skaalataan. Kuvaa ei koskaan suurenneta."""
+    result = [w for w in widths if w < width]
+    if len(result) < len(widths):
+        result.append(width)
+    return result
+
+
+def encode_variants(source: str, rel_stem: str, out_dir: str, formats: List[str]) -> Dict[str, Any]:
+    """Enkoodaa yhden kuvan versiot. Ajetaan prosessipoolissa."""
+    out_base = Path(out_dir)
+    variants = []
+    with Image.open(source) as image:
+        image.load()
+        width, height = image.size
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for target_width in variant_widths(width):
+            target_height = max(1, round(height * target_width / width))
+            resized = image if target_width == width else image.resize(
+                (target_width, target_height), Image.LANCZOS
+            )
+            for fmt in formats:
+                rel = f"{VARIANT_DIRNAME}/{rel_stem}-{target_width}.{fmt}"
+                path = out_base / rel
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(path.name + ".tmp")
+                resized.save(tmp, format=fmt.upper(), **ENCODE_OPTIONS[fmt])
+                os.replace(tmp, path)
+                variants.append(
+                    {
+                        "src": f"./{rel}",
+                        "type": MIME_TYPES[fmt],
+                        "width": target_width,
+                        "bytes": path.stat().st_size,
+                    }
+                )
+    return {"width": width, "height": height, "variants": variants}
+
+
+def build_image_variants(
+    source_dir: Path,
+    target_dir: Path,
+    state: Any,
+    jobs: Optional[int] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Päivittää kuvaversiot ja palauttaa metatiedot avaimella "images/<polku>".
+
+    state on update_tentit.SyncState; sen digest() antaa lähteen tiivisteen ja
+    data["images"] muistaa edellisen ajon tulokset.
+    """
+    formats = available_formats()
+    cache: Dict[str, Any] = state.data.setdefault("images", {})
+    source_images = source_dir / "images"
+    if not formats:
+        print("⚠️ Pillow puuttuu tai ei tue WebP/AVIF-muotoa, ohitetaan kuvaversiot")
+        return {}
+
+    sources = {}
+    if source_images.is_dir():
+        for file in sorted(source_images.rglob("*")):
+            if file.is_file() and file.suffix.lower() in IMAGE_SUFFIXES:
+                sources[file.relative_to(source_dir).as_posix()] = file
+
+    metadata: Dict[str, Dict[str, Any]] = {}
+    todo = []
+    for rel, file in sources.items():
+        digest = state.digest(file)
+        cached = cache.get(rel)
+        if (
+            cached
+            and cached.get("sha256") == digest
+            and cached.get("formats") == formats
+            and all((target_dir / v["src"]).exists() for v in cached["meta"]["variants"])
+        ):
+            metadata[rel] = cached["meta"]
+            continue
+        todo.append((rel, file, digest))
+
+    if todo:
+        print(f"🖼️  Enkoodataan {len(todo)} kuvaa ({', '.join(formats)})...")
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                rel: (
+                    pool.submit(
+                        encode_variants,
+                        str(file),
+                        Path(rel).relative_to("images").with_suffix("").as_posix(),
+                        str(target_dir),
+                        formats,
+                    ),
+                    digest,
+                )
+                for rel, file, digest in todo
+            }
+            for rel, (future, digest) in futures.items():
+                meta = future.result()
+                old = cache.get(rel)
+                if old:
+                    keep = {v["src"] for v in meta["variants"]}
+                    for variant in old["meta"]["variants"]:
+                        if variant["src"] not in keep:
+                            (target_dir / variant["src"]).unlink(missing_ok=True)
+                cache[rel] = {"sha256": digest, "formats": formats, "meta": meta}
+                metadata[rel] = meta
+
+    removed = [rel for rel in cache if rel not in sources]
+    for rel in removed:
+        for variant in cache.pop(rel)["meta"]["variants"]:
+            (target_dir / variant["src"]).unlink(missing_ok=True)
+
+    original = sum(sources[rel].stat().st_size for rel in metadata)
+    typical = sum(typical_variant_bytes(meta) for meta in metadata.values())
+    print(
+        f"🖼️  Kuvaversiot: {len(todo)} enkoodattu, {len(metadata) - len(todo)} ohitettu, "
+        f"{len(removed)} poistettu. Alkuperäiset {original / 1e6:.1f} MB → "
+        f"{TYPICAL_WIDTH}px-versiot {typical / 1e6:.1f} MB"
+    )
+    return metadata
+
+
+def typical_variant_bytes(meta: Dict[str, Any]) -> int:
+    """Pienimmän formaatin koko leveimmässä versiossa, joka on enintään TYPICAL_WIDTH."""
+    widths = [v["width"] for v in meta["variants"]]
+    fitting = [w for w in widths if w <= TYPICAL_WIDTH]
+    width = max(fitting) if fitting else min(widths)
+    return min(v["bytes"] for v in meta["variants"] if v["width"] == width)
+
+
+def manifest_meta(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Manifestiin tallennettava osa metatiedoista (ilman tavumääriä)."""
+    return {
+        "width": meta["width"],
+        "height": meta["height"],
+        "variants": [{k: v[k] for k in ("src", "type", "width")} for v in meta["variants"]],
+    }
+
+
+def image_refs(data: Any) -> List[str]:
+    """Kerää tenttidatasta kaikki "image"-kenttien arvot esiintymisjärjestyksessä."""
+    refs: List[str] = []
+
+    def walk(obj: Any) -> None:
+        if isinstance(obj, dict):
+            image = obj.get("image")
+            if isinstance(image, str) and image not in refs:
+                refs.append(image)
+            for value in obj.values():
+                walk(value)
+        elif isinstance(obj, list):
+            for item in obj:
+                walk(item)
+
+    walk(data)
+    return refs
+
+
+def normalize_ref(ref: str) -> str:
+    """"./images/x.png" → "images/x.png" (avain build_image_variantsin metatiedoissa)."""
+    return ref[2:] if ref.startswith("./") else ref.lstrip("/")
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Lähes samojen kysymysten raportti kaikista tenteistä (MinHash + LSH).
+
+Käyttö:
+    python TENTIT/near_duplicates.py
+    python TENTIT/near_duplicates.py --threshold 0.6 --limit 20 --json duplikaatit.json
+
+- Kysymys (kelvollinen, tenttipankki.normalisoi_kysymys) pilkotaan
+  sanoiksi haku.py:n normalisoinnilla (ä -> a, kirjainkoko yhdistetty).
+  Sanoista otetaan STEM ensimmäistä merkkiä, jotta taivutusmuodot
+  ("vastuksen", "vastus") osuvat yhteen. Vertailtava joukko on kysymyksen
+  ja vaihtoehtojen sanat sekä kysymyksen peräkkäiset sanaparit;
+  vaihtoehtojen järjestyksellä ei siis ole väliä.
+- Joukosta lasketaan SIGNATURE_SIZE arvon MinHash-allekirjoitus. Kunkin
+  sanan SIGNATURE_SIZE hajautusarvoa (32 bit) saadaan yhdellä
+  SHAKE-128-tiivisteellä, ja allekirjoitus on niiden kohdittainen minimi
+  (min(map(...)) pysyy C-koodissa, mikä on puhtaalla Pythonilla
+  moninkertaisesti nopeampaa kuin permutaatioiden laskeminen). Allekirjoitukset
+  tallennetaan tiedostoittain välimuistiin (CACHE_FILE), ja tenttitiedosto
+  tiivistetään uudelleen vain, jos sen SHA-256 muuttui. Muuttuneet tentit
+  käsitellään prosessipoolissa.
+- LSH: allekirjoitus jaetaan BANDS kaistaan. Kysymykset, joiden jokin
+  kaista on sama, ovat ehdokkaita. Ehdokas verrataan kaistan ensimmäiseen
+  kysymykseen, ja jos arvioitu Jaccard-samankaltaisuus (samojen
+  allekirjoitusarvojen osuus) on vähintään --threshold, ne yhdistetään
+  samaan ryhmään (union-find). Kukin kysymys käsitellään kerran kaistaa
+  kohden, joten aika kasvaa lähes lineaarisesti kysymysten määrän mukaan
+  eikä pareittain.
+
+Raportti listaa ensin tenttiparit, joilla on eniten yhteisiä kysymyksiä,
+ja sitten ryhmät suurimmasta alkaen. Kysymyksen numero lasketaan tentin
+kelvollisista kysymyksistä kuten hakuindeksissä.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sqlite3
+import sys
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import combinations
+from operator import eq
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR.parent))
+from haku import sanat  # noqa: E402
+from tenttipankki import KysymysVirta, normalisoi_kysymys  # noqa: E402
+from update_tentit import exam_files, file_digest  # noqa: E402
+
+CACHE_FILE = ".near_duplicates.sqlite"
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+STEM = 6
+LABEL_LENGTH = 120
+# Muutetaan, kun allekirjoitusten laskenta muuttuu; vanha välimuisti hylätään
+CACHE_VERSION = f"1:{SIGNATURE_SIZE}:{STEM}"
+
+_unpack_hashes = struct.Struct(f"<{SIGNATURE_SIZE}I").unpack
+
+
+class BankSignatures(NamedTuple):
+    file: str
+    labels: List[str]  # kysymystekstit (lyhennetty) kelvollisten kysymysten järjestyksessä
+    numbers: List[int]  # kysymyksen numero kelvollisten joukossa (1-alkuinen)
+    signatures: array  # len(labels) * SIGNATURE_SIZE arvoa peräkkäin
+
+
+@lru_cache(maxsize=1 << 14)
+def shingle_hashes(shingle: str) -> Tuple[int, ...]:
+    return _unpack_hashes(hashlib.shake_128(shingle.encode("utf-8")).digest(SIGNATURE_SIZE * 4))
+
+
+def shingles(question: str, options: Iterable[str]) -> set:
+    words = [word[:STEM] for word in sanat(question)]
+    result = set(words)
+    result.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for option in options:
+        result.update(word[:STEM] for word in sanat(option))
+    return result
+
+
+def minhash(items: set) -> List[int]:
+    return list(map(min, zip(*map(shingle_hashes, items))))
+
+
+def similarity(signatures: array, i: int, j: int) -> float:
+    """Arvioitu Jaccard-samankaltaisuus: samojen allekirjoitusarvojen osuus."""
+    a = signatures[i * SIGNATURE_SIZE : (i + 1) * SIGNATURE_SIZE]
+    b = signatures[j * SIGNATURE_SIZE : (j + 1) * SIGNATURE_SIZE]
+    return sum(map(eq, a, b)) / SIGNATURE_SIZE
+
+
+def short(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= LABEL_LENGTH else text[: LABEL_LENGTH - 1] + "…"
+
+
+def sign_bank(path: str) -> BankSignatures:
+    """Laskee tentin kysymysten allekirjoitukset. Ajetaan prosessipoolissa."""
+    labels = []
+    numbers = []
+    signatures = array("I")
+    number = 0
+    try:
+        for q in KysymysVirta(path, siirtymat=False):
+            normalized = normalisoi_kysymys(q)
+            if normalized is None:
+                continue
+            number += 1
+            items = shingles(normalized.kysymys, normalized.vaihtoehdot)
+            if not items:
+                continue
+            labels.append(short(normalized.kysymys))
+            numbers.append(number)
+            signatures.extend(minhash(items))
+    except (OSError, UnicodeDecodeError, ValueError):
+        pass  # exam_lint.py raportoi rikkinäiset tentit
+    return BankSignatures(os.path.basename(path), labels, numbers, signatures)
+
+
+class SignatureCache:
+    """Allekirjoitukset tiedostoittain SQLitessä; tiiviste lasketaan vain, jos mtime tai koko muuttui."""
+
+    def __init__(self, path: Path):
+        self._db = sqlite3.connect(str(path))
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        version = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if not version or version[0] != CACHE_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS banks")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (CACHE_VERSION,))
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS banks (
+                file TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                numbers BLOB NOT NULL,
+                signatures BLOB NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def load(self, path: Path) -> Tuple[Optional[BankSignatures], str]:
+        """Palauttaa (välimuistin allekirjoitukset tai None, tiedoston tiiviste)."""
+        stat = path.stat()
+        row = self._db.execute(
+            "SELECT mtime_ns, size, sha256, labels, numbers, signatures FROM banks WHERE file = ?", (path.name,)
+        ).fetchone()
+        if row and (row[0], row[1]) == (stat.st_mtime_ns, stat.st_size):
+            digest = row[2]
+        else:
+            digest = file_digest(path)
+        if not row or row[2] != digest:
+            return None, digest
+        if (row[0], row[1]) != (stat.st_mtime_ns, stat.st_size):
+            self._db.execute(
+                "UPDATE banks SET mtime_ns = ?, size = ? WHERE file = ?", (stat.st_mtime_ns, stat.st_size, path.name)
+            )
+        numbers = array("I")
+        numbers.frombytes(row[4])
+        signatures = array("I")
+        signatures.frombytes(row[5])
+        return BankSignatures(path.name, json.loads(row[3]), numbers.tolist(), signatures), digest
+
+    def store(self, path: Path, digest: str, bank: BankSignatures) -> None:
+        stat = path.stat()
+        self._db.execute(
+            "INSERT OR REPLACE INTO banks VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                bank.file,
+                stat.st_mtime_ns,
+                stat.st_size,
+                digest,
+                json.dumps(bank.labels, ensure_ascii=False),
+                array("I", bank.numbers).tobytes(),
+                bank.signatures.tobytes(),
+            ),
+        )
+
+    def prune(self, keep: Iterable[str]) -> None:
+        keep = set(keep)
+        for (name,) in self._db.execute("SELECT file FROM banks").fetchall():
+            if name not in keep:
+                self._db.execute("DELETE FROM banks WHERE file = ?", (name,))
+
+    def commit(self) -> None:
+        self._db.commit()
+
+
+def load_signatures(
+    paths: Sequence[Path], cache_path: Path, jobs: Optional[int] = None
+) -> Tuple[List[BankSignatures], int]:
+    """Allekirjoitukset kaikille tenteille; muuttuneet lasketaan rinnakkain. Palauttaa (pankit, laskettu)."""
+    cache = SignatureCache(cache_path)
+    try:
+        banks: Dict[str, BankSignatures] = {}
+        todo = []
+        for path in paths:
+            bank, digest = cache.load(path)
+            if bank is None:
+                todo.append((path, digest))
+            else:
+                banks[path.name] = bank
+        jobs = min(jobs or os.cpu_count() or 1, len(todo))
+        names = [str(path) for path, _ in todo]
+        if jobs <= 1:
+            results = map(sign_bank, names)
+        else:
+            pool = ProcessPoolExecutor(max_workers=jobs)
+            results = pool.map(sign_bank, names)
+        try:
+            for (path, digest), bank in zip(todo, results):
+                cache.store(path, digest, bank)
+                banks[path.name] = bank
+        finally:
+            if jobs > 1:
+                pool.shutdown()
+        cache.prune(banks)
+        cache.commit()
+    finally:
+        cache.close()
+    return [banks[path.name] for path in paths], len(todo)
+
+
+class Group(NamedTuple):
+    members: List[Tuple[int, int, float]]  # (pankin indeksi, kysymyksen indeksi, samankaltaisuus ensimmäiseen)
+
+
+def find_groups(banks: Sequence[BankSignatures], threshold: float) -> List[Group]:
+    """Ryhmittelee lähes samat kysymykset LSH:lla; ryhmät suurimmasta pienimpään."""
+    signatures = array("I")
+    owners = []  # globaali indeksi -> (pankki, kysymys)
+    for b, bank in enumerate(banks):
+        signatures.extend(bank.signatures)
+        owners.extend((b, q) for q in range(len(bank.labels)))
+    parent = list(range(len(owners)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    data = signatures.tobytes()
+    row_bytes = ROWS * signatures.itemsize
+    for band in range(BANDS):
+        buckets: Dict[bytes, int] = {}
+        offset = band * row_bytes
+        step = SIGNATURE_SIZE * signatures.itemsize
+        for i in range(len(owners)):
+            start = i * step + offset
+            key = data[start : start + row_bytes]
+            first = buckets.setdefault(key, i)
+            if first != i:
+                a, b = find(first), find(i)
+                if a != b and similarity(signatures, first, i) >= threshold:
+                    parent[max(a, b)] = min(a, b)
+
+    components: Dict[int, List[int]] = {}
+    for i in range(len(owners)):
+        components.setdefault(find(i), []).append(i)
+    groups = []
+    for root, members in components.items():
+        if len(members) > 1:
+            groups.append(Group([(*owners[i], similarity(signatures, root, i)) for i in members]))
+    groups.sort(key=lambda g: (-len(g.members), g.members[0][:2]))
+    return groups
+
+
+def file_overlaps(banks: Sequence[BankSignatures], groups: Sequence[Group]) -> List[Tuple[str, str, int]]:
+    """Tenttiparit ja niiden yhteisten kysymysryhmien määrä (sama tentti = toisto tentin sisällä)."""
+    counts: Counter = Counter()
+    for group in groups:
+        files = sorted({bank for bank, _, _ in group.members})
+        if len(files) == 1:
+            counts[files[0], files[0]] += 1
+        for pair in combinations(files, 2):
+            counts[pair] += 1
+    return [(banks[a].file, banks[b].file, n) for (a, b), n in counts.most_common()]
+
+
+def report_json(banks: Sequence[BankSignatures], groups: Sequence[Group], threshold: float) -> dict:
+    return {
+        "threshold": threshold,
+        "groups": [
+            [
+                {
+                    "file": banks[b].file,
+                    "question": banks[b].numbers[q],
+                    "text": banks[b].labels[q],
+                    "similarity": round(sim, 3),
+                }
+                for b, q, sim in group.members
+            ]
+            for group in groups
+        ],
+    }
+
+
+def print_report(
+    banks: Sequence[BankSignatures], groups: Sequence[Group], limit: int, elapsed: float, signed: int
+) -> None:
+    questions = sum(len(bank.labels) for bank in banks)
+    duplicated = sum(len(group.members) for group in groups)
+    print(
+        f"🔁 {len(groups)} lähes samojen kysymysten ryhmää, {duplicated} kysymystä "
+        f"({len(banks)} tenttiä, {questions} kysymystä, {signed} tiivistetty uudelleen, {elapsed:.2f} s)"
+    )
+    overlaps = file_overlaps(banks, groups)
+    if overlaps:
+        print("\nPäällekkäisimmät tentit:")
+        for a, b, count in overlaps[:10]:
+            print(f"  {count:>6}  {a}" + (f" ↔ {b}" if a != b else " (tentin sisällä)"))
+    if groups and limit:
+        print("\nRyhmät:")
+        for n, group in enumerate(groups[:limit], 1):
+            print(f"  [{n}] {len(group.members)} kysymystä")
+            for b, q, sim in group.members:
+                bank = banks[b]
+                print(f"      {bank.file} #{bank.numbers[q]} ({sim:.2f}): {bank.labels[q]}")
+        if len(groups) > limit:
+            print(f"  ... ja {len(groups) - limit} ryhmää lisää (--limit)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Etsii lähes samat kysymykset kaikista tenteistä")
+    parser.add_argument("--threshold", type=float, default=0.7, help="Arvioitu Jaccard-raja 0-1 (oletus 0.7)")
+    parser.add_argument("--limit", type=int, default=50, help="Tulostettavien ryhmien enimmäismäärä")
+    parser.add_argument("--json", metavar="POLKU", help="Tallenna koko raportti JSONina")
+    parser.add_argument("--jobs", type=int, default=None, help="Rinnakkaiset prosessit")
+    parser.add_argument("--dir", default=str(SCRIPT_DIR), help="Tenttikansio (oletus: tämän skriptin kansio)")
+    args = parser.parse_args()
+    if not 0 < args.threshold <= 1:
+        parser.error("--threshold pitää olla välillä 0-1")
+
+    started = time.perf_counter()
+    tentit_dir = Path(args.dir)
+    paths = sorted(exam_files(tentit_dir))
+    banks, signed = load_signatures(paths, tentit_dir / CACHE_FILE, args.jobs)
+    groups = find_groups(banks, args.threshold)
+    print_report(banks, groups, args.limit, time.perf_counter() - started, signed)
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps(report_json(banks, groups, args.threshold), ensure_ascii=False, indent=1) + "\n",
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,25 +4,84 @@ Päivittää manifest.jsonin tentit-hakemiston JSON-tiedostojen perusteella
 ja kopioi kaiken myös WEB/tentit/ -kansioon.
 
 - Luo automaattisesti WEB/tentit/ jos sitä ei ole.
+- Sisältö tallennetaan kerran varastoon TENTIT/.store (asset_store.py),
+  ja WEB/tentit/ sekä tauri-app/src/tentit/ kootaan linkeiksi sen
+  objekteihin. Samannäköiset kuvat (havaintotiiviste) jakavat objektin.
+  --no-store linkittää lähteet suoraan kuten ennen, --no-tauri ohittaa
+  Tauri-kopion ja --tauri-only päivittää vain sen (sync-assets.cjs).
 - Hakee kaikki *.json-tiedostot (mutta ohittaa manifest.jsonin).
 - Lukee otsikon JSON-tiedoston TITLE-kentästä (tai fallback tiedostonimestä).
 - Lukee järjestysnumeron ORDER-kentästä (jos on).
-- Poistaa vanhan manifest.jsonin ennen uuden luontia (täysi päivitys).
 - Lisää kategorian tiedostonimen perusteella.
 - Luo luettavat otsikot (säilyttää ääkköset).
+- Inkrementaalinen synkronointi: tilatiedostoon (.update_state.json)
+  tallennetaan tiedostojen sisältötiivisteet ja mtimet, jolloin vain
+  lisätyt ja muuttuneet tiedostot jäsennetään ja kopioidaan, poistetut
+  poistetaan kohteesta. Kopiointi käyttää reflinkkiä tai kovaa linkkiä,
+  jos tiedostojärjestelmä sallii. --full tekee täyden päivityksen.
+- Jokainen merkintä saa sisältötiivisteen ("hash"), kuten myös sen kuvat.
+  Selain hakee tiedostot osoitteella tiedosto?v=<hash>, joten ne voidaan
+  välimuistittaa pysyvästi ja vain manifest.json tarkistetaan palvelimelta.
+- Kirjoittaa WEB/precache.jsonin, jonka perusteella WEB/sw.js tallentaa
+  sovelluksen, manifestin ja tentit selaimen välimuistiin offline-käyttöä
+  varten (kuvat vain ajonaikaiseen välimuistiin).
+- Rakentaa kysymysten hakuindeksin (haku.py) kansioon search/, josta se
+  kopioidaan WEB/tentit/search/. Muuttumattomien tenttien sanat otetaan
+  tilatiedostosta. --no-search ohittaa haun.
+- Tarkistaa muuttuneet tentit prosessipoolissa (exam_lint.py) ja
+  raportoi virheet muodossa tiedosto:rivi:sarake. Tarkistuksen
+  skannaamat tentit tallennetaan komentoriviversion indeksiin, joten
+  tenttiä ei validoida uudelleen sitä aloitettaessa. --strict keskeyttää
+  julkaisun virheisiin, --no-lint ohittaa tarkistuksen.
+- --bundles kokoaa lisäksi kunkin kategorian tentit yhteen minifioituun
+  tiedostoon (bundles/<kategoria>.<hash>.json).
+- --watch jää seuraamaan kansiota (Linuxissa inotify, muualla tai --poll-
+  valitsimella mtimejen vertailu). Tallennusryöpyt kootaan yhteen
+  (--debounce), ja muuttuneista tenttitiedostoista päivitetään vain niiden
+  merkinnät manifestiin samaan järjestykseen, hakuindeksi ja WEB-kopiot.
+  Kuvien muutos ajaa tavallisen inkrementaalisen päivityksen. start_web.py
+  huomaa WEB/tentit/manifest.jsonin muuttuneen ja ilmoittaa avoimille
+  välilehdille (SSE), joten ne lataavat muuttuneen tentin uudelleen.
 """
 
 from __future__ import annotations
+import argparse
+import hashlib
 import json
+import os
 import re
+import select
 import shutil
+import struct
+import time
 import unicodedata
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, List
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import quote
+
+from asset_store import STORE_DIRNAME, AssetStore, reflink
+from exam_lint import ERROR, LINT_VERSION, Issue, check_images, format_issue, lint_files
+from image_variants import VARIANT_DIRNAME, build_image_variants, image_refs, manifest_meta, normalize_ref
+
+# haku.py on projektin juuressa, jotta komentoriviversio käyttää samaa normalisointia
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from haku import HAKUINDEKSI, HAKUKANSIO, hakudokumentit, kirjoita_hakuindeksi  # noqa: E402
+from tenttipankki import TenttiIndeksi  # noqa: E402
 
 TITLE_KEYS: tuple[str, ...] = ("TITLE", "title", "name", "otsikko", "nimi", "subject")
 MANIFEST_FILENAME = "manifest.json"
+STATE_FILENAME = ".update_state.json"
+STATE_VERSION = 1
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+HASH_LENGTH = 12  # manifestin ?v=-tiivisteen pituus heksamerkkeinä
+BUNDLE_DIRNAME = "bundles"
+PRECACHE_FILENAME = "precache.json"
+APP_SHELL: tuple[str, ...] = ("./index.html", "./app.js", "./styles.css", "./readme.html")
+WATCH_DEBOUNCE_MS = 300
+POLL_INTERVAL = 1.0
+RESCAN = "*"  # seuraaja ei tiedä, mikä muuttui (esim. inotify-jonon ylivuoto)
 
 CATEGORY_ORDER = ["Fysiikka", "Ohjelmointi", "Tietotekniikka", "Ohjelmistosuunnittelu", "Sähkötekniikka", "Muut"]
 CATEGORY_PRIORITY = {name: index for index, name in enumerate(CATEGORY_ORDER)}
@@ -36,6 +95,7 @@ class Entry:
     title: str
     file: str
     extras: Dict[str, Any]
+    images: List[str] = field(default_factory=list)
 
     def to_dict(self) -> Dict[str, Any]:
         data: Dict[str, Any] = {"id": self.id, "title": self.title, "file": self.file}
@@ -44,6 +104,90 @@ class Entry:
         return data
 
 
+@dataclass
+class SyncStats:
+    entries_parsed: int = 0
+    entries_reused: int = 0
+    hashed: int = 0
+    copied: int = 0
+    linked: int = 0
+    skipped: int = 0
+    skipped_bytes: int = 0
+    removed: int = 0
+
+
+@dataclass
+class SyncState:
+    """Inkrementaalisen synkronoinnin tila: tiivisteet, manifest-merkinnät ja kohteet."""
+
+    path: Optional[Path]
+    data: Dict[str, Any] = field(default_factory=lambda: {"version": STATE_VERSION})
+    stats: SyncStats = field(default_factory=SyncStats)
+
+    @classmethod
+    def load(cls, path: Path) -> "SyncState":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if data.get("version") != STATE_VERSION:
+            data = {"version": STATE_VERSION}
+        return cls(path=path, data=data)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def digest(self, file_path: Path) -> str:
+        """Palauttaa tiedoston SHA-256-tiivisteen; laskee sen vain jos mtime tai koko muuttui."""
+        sources = self.data.setdefault("sources", {})
+        key = file_path.resolve().as_posix()
+        stat = file_path.stat()
+        cached = sources.get(key)
+        if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            return cached["sha256"]
+        digest = file_digest(file_path)
+        sources[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+        self.stats.hashed += 1
+        return digest
+
+    def target(self, target_dir: Path) -> Dict[str, Any]:
+        return self.data.setdefault("targets", {}).setdefault(target_dir.resolve().as_posix(), {})
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def place_file(source: Path, target: Path, link_mode: str = "auto") -> bool:
+    """Vie tiedoston kohteeseen. Palauttaa True, jos käytettiin linkkiä kopion sijaan."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if link_mode in ("auto", "hardlink") and target.exists() and os.path.samefile(source, target):
+        return True  # jo kova linkki samaan tiedostoon
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    linked = False
+    if link_mode in ("auto", "reflink"):
+        linked = reflink(source, tmp)
+    if not linked and link_mode in ("auto", "hardlink"):
+        try:
+            os.link(source, tmp)
+            linked = True
+        except OSError:
+            pass
+    if not linked:
+        shutil.copy2(source, tmp)
+    os.replace(tmp, target)
+    return linked
+
+
 def slugify(value: str) -> str:
     """Luo tiedostonimestä URL/ID-yhteensopivan tunnisteen."""
     value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode("ascii")
@@ -94,103 +238,878 @@ def infer_category_from_filename(filename: str) -> str:
     return "Muut"
 
 
-def gather_entries(tent_files: Iterable[Path]) -> List[Entry]:
-    """Luo manifest-merkinnät tenttitiedostoista tyhjästä."""
+def parse_entry(file_path: Path) -> Entry:
+    """Jäsentää yhden tenttitiedoston manifest-merkinnäksi."""
+    rel_name = file_path.name
+    try:
+        data = json.loads(file_path.read_text(encoding="utf-8-sig"))
+    except (OSError, ValueError):  # tarkistus (lint_exams) raportoi virheen rivin
+        data = {}
+
+    # 🧠 Ensisijainen otsikko tiedoston TITLE-kentästä
+    title = extract_title(data, prettify_title(rel_name))
+    category = infer_category_from_filename(rel_name)
+
+    # 🔢 Haetaan järjestysnumero, jos sellainen on JSONissa
+    order = 999
+    if isinstance(data, dict):
+        raw_order = data.get("ORDER") or data.get("order") or data.get("Order")
+        if isinstance(raw_order, (int, float)):
+            order = int(raw_order)
+
+    return Entry(
+        id=slugify(file_path.stem),
+        title=title,
+        file=rel_name,
+        extras={"category": category, "order": order},
+        images=image_refs(data),
+    )
+
+
+def gather_entries(tent_files: Iterable[Path], state: Optional[SyncState] = None) -> List[Entry]:
+    """Luo manifest-merkinnät tenttitiedostoista.
+
+    Jos tila annetaan, vain tiedostot joiden sisältötiiviste on muuttunut
+    jäsennetään uudelleen; muille käytetään tilaan tallennettua merkintää.
+    """
     results: List[Entry] = []
+    cached_entries: Dict[str, Any] = state.data.setdefault("entries", {}) if state else {}
+    seen = set()
 
     for file_path in tent_files:
-        rel_name = file_path.name
-        try:
-            data = json.loads(file_path.read_text(encoding="utf-8"))
-        except Exception:
-            data = {}
+        seen.add(file_path.name)
+        if state is None:
+            entry = parse_entry(file_path)
+            entry.extras["hash"] = file_digest(file_path)[:HASH_LENGTH]
+            results.append(entry)
+        else:
+            results.append(refresh_entry(file_path, state))
 
-        # 🧠 Ensisijainen otsikko tiedoston TITLE-kentästä
-        title = extract_title(data, prettify_title(rel_name))
-        category = infer_category_from_filename(rel_name)
+    for rel_name in list(cached_entries):
+        if rel_name not in seen:
+            del cached_entries[rel_name]
+
+    results.sort(key=entry_sort_key)
+    return results
 
-        # 🔢 Haetaan järjestysnumero, jos sellainen on JSONissa
-        order = 999
-        if isinstance(data, dict):
-            raw_order = data.get("ORDER") or data.get("order") or data.get("Order")
-            if isinstance(raw_order, (int, float)):
-                order = int(raw_order)
 
+def refresh_entry(file_path: Path, state: SyncState) -> Entry:
+    """Palauttaa tiedoston merkinnän tilasta tai jäsentää sen, jos sisältötiiviste on muuttunut."""
+    rel_name = file_path.name
+    cached_entries: Dict[str, Any] = state.data.setdefault("entries", {})
+    digest = state.digest(file_path)
+    cached = cached_entries.get(rel_name)
+    if cached and cached.get("sha256") == digest:
         entry = Entry(
-            id=slugify(file_path.stem),
-            title=title,
+            id=cached["id"],
+            title=cached["title"],
             file=rel_name,
-            extras={"category": category, "order": order},
+            extras=dict(cached["extras"]),
+            images=list(cached.get("images", [])),
         )
-        results.append(entry)
+        state.stats.entries_reused += 1
+    else:
+        entry = parse_entry(file_path)
+        cached_entries[rel_name] = {
+            "sha256": digest,
+            "id": entry.id,
+            "title": entry.title,
+            "extras": dict(entry.extras),
+            "images": entry.images,
+        }
+        state.stats.entries_parsed += 1
+    entry.extras["hash"] = digest[:HASH_LENGTH]
+    return entry
 
-    def sort_key(item: Entry) -> tuple[int, str, int, str]:
-        """Järjestys: ensin kategoria, sitten ORDER, sitten otsikko."""
-        category = item.extras.get("category", "Muut")
-        priority = CATEGORY_PRIORITY.get(category, len(CATEGORY_PRIORITY))
-        order = item.extras.get("order", 999)
-        title = item.title.lower()
-        return (priority, category.lower(), order, title)
 
-    results.sort(key=sort_key)
-    return results
+def entry_sort_key(item: Entry) -> tuple[int, str, int, str]:
+    """Järjestys: ensin kategoria, sitten ORDER, sitten otsikko."""
+    category = item.extras.get("category", "Muut")
+    priority = CATEGORY_PRIORITY.get(category, len(CATEGORY_PRIORITY))
+    order = item.extras.get("order", 999)
+    title = item.title.lower()
+    return (priority, category.lower(), order, title)
+
+
+def is_exam_file(name: str) -> bool:
+    """Ylätason tenttitiedosto: *.json, ei manifest eikä piilotiedosto."""
+    return name.lower().endswith(".json") and name.lower() != MANIFEST_FILENAME.lower() and not name.startswith(".")
+
+
+MIRRORED_DIRS: tuple[str, ...] = ("images", HAKUKANSIO)
+
+
+# Tauri-kopio peilaa WEB/tentit-kansion, johon päivitys kirjoittaa myös kuvaversiot ja niput
+TAURI_MIRRORED_DIRS: tuple[str, ...] = (*MIRRORED_DIRS, VARIANT_DIRNAME, BUNDLE_DIRNAME)
+
 
+def iter_sync_sources(source_dir: Path, mirrored: tuple[str, ...] = MIRRORED_DIRS) -> Iterable[tuple[str, Path]]:
+    """Tuottaa synkronoitavat tiedostot: ylätason JSONit sekä peilattujen kansioiden (images, search) sisällön."""
+    for file in sorted(source_dir.glob("*.json")):
+        if not file.name.startswith("."):
+            yield file.name, file
+    for dirname in mirrored:
+        source_subdir = source_dir / dirname
+        if source_subdir.is_dir():
+            for file in sorted(source_subdir.rglob("*")):
+                if file.is_file():
+                    yield file.relative_to(source_dir).as_posix(), file
 
-def copy_to_web(source_dir: Path, target_dir: Path) -> None:
-    """Kopioi tenttitiedostot ja images-kansion WEB/tentit -kansioon."""
+
+def copy_to_web(
+    source_dir: Path,
+    target_dir: Path,
+    state: Optional[SyncState] = None,
+    link_mode: str = "auto",
+    store: Optional[AssetStore] = None,
+    mirrored: tuple[str, ...] = MIRRORED_DIRS,
+    adopt: bool = False,
+) -> SyncStats:
+    """Synkronoi tenttitiedostot ja images-kansion WEB/tentit -kansioon.
+
+    Ilman tilaa kaikki tiedostot kopioidaan. Tilan kanssa kopioidaan vain
+    lisätyt ja muuttuneet tiedostot, ja lähteestä poistetut poistetaan.
+    Varaston kanssa kohteet linkitetään sen objekteihin (ks. sync_file).
+    Palauttaa tämän kohteen tiedostolaskurit (ei muiden kohteiden).
+    """
+    state = state or SyncState(path=None)
+    stats = SyncStats()
     target_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Kopioi JSON-tiedostot
-    json_count = 0
-    for file in source_dir.glob("*.json"):
-        shutil.copy2(file, target_dir / file.name)
-        json_count += 1
-    print(f"✅ Kopioitu {json_count} JSON-tiedostoa → {target_dir}")
-    
-    # Kopioi images-kansio rekursiivisesti
-    source_images = source_dir / "images"
-    target_images = target_dir / "images"
-    
-    if source_images.exists() and source_images.is_dir():
-        # Poista vanha images-kansio WEB:stä ja kopioi uusi
-        if target_images.exists():
-            shutil.rmtree(target_images)
-        shutil.copytree(source_images, target_images)
-        
-        # Laske kuvatiedostot
-        image_count = sum(1 for _ in target_images.rglob("*.png")) + \
-                      sum(1 for _ in target_images.rglob("*.jpg")) + \
-                      sum(1 for _ in target_images.rglob("*.jpeg"))
-        print(f"📁 Kopioitu images-kansio ({image_count} kuvaa) → {target_images}")
+    synced = state.target(target_dir)
+    current: Dict[str, Any] = {}
+
+    for rel, source in iter_sync_sources(source_dir, mirrored):
+        current[rel] = sync_file(source, target_dir / rel, synced.get(rel), state, link_mode, store, adopt, stats)
+
+    # Poistetaan aiemmin synkronoidut tiedostot, joita ei enää ole lähteessä,
+    # sekä images- ja search-kansiosta kaikki ylimääräinen (kansiot peilaavat lähdettä).
+    stale = set(synced) - set(current)
+    for dirname in mirrored:
+        target_subdir = target_dir / dirname
+        if target_subdir.is_dir():
+            for file in target_subdir.rglob("*"):
+                if file.is_file():
+                    rel = file.relative_to(target_dir).as_posix()
+                    if rel not in current:
+                        stale.add(rel)
+    for rel in sorted(stale):
+        (target_dir / rel).unlink(missing_ok=True)
+        stats.removed += 1
+    for dirname in mirrored:
+        target_subdir = target_dir / dirname
+        if target_subdir.is_dir():
+            for folder in sorted(target_subdir.rglob("*"), reverse=True):
+                if folder.is_dir() and not any(folder.iterdir()):
+                    folder.rmdir()
+
+    synced.clear()
+    synced.update(current)
+
+    changed = stats.copied + stats.linked
+    print(
+        f"✅ Synkronoitu → {target_dir}: {changed} päivitetty "
+        f"({stats.linked} linkkinä), {stats.removed} poistettu, "
+        f"{stats.skipped} ohitettu muuttumattomana ({stats.skipped_bytes / 1e6:.1f} MB)"
+    )
+    return stats
+
+
+def sync_file(
+    source: Path,
+    target: Path,
+    previous: Optional[Dict[str, Any]],
+    state: SyncState,
+    link_mode: str = "auto",
+    store: Optional[AssetStore] = None,
+    adopt: bool = False,
+    stats: Optional[SyncStats] = None,
+) -> Dict[str, Any]:
+    """Vie yhden tiedoston kohteeseen, ellei se ole jo ajan tasalla. Palauttaa uuden tilarivin.
+
+    Varaston kanssa kohde linkitetään sisällön objektiin lähteen sijaan, joten
+    saman sisällön kopiot (myös eri kohdekansioissa) jakavat yhden tiedoston.
+    Laskurit päivitetään stats-olioon (oletuksena state.stats).
+    """
+    stats = stats or state.stats
+    digest = state.digest(source)
+    try:
+        target_stat = target.stat()
+    except OSError:
+        target_stat = None
+    if (
+        previous
+        and target_stat
+        and previous["sha256"] == digest
+        and previous["mtime_ns"] == target_stat.st_mtime_ns
+        and previous["size"] == target_stat.st_size
+    ):
+        stats.skipped += 1
+        stats.skipped_bytes += target_stat.st_size
+        return previous
+    if store is not None:
+        source = store.put(source, digest, adopt)
+    if place_file(source, target, link_mode):
+        stats.linked += 1
     else:
-        print("⚠️ images-kansiota ei löytynyt, ohitetaan")
+        stats.copied += 1
+    target_stat = target.stat()
+    return {"sha256": digest, "mtime_ns": target_stat.st_mtime_ns, "size": target_stat.st_size}
 
 
-def main() -> None:
-    tentit_dir = Path(__file__).resolve().parent
-    project_root = tentit_dir.parent
-    manifest_path = tentit_dir / MANIFEST_FILENAME
+def sync_paths(
+    source_dir: Path,
+    target_dir: Path,
+    rels: Iterable[str],
+    state: SyncState,
+    link_mode: str = "auto",
+    store: Optional[AssetStore] = None,
+) -> None:
+    """Synkronoi vain annetut tiedostot (polut suhteessa kansioihin); lähteestä puuttuvat poistetaan."""
+    synced = state.target(target_dir)
+    for rel in sorted(set(rels)):
+        source = source_dir / rel
+        if source.is_file():
+            synced[rel] = sync_file(source, target_dir / rel, synced.get(rel), state, link_mode, store)
+        elif synced.pop(rel, None) is not None or (target_dir / rel).exists():
+            (target_dir / rel).unlink(missing_ok=True)
+            state.stats.removed += 1
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Päivittää manifest.jsonin ja synkronoi tentit WEB-kansioon.")
+    parser.add_argument("--full", action="store_true", help="Täysi päivitys: ohita tilatiedosto")
+    parser.add_argument(
+        "--link-mode",
+        choices=LINK_MODES,
+        default="auto",
+        help="auto = reflink, sitten kova linkki, sitten kopio",
+    )
+    parser.add_argument("--no-images", action="store_true", help="Älä luo WebP/AVIF-kuvaversioita")
+    parser.add_argument("--no-store", action="store_true", help="Älä käytä sisältöosoitteellista varastoa (.store)")
+    parser.add_argument("--no-tauri", action="store_true", help="Älä päivitä tauri-app/src/tentit-kansiota")
+    parser.add_argument(
+        "--tauri-only",
+        action="store_true",
+        help="Linkitä vain WEB/tentit → tauri-app/src/tentit (ei manifestia, tarkistusta, kuvia eikä hakua)",
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="Rinnakkaiset prosessit (kuvat ja tarkistus)")
+    parser.add_argument("--no-lint", action="store_true", help="Älä tarkista tenttejä")
+    parser.add_argument("--strict", action="store_true", help="Älä julkaise, jos tarkistus löytää virheitä")
+    parser.add_argument("--no-search", action="store_true", help="Älä rakenna hakuindeksiä")
+    parser.add_argument(
+        "--bundles",
+        action="store_true",
+        help="Kokoa kunkin kategorian tentit yhteen välimuistitettavaan tiedostoon",
+    )
+    parser.add_argument("--watch", action="store_true", help="Jää seuraamaan muutoksia ja päivitä vain muuttuneet tentit")
+    parser.add_argument("--poll", action="store_true", help="Seuraa vertaamalla mtimeja (ei inotifyta)")
+    parser.add_argument(
+        "--debounce",
+        type=int,
+        default=WATCH_DEBOUNCE_MS,
+        help="Odota näin monta ms hiljaisuutta ennen päivitystä (tallennusryöpyt)",
+    )
+    return parser.parse_args(argv)
+
+
+def attach_image_metadata(
+    entries: List[Entry],
+    source_dir: Path,
+    state: SyncState,
+    metadata: Dict[str, Dict[str, Any]],
+) -> None:
+    """Lisää merkintöihin niiden kysymysten kuvien tiivisteet, mitat ja versiot."""
+    for entry in entries:
+        images = {}
+        for ref in entry.images:
+            rel = normalize_ref(ref)
+            source = source_dir / rel
+            if not source.is_file():
+                continue
+            meta = manifest_meta(metadata[rel]) if rel in metadata else {}
+            meta["hash"] = state.digest(source)[:HASH_LENGTH]
+            images[ref] = meta
+        if images:
+            entry.extras["images"] = images
+
+
+def write_bundles(entries: List[Entry], source_dir: Path, target_dir: Path, state: SyncState) -> None:
+    """Kirjoittaa kunkin kategorian tentit yhteen minifioituun JSON-tiedostoon.
+
+    Tiedoston nimi sisältää jäsenten tiivisteistä lasketun hashin, joten
+    muuttumatonta kategoriaa ei kirjoiteta uudelleen ja selain voi
+    välimuistittaa sen pysyvästi. Merkinnät saavat "bundle"-kentän.
+    """
+    bundle_dir = target_dir / BUNDLE_DIRNAME
+    groups: Dict[str, List[Entry]] = {}
+    for entry in entries:
+        groups.setdefault(entry.extras.get("category", "Muut"), []).append(entry)
+
+    written = 0
+    keep = set()
+    for category, members in groups.items():
+        h = hashlib.sha256()
+        for entry in sorted(members, key=lambda item: item.file):
+            h.update(f"{entry.file}\0{state.digest(source_dir / entry.file)}\n".encode("utf-8"))
+        name = f"{slugify(category)}.{h.hexdigest()[:HASH_LENGTH]}.json"
+        path = bundle_dir / name
+        if not path.exists():
+            try:
+                bundle = {
+                    entry.file: json.loads((source_dir / entry.file).read_text(encoding="utf-8-sig"))
+                    for entry in members
+                }
+            except ValueError as exc:
+                print(f"⚠️ Kategoriaa {category} ei paketoitu: {exc}")
+                continue
+            bundle_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(bundle, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, path)
+            written += 1
+        keep.add(name)
+        for entry in members:
+            entry.extras["bundle"] = f"{BUNDLE_DIRNAME}/{name}"
 
-    tent_files = [
-        path for path in tentit_dir.glob("*.json")
-        if path.name.lower() != MANIFEST_FILENAME.lower()
-    ]
+    removed = 0
+    if bundle_dir.is_dir():
+        for file in bundle_dir.iterdir():
+            if file.name not in keep:
+                file.unlink()
+                removed += 1
+        if not keep:
+            bundle_dir.rmdir()
+    print(f"📦 Kategoriapaketit: {len(keep)} kpl, {written} kirjoitettu, {removed} poistettu")
 
-    # 🧹 Poistetaan vanha manifest.json kokonaan ennen luontia
-    if manifest_path.exists():
-        manifest_path.unlink()
-        print("🧹 Vanha manifest.json poistettu.")
 
-    updated_entries = gather_entries(tent_files)
+def build_search_index(entries: List[Entry], source_dir: Path, state: SyncState) -> Dict[str, Any]:
+    """Rakentaa hakuindeksin source_dir/search-kansioon ja palauttaa index.jsonin sisällön.
 
-    manifest_path.write_text(
-        json.dumps([entry.to_dict() for entry in updated_entries], indent=2, ensure_ascii=False),
-        encoding="utf-8",
+    Tenttien sanat tallennetaan tilatiedostoon tiivisteen kanssa, joten vain
+    muuttuneet tentit jäsennetään uudelleen. Osat on nimetty sisältönsä
+    tiivisteellä, joten muuttumattomia osia ei kirjoiteta uudelleen.
+    """
+    cached: Dict[str, Any] = state.data.setdefault("search", {})
+    exams = []
+    parsed = 0
+    for entry in entries:
+        digest = state.digest(source_dir / entry.file)
+        item = cached.get(entry.file)
+        if not item or item.get("sha256") != digest:
+            try:
+                data = json.loads((source_dir / entry.file).read_text(encoding="utf-8-sig"))
+            except ValueError:
+                data = None
+            item = {"sha256": digest, "docs": hakudokumentit(data)}
+            cached[entry.file] = item
+            parsed += 1
+        exams.append((entry.file, entry.title, entry.extras.get("hash"), item["docs"]))
+    for name in set(cached) - {entry.file for entry in entries}:
+        del cached[name]
+
+    index, written, removed = kirjoita_hakuindeksi(str(source_dir / HAKUKANSIO), exams)
+    print(
+        f"🔎 Hakuindeksi: {index['count']} kysymystä, {len(index['terms'])} sanaosaa, "
+        f"{parsed} tenttiä jäsennetty, {written} osaa kirjoitettu, {removed} poistettu"
     )
-    print(f"📝 Luotu uusi {manifest_path} ({len(updated_entries)} tenttiä).")
+    return index
+
+
+def versioned_url(path: str, content_hash: Optional[str]) -> str:
+    """WEB-kansion suhteellinen osoite samassa muodossa kuin app.js sen hakee."""
+    url = "./" + quote(path)
+    return f"{url}?v={content_hash}" if content_hash else url
+
+
+def write_precache(entries: List[Entry], web_root: Path, search_index: Optional[Dict[str, Any]] = None) -> bool:
+    """Kirjoittaa service workerin välimuistilistan. Palauttaa True, jos lista muuttui.
+
+    precache: sovelluksen runko, manifest, tentit (tai kategoriapaketit) ja
+    hakuindeksin index.json, jotka tallennetaan heti asennuksessa. images:
+    kuvat ja niiden versiot sekä lazy: hakuindeksin osat. Ne haetaan vasta
+    tarvittaessa mutta säilytetään välimuistissa.
+    """
+    precache = list(APP_SHELL) + [versioned_url(f"tentit/{MANIFEST_FILENAME}", None)]
+    images: List[str] = []
+    for entry in entries:
+        bundle = entry.extras.get("bundle")
+        if bundle:
+            exam = versioned_url(f"tentit/{bundle}", None)
+        else:
+            exam = versioned_url(f"tentit/{entry.file}", entry.extras.get("hash"))
+        if exam not in precache:
+            precache.append(exam)
+        for ref, meta in entry.extras.get("images", {}).items():
+            paths = [normalize_ref(ref)] + [normalize_ref(v["src"]) for v in meta.get("variants", [])]
+            for path in paths:
+                url = versioned_url(f"tentit/{path}", meta.get("hash"))
+                if url not in images:
+                    images.append(url)
+
+    lazy: List[str] = []
+    if search_index is not None:
+        precache.append(versioned_url(f"tentit/{HAKUKANSIO}/{HAKUINDEKSI}", None))
+        for name in [*search_index["terms"].values(), *search_index["docs"]]:
+            lazy.append(versioned_url(f"tentit/{HAKUKANSIO}/{name}", None))
+
+    data = {"precache": precache, "images": images, "lazy": lazy}
+    version = hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()[:HASH_LENGTH]
+    text = json.dumps({"version": version, **data}, indent=2, ensure_ascii=False)
+    path = web_root / PRECACHE_FILENAME
+    if path.exists() and path.read_text(encoding="utf-8") == text:
+        return False
+    web_root.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+    print(f"📴 Päivitetty {path} ({len(precache)} esiladattavaa, {len(images)} kuvaa, versio {version})")
+    return True
+
+
+def write_manifest(entries: List[Entry], manifest_path: Path, state: SyncState) -> bool:
+    """Kirjoittaa manifestin, jos sen sisältö muuttui. Palauttaa True, jos kirjoitettiin."""
+    manifest_text = json.dumps([entry.to_dict() for entry in entries], indent=2, ensure_ascii=False)
+    old_manifest = manifest_path.read_text(encoding="utf-8") if manifest_path.exists() else None
+    if old_manifest == manifest_text:
+        print(f"📝 {manifest_path} ajan tasalla ({len(entries)} tenttiä).")
+        return False
+    # Atominen vaihto: start_web.py ja selaimet eivät näe puolikasta manifestia
+    tmp = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp.write_text(manifest_text, encoding="utf-8")
+    os.replace(tmp, manifest_path)
+    print(f"📝 Päivitetty {manifest_path} ({len(entries)} tenttiä, {state.stats.entries_parsed} jäsennetty uudelleen).")
+    return True
+
+
+def lint_exams(
+    paths: Iterable[Path],
+    tentit_dir: Path,
+    state: SyncState,
+    jobs: Optional[int] = None,
+    prune: bool = False,
+) -> tuple[int, int]:
+    """Tarkistaa tentit ja tallentaa ne komentoriviversion indeksiin. Palauttaa (virheet, varoitukset).
+
+    Uudelleen jäsennetään vain tentit, joiden sisältö on muuttunut edellisestä
+    tarkistuksesta tai joiden indeksirivi on vanha; muiden tulokset otetaan
+    tilatiedostosta. prune=True poistaa tilasta tentit, joita ei ole paths-listassa.
+    """
+    started = time.perf_counter()
+    paths = sorted(paths)
+    cache: Dict[str, Any] = state.data.setdefault("lint", {})
+    index = TenttiIndeksi(str(tentit_dir))
+    try:
+        todo = []
+        for path in paths:
+            stat = path.stat()
+            cached = cache.get(path.name)
+            if (
+                not cached
+                or cached.get("version") != LINT_VERSION
+                or cached["sha256"] != state.digest(path)
+                or index.tallennettu(path.name) != (stat.st_mtime_ns, stat.st_size)
+            ):
+                todo.append(path)
+        results = lint_files(todo, jobs)
+        index.tallenna(result.row for result in results)
+    finally:
+        index.sulje()
+    for result in results:
+        cache[result.file] = {
+            "version": LINT_VERSION,
+            "sha256": state.digest(tentit_dir / result.file),
+            "issues": [list(issue) for issue in result.issues],
+            "images": [list(image) for image in result.images],
+        }
+    if prune:
+        names = {path.name for path in paths}
+        for name in [name for name in cache if name not in names]:
+            del cache[name]
+
+    errors = warnings = 0
+    for path in paths:
+        cached = cache[path.name]
+        issues = [Issue(*issue) for issue in cached["issues"]] + check_images(cached["images"], tentit_dir)
+        for issue in sorted(issues):
+            print(f"  {format_issue(path.name, issue)}")
+            if issue.severity == ERROR:
+                errors += 1
+            else:
+                warnings += 1
+    print(
+        f"🔎 Tarkistettu {len(paths)} tenttiä ({len(todo)} jäsennetty) "
+        f"{(time.perf_counter() - started) * 1000:.0f} ms: {errors} virhettä, {warnings} varoitusta"
+    )
+    return errors, warnings
+
 
+def exam_files(tentit_dir: Path) -> List[Path]:
+    return [path for path in tentit_dir.glob("*.json") if is_exam_file(path.name)]
+
+
+def open_store(args: argparse.Namespace, tentit_dir: Path) -> Optional[AssetStore]:
+    return None if args.no_store else AssetStore(tentit_dir / STORE_DIRNAME)
+
+
+def close_store(store: Optional[AssetStore], state: SyncState) -> None:
+    """Poistaa objektit, joihin mikään kohde ei viittaa, ja tallentaa varaston hakemiston."""
+    if store is None:
+        return
+    live = {record["sha256"] for target in state.data.get("targets", {}).values() for record in target.values()}
+    removed = store.prune(live)
+    store.save()
+    count, size = store.usage()
+    print(
+        f"🗃️  Varasto: {count} objektia ({size / 1e6:.1f} MB), {store.stored} uutta, "
+        f"{store.reused} jo tallessa, {store.aliased} samannäköistä kuvaa, {removed} poistettu"
+    )
+
+
+def sync_tauri(
+    args: argparse.Namespace,
+    web_tentit: Path,
+    tauri_tentit: Optional[Path],
+    state: SyncState,
+    store: Optional[AssetStore],
+) -> None:
+    """Peilaa WEB/tentit-kansion Tauri-sovellukseen samoihin varaston objekteihin linkitettynä."""
+    if tauri_tentit is not None:
+        copy_to_web(
+            web_tentit, tauri_tentit, state, args.link_mode, store, mirrored=TAURI_MIRRORED_DIRS, adopt=True
+        )
+
+
+def sync_all(
+    args: argparse.Namespace,
+    tentit_dir: Path,
+    web_tentit: Path,
+    state: SyncState,
+    tauri_tentit: Optional[Path] = None,
+):
+    """Koko kansion inkrementaalinen päivitys. Palauttaa (merkinnät, kuvien metatiedot)."""
+    if not args.no_lint:
+        errors, _ = lint_exams(exam_files(tentit_dir), tentit_dir, state, jobs=args.jobs, prune=True)
+        if errors and args.strict:
+            state.save()
+            raise SystemExit(f"❌ Julkaisu keskeytettiin: {errors} virhettä (--strict)")
+    updated_entries = gather_entries(exam_files(tentit_dir), state)
+    if not args.no_images:
+        metadata = build_image_variants(tentit_dir, web_tentit, state, jobs=args.jobs)
+    else:
+        metadata = {}
+    attach_image_metadata(updated_entries, tentit_dir, state, metadata)
+    search_index = None
+    if not args.no_search:
+        search_index = build_search_index(updated_entries, tentit_dir, state)
+    elif (tentit_dir / HAKUKANSIO).is_dir():
+        shutil.rmtree(tentit_dir / HAKUKANSIO)
+    if args.bundles:
+        write_bundles(updated_entries, tentit_dir, web_tentit, state)
+    elif (web_tentit / BUNDLE_DIRNAME).is_dir():
+        shutil.rmtree(web_tentit / BUNDLE_DIRNAME)
+    write_manifest(updated_entries, tentit_dir / MANIFEST_FILENAME, state)
+
+    store = open_store(args, tentit_dir)
+    copy_to_web(tentit_dir, web_tentit, state, link_mode=args.link_mode, store=store)
+    sync_tauri(args, web_tentit, tauri_tentit, state, store)
+    close_store(store, state)
+    write_precache(updated_entries, web_tentit.parent, search_index)
+    state.save()
+    return updated_entries, metadata
+
+
+def sync_exams(
+    names: Iterable[str],
+    entries: List[Entry],
+    metadata: Dict[str, Dict[str, Any]],
+    args: argparse.Namespace,
+    tentit_dir: Path,
+    web_tentit: Path,
+    state: SyncState,
+    tauri_tentit: Optional[Path] = None,
+) -> bool:
+    """Päivittää vain annetut tenttitiedostot.
+
+    Muuttuneet merkinnät korvataan listassa (entries muuttuu paikallaan) ja
+    lista järjestetään samalla avaimella kuin gather_entries(). WEB/tentit/
+    saa vain nämä tiedostot, manifestin ja hakuindeksin muuttuneet osat.
+    Palauttaa False, jos --strict esti julkaisun.
+    """
+    names = sorted(set(names))
+    if not args.no_lint:
+        existing = [tentit_dir / name for name in names if (tentit_dir / name).is_file()]
+        for name in names:
+            if not (tentit_dir / name).is_file():
+                state.data.get("lint", {}).pop(name, None)
+        errors, _ = lint_exams(existing, tentit_dir, state, jobs=args.jobs)
+        if errors and args.strict:
+            print(f"⏸️  Ei julkaistu: {errors} virhettä (--strict)")
+            state.save()
+            return False
+    by_file = {entry.file: entry for entry in entries}
+    cached_entries: Dict[str, Any] = state.data.setdefault("entries", {})
+    for name in names:
+        path = tentit_dir / name
+        by_file.pop(name, None)
+        if path.is_file():
+            entry = refresh_entry(path, state)
+            attach_image_metadata([entry], tentit_dir, state, metadata)
+            by_file[name] = entry
+        else:
+            cached_entries.pop(name, None)
+            state.data.get("sources", {}).pop(path.resolve().as_posix(), None)
+    entries[:] = sorted(by_file.values(), key=entry_sort_key)
+
+    rels = [*names, MANIFEST_FILENAME]
+    search_index = None
+    if not args.no_search:
+        search_index = build_search_index(entries, tentit_dir, state)
+        for folder in (tentit_dir / HAKUKANSIO, web_tentit / HAKUKANSIO):
+            if folder.is_dir():
+                rels += [f"{HAKUKANSIO}/{file.name}" for file in folder.iterdir() if file.is_file()]
+    if args.bundles:
+        write_bundles(entries, tentit_dir, web_tentit, state)
+    write_manifest(entries, tentit_dir / MANIFEST_FILENAME, state)
+    store = open_store(args, tentit_dir)
+    sync_paths(tentit_dir, web_tentit, rels, state, link_mode=args.link_mode, store=store)
+    sync_tauri(args, web_tentit, tauri_tentit, state, store)
+    close_store(store, state)
+    write_precache(entries, web_tentit.parent, search_index)
+    state.save()
+    return True
+
+
+def iter_watched(root: Path) -> Iterable[tuple[str, Path]]:
+    """Seurattavat tiedostot: tenttitiedostot ja images-kansio (ei search/, jota päivitys itse kirjoittaa)."""
+    for file in root.glob("*.json"):
+        if is_exam_file(file.name):
+            yield file.name, file
+    images = root / "images"
+    if images.is_dir():
+        for file in images.rglob("*"):
+            if file.is_file():
+                yield file.relative_to(root).as_posix(), file
+
+
+class PollingWatcher:
+    """Muutosten seuranta vertaamalla tiedostojen mtimeja ja kokoja; toimii kaikilla alustoilla."""
+
+    name = "polling"
+
+    def __init__(self, root: Path, interval: float = POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, tuple[int, int]]:
+        snapshot = {}
+        for rel, file in iter_watched(self.root):
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            snapshot[rel] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Palauttaa muuttuneet polut; tyhjä joukko, jos timeout umpeutui ilman muutoksia."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            time.sleep(max(delay, 0.0))
+            current = self._scan()
+            changed = {rel for rel in current.keys() | self.snapshot.keys() if current.get(rel) != self.snapshot.get(rel)}
+            self.snapshot = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Linuxin inotify ctypesin kautta: kansion ylätaso sekä images/ alikansioineen."""
+
+    name = "inotify"
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    # IN_MODIFYa ei seurata: tallennus tuottaa niitä useita, IN_CLOSE_WRITE yhden
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: Path):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._ctypes = ctypes
+        self.root = root
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._dirs: Dict[int, str] = {}
+        self._add("")
+        if (root / "images").is_dir():
+            self._add_tree("images")
+
+    def _add(self, rel: str) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(self.root / rel), self.MASK)
+        if wd < 0:
+            raise OSError(self._ctypes.get_errno(), f"inotify_add_watch {self.root / rel}")
+        self._dirs[wd] = rel
+
+    def _add_tree(self, rel: str) -> None:
+        self._add(rel)
+        for folder in sorted((self.root / rel).rglob("*")):
+            if folder.is_dir():
+                self._add(folder.relative_to(self.root).as_posix())
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = b""
+        while True:
+            try:
+                chunk = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            data += chunk
+        changed: Set[str] = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = self.EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b"\0"))
+            offset += self.EVENT.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                changed.add(RESCAN)
+                continue
+            if mask & self.IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            parent = self._dirs.get(wd)
+            if parent is None:
+                continue
+            rel = f"{parent}/{name}" if parent else name
+            if mask & self.IN_ISDIR:
+                # Uusi kuvakansio: seurataan myös sitä; sinne ehtineet tiedostot kattaa täysi päivitys
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO) and (rel == "images" or rel.startswith("images/")):
+                    self._add_tree(rel)
+                changed.add(rel + "/")
+                continue
+            changed.add(rel)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def create_watcher(root: Path, poll: bool = False):
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as exc:
+            print(f"⚠️ inotify ei käytettävissä ({exc}), seurataan mtimeja")
+    return PollingWatcher(root)
+
+
+def watch(
+    args: argparse.Namespace,
+    watcher,
+    entries: List[Entry],
+    metadata: Dict[str, Dict[str, Any]],
+    tentit_dir: Path,
+    web_tentit: Path,
+    state: SyncState,
+    tauri_tentit: Optional[Path] = None,
+    pending_full: bool = False,
+) -> None:
+    print(f"👀 Seurataan {tentit_dir} ({watcher.name}), Ctrl+C lopettaa")
+    debounce = max(args.debounce, 0) / 1000
+    while True:
+        changed = watcher.wait()
+        # Editorit tallentavat usein väliaikaistiedoston ja uudelleennimeävät sen;
+        # odotetaan, kunnes ryöppy on ohi, ja päivitetään kerralla.
+        while True:
+            more = watcher.wait(debounce)
+            if not more:
+                break
+            changed |= more
+        exams = {rel for rel in changed if "/" not in rel and is_exam_file(rel)}
+        full = RESCAN in changed or any(rel == "images/" or rel.startswith("images/") for rel in changed)
+        if not exams and not full:
+            continue
+        full = full or pending_full
+        state.stats = SyncStats()
+        started = time.perf_counter()
+        print(f"\n🔄 {time.strftime('%H:%M:%S')} muuttui: {', '.join(sorted(changed)[:5])}{' ...' if len(changed) > 5 else ''}")
+        try:
+            if full:
+                entries[:], metadata = sync_all(args, tentit_dir, web_tentit, state, tauri_tentit)
+            elif not sync_exams(exams, entries, metadata, args, tentit_dir, web_tentit, state, tauri_tentit):
+                # Virheilmoitus on jo tulostettu; korjattu tallennus julkaisee tiedoston
+                continue
+        except OSError as exc:
+            # Tiedosto voi kadota kesken päivityksen; seuraava tallennus korjaa tilanteen
+            print(f"⚠️ Päivitys keskeytyi: {exc}")
+            continue
+        except SystemExit as exc:
+            # sync_all keskeyttää --strict-tilassa; seuranta jatkuu, ja koko kansio
+            # päivitetään uudelleen seuraavalla muutoksella, kun virheet on korjattu
+            print(f"{exc}, seurataan edelleen")
+            pending_full = full
+            continue
+        pending_full = False
+        print(f"✅ Päivitetty {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    tentit_dir = Path(__file__).resolve().parent
+    project_root = tentit_dir.parent
+    state_path = tentit_dir / STATE_FILENAME
     web_tentit = project_root / "WEB" / "tentit"
-    copy_to_web(tentit_dir, web_tentit)
+    tauri_src = project_root / "tauri-app" / "src"
+    tauri_tentit = tauri_src / "tentit" if tauri_src.is_dir() and not args.no_tauri else None
+
+    state = SyncState(path=state_path) if args.full else SyncState.load(state_path)
+
+    if args.tauri_only:
+        # Tauri-käännöksen vaihe (sync-assets.cjs): ei kirjoiteta lähdekansioon eikä WEB-kansioon
+        if tauri_tentit is None:
+            raise SystemExit(f"❌ Tauri-kansiota ei löytynyt: {tauri_src}")
+        store = open_store(args, tentit_dir)
+        sync_tauri(args, web_tentit, tauri_tentit, state, store)
+        close_store(store, state)
+        state.save()
+        return
+
+    # Seuraaja luodaan ennen ensimmäistä päivitystä, jotta sen aikana tehdyt muutokset eivät huku
+    watcher = create_watcher(tentit_dir, args.poll) if args.watch else None
+    try:
+        entries, metadata = sync_all(args, tentit_dir, web_tentit, state, tauri_tentit)
+        pending_full = False
+    except SystemExit as exc:
+        if watcher is None:
+            raise
+        print(f"{exc}, seurataan edelleen")
+        entries, metadata, pending_full = [], {}, True
+    if watcher is None:
+        return
+    try:
+        watch(args, watcher, entries, metadata, tentit_dir, web_tentit, state, tauri_tentit, pending_full)
+    except KeyboardInterrupt:
+        print("\n👋 Seuranta lopetettu")
+    finally:
+        watcher.close()
 
 
 if __name__ == "__main__":
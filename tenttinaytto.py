@@ -0,0 +1,211 @@
+"""
+Tentin koko näytön näkymä terminaalissa.
+
+- Näkymä piirretään vaihtoehtoiselle näytölle (alternate screen). Kysymysten
+  välillä kirjoitetaan ANSI-kohdistimen siirroilla vain muuttuneet rivit,
+  eikä näyttöä tyhjennetä välissä. Näin hidas SSH-yhteys ei välky, eikä
+  jokaista kysymystä varten käynnistetä `clear`-prosessia.
+- Rich-renderöitävät (otsikkorivi, paneelit, edistymispalkki) luodaan kerran
+  ja niiden sisältö vaihdetaan kysymyksittäin. Rich tuodaan vasta, kun
+  näkymä luodaan konsolin kanssa.
+- Jos tuloste ei ole pääte (putki, skripti), näkymät tulostetaan peräkkäin
+  ilman ohjauskoodeja.
+"""
+
+import shutil
+import sys
+import textwrap
+
+# Värikoodit
+RED = "\033[91m"
+GREEN = "\033[32m"
+YELLOW = "\033[93m"
+RESET = "\033[0m"
+VARIT = {"red": RED, "green": GREEN, "yellow": YELLOW}
+
+ALT_SCREEN_ON = "\033[?1049h"
+ALT_SCREEN_OFF = "\033[?1049l"
+CURSOR_HOME = "\033[H"
+CLEAR_LINE = "\033[2K"
+CLEAR_BELOW = "\033[J"
+CLEAR_SCREEN = CURSOR_HOME + "\033[2J"
+
+
+def siirry_riville(rivi):
+    return f"\033[{rivi + 1};1H"
+
+
+class Naytto:
+    """Rivipohjainen näyttö, joka päivittää edellisestä kehyksestä vain muuttuneet rivit.
+
+    Kohdistin jätetään kehyksen alle, joten input() kysyy seuraavalla rivillä.
+    Kehystä seuraavat rivit (edellinen syöte, vanhat viestit) tyhjennetään aina.
+    """
+
+    def __init__(self, out=None, interaktiivinen=None, korkeus=None):
+        self.out = out or sys.stdout
+        if interaktiivinen is None:
+            interaktiivinen = self.out.isatty()
+        self.interaktiivinen = interaktiivinen
+        self.korkeus = korkeus
+        self.rivit = []
+        self.auki = False
+        self.kirjoitettu = 0
+
+    def __enter__(self):
+        self.avaa()
+        return self
+
+    def __exit__(self, *exc):
+        self.sulje()
+
+    def _kirjoita(self, data):
+        self.out.write(data)
+        self.out.flush()
+        self.kirjoitettu += len(data)
+
+    def avaa(self):
+        if self.interaktiivinen and not self.auki:
+            self._kirjoita(ALT_SCREEN_ON + CLEAR_SCREEN)
+            self.auki = True
+            self.rivit = []
+
+    def sulje(self):
+        if self.auki:
+            self._kirjoita(ALT_SCREEN_OFF)
+            self.auki = False
+        self.rivit = []
+
+    def piirra(self, rivit):
+        if not self.interaktiivinen:
+            self._kirjoita("".join(rivi + "\n" for rivi in rivit))
+            return
+
+        korkeus = self.korkeus or shutil.get_terminal_size().lines
+        if len(rivit) >= korkeus:
+            # Kehys ei mahdu näytölle: vieritetään koko kehys, jolloin rivien
+            # paikat eivät ole enää tiedossa ja seuraava piirto tehdään kokonaan.
+            self._kirjoita(CLEAR_SCREEN + "".join(rivi + "\n" for rivi in rivit))
+            self.rivit = []
+            return
+
+        osat = []
+        for numero, rivi in enumerate(rivit):
+            if numero < len(self.rivit) and self.rivit[numero] == rivi:
+                continue
+            osat.append(siirry_riville(numero) + CLEAR_LINE + rivi)
+        osat.append(siirry_riville(len(rivit)) + CLEAR_BELOW)
+        self._kirjoita("".join(osat))
+        self.rivit = list(rivit)
+
+
+class TenttiNakyma:
+    """Kysymysnäkymän kehykset. Konsolin kanssa Rich-paneeleina, muuten tekstinä.
+
+    viesti on lista (teksti, tyyli) -pareja, esim. [("Oikein!", "green")].
+    """
+
+    def __init__(self, otsikko, kysymyksia, console=None):
+        self.otsikko = otsikko
+        self.kysymyksia = kysymyksia
+        self.console = console
+        if console is not None:
+            self._luo_renderoitavat()
+
+    def _luo_renderoitavat(self):
+        from rich.align import Align
+        from rich.console import Group
+        from rich.panel import Panel
+        from rich.rule import Rule
+        from rich.table import Table
+        from rich.text import Text
+
+        self._Table = Table
+        self._Text = Text
+        self.otsikkorivi = Text()
+        self.kysymysteksti = Text()
+        self.edistyminen = Text(justify="center")
+        self.viestiteksti = Text()
+        self.kehote = Text(style="bold magenta")
+        self.kysymyspaneeli = Panel(
+            self.kysymysteksti,
+            title=Text("Kysymys", style="bold yellow"),
+            border_style="cyan",
+            padding=(1, 2),
+        )
+        self.vaihtoehtopaneeli = Panel(
+            "",
+            title=Text("Vaihtoehdot", style="bold magenta"),
+            border_style="magenta",
+            padding=(0, 2),
+        )
+        self.edistymisrivi = Align.left(self.edistyminen)
+        self.ryhma = Group(
+            Rule(self.otsikkorivi),
+            self.kysymyspaneeli,
+            self.vaihtoehtopaneeli,
+            Text(),
+            self.edistymisrivi,
+            self.viestiteksti,
+            self.kehote,
+        )
+
+    @staticmethod
+    def _aseta(text, *osat):
+        text.plain = ""
+        for teksti, tyyli in osat:
+            text.append(teksti, style=tyyli or None)
+
+    def kehys(self, index, kysymys, vaihtoehdot, edistyminen, viesti=None):
+        """Palauttaa kysymysnäkymän rivit (ANSI-muotoiltuina)."""
+        if self.console is None:
+            return self._tekstikehys(index, kysymys, vaihtoehdot, edistyminen, viesti)
+
+        leveys = max(40, self.console.width - 4)
+        self._aseta(
+            self.otsikkorivi,
+            (self.otsikko, "bold cyan"),
+            ("    ", None),
+            (f"Kysymys {index}/{self.kysymyksia}", "bold yellow"),
+        )
+        self.kysymysteksti.plain = kysymys
+
+        taulukko = self._Table(box=None, show_header=False, padding=(0, 1))
+        taulukko.add_column(" ", justify="right", style="bold")
+        taulukko.add_column("Vaihtoehto", overflow="fold")
+        for opt_index, option in enumerate(vaihtoehdot, 1):
+            taulukko.add_row(str(opt_index), option)
+        self.vaihtoehtopaneeli.renderable = taulukko
+
+        self.kysymyspaneeli.width = leveys
+        self.vaihtoehtopaneeli.width = leveys
+        self.edistymisrivi.width = leveys
+        uusi = self._Text.from_markup(edistyminen)
+        self.edistyminen.plain = ""
+        self.edistyminen.append_text(uusi)
+        self._aseta(self.viestiteksti, *(viesti or ()))
+        self.kehote.plain = f"Valitse vaihtoehto (1-{len(vaihtoehdot)}): "
+
+        with self.console.capture() as kaappaus:
+            self.console.print(self.ryhma)
+        return kaappaus.get().splitlines()
+
+    def _tekstikehys(self, index, kysymys, vaihtoehdot, edistyminen, viesti):
+        leveys = shutil.get_terminal_size().columns
+        rivit = [
+            "=" * 50,
+            f"{self.otsikko}  |  Kysymys {index}/{self.kysymyksia}",
+            "=" * 50,
+            "",
+        ]
+        rivit += textwrap.wrap(f"Kysymys {index}/{self.kysymyksia}: {kysymys}", leveys) or [""]
+        for opt_index, option in enumerate(vaihtoehdot, 1):
+            rivit += textwrap.wrap(
+                f"{opt_index}. {option}", leveys, subsequent_indent=" " * (len(str(opt_index)) + 2)
+            ) or [""]
+        rivit.append("")
+        rivit += edistyminen.splitlines()
+        rivit.append(
+            "".join(f"{VARIT[tyyli]}{teksti}{RESET}" if tyyli in VARIT else teksti for teksti, tyyli in viesti or ())
+        )
+        return rivit
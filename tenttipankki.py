@@ -0,0 +1,593 @@
+"""
+Tenttipankin indeksi ja kysymysten virtauslukija.
+
+Pitää tenttikansion vieressä SQLite-tiedostoa, johon tallennetaan jokaisesta
+tenttitiedostosta otsikko, kysymysmäärä, kelvollisuus sekä kelvollisten
+kysymysten tavusiirtymät. Tiedosto jäsennetään uudelleen vain, jos sen
+mtime tai koko on muuttunut, joten tenttilistaus ja tentin aloitus eivät
+enää lue jokaista JSON-tiedostoa kokonaan.
+
+Kelvolliset kysymykset käännetään Kysymys-olioiksi (__slots__, internoidut
+vaihtoehdot, oikea vastaus indeksinä), joita komentorivi, arviointi, haku
+ja palvelin käyttävät samassa muodossa.
+
+KysymysVirta lukee tiedostoa paloina ja tuottaa kysymykset yksi kerrallaan,
+joten suuretkin kysymyspankit voidaan validoida ja arpoa (arvo_kysymykset)
+O(k)-muistilla.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+INDEKSI_TIEDOSTO = ".tenttiindeksi.sqlite"
+INDEKSIN_VERSIO = "2"
+PALAN_KOKO = 1 << 16
+
+UTF8_BOM = b"\xef\xbb\xbf"
+_VALIT = re.compile(r"[ \t\n\r]*")
+_DEKOODERI = json.JSONDecoder()
+_LUVUN_JATKO = re.compile(r"[.eE+-]{0,2}")
+
+
+def etsi_otsikko(obj: Any) -> Optional[str]:
+    """Etsii rekursiivisesti ensimmäisen ei-tyhjän TITLE-kentän."""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key.upper() == "TITLE" and isinstance(value, str):
+                otsikko = value.strip()
+                if otsikko:
+                    return otsikko
+        for value in obj.values():
+            loytynyt = etsi_otsikko(value)
+            if loytynyt:
+                return loytynyt
+    elif isinstance(obj, list):
+        for item in obj:
+            loytynyt = etsi_otsikko(item)
+            if loytynyt:
+                return loytynyt
+    return None
+
+
+class Kysymys:
+    """Kelvollinen kysymys tiiviissä muodossa.
+
+    Vaihtoehdot ovat monikossa internoituina merkkijonoina (samat vaihtoehdot,
+    esim. "Tosi"/"Epätosi", jaetaan kaikkien kysymysten kesken) ja oikea
+    vastaus on vaihtoehdon indeksi. Sekoitus on pienten kokonaislukujen
+    permutaatio, joten vaihtoehtoja ei kopioida.
+    """
+
+    __slots__ = ("kysymys", "vaihtoehdot", "oikea", "kuva", "tiedosto")
+
+    def __init__(
+        self,
+        kysymys: str,
+        vaihtoehdot: Tuple[str, ...],
+        oikea: int,
+        kuva: Optional[str] = None,
+        tiedosto: Optional[str] = None,
+    ):
+        self.kysymys = kysymys
+        self.vaihtoehdot = vaihtoehdot
+        self.oikea = oikea
+        self.kuva = kuva
+        self.tiedosto = tiedosto  # lähdetiedosto, jos kysymykset on koottu useasta tentistä
+
+    @property
+    def oikea_vastaus(self) -> str:
+        return self.vaihtoehdot[self.oikea]
+
+    def sekoitus(self, rng: random.Random = random) -> List[int]:
+        """Satunnainen järjestys vaihtoehtojen indekseille."""
+        jarjestys = list(range(len(self.vaihtoehdot)))
+        rng.shuffle(jarjestys)
+        return jarjestys
+
+    def __repr__(self) -> str:
+        return f"Kysymys({self.kysymys!r}, {self.vaihtoehdot!r}, oikea={self.oikea})"
+
+
+def normalisoi_kysymys(q: Any) -> Optional[Kysymys]:
+    """Kääntää kysymyksen Kysymykseksi tai palauttaa None, jos sillä ei ole kelvollista oikeaa vastausta."""
+    if not isinstance(q, dict):
+        return None
+    options = list(q.get("options", []))
+    correct = q.get("correct")
+    if not options or correct not in options:
+        return None
+    kuva = q.get("image")
+    return Kysymys(
+        str(q.get("question", "")),
+        tuple(sys.intern(str(o)) for o in options),
+        options.index(correct),
+        kuva if isinstance(kuva, str) else None,
+    )
+
+
+def kysymyksen_nimi(q: Any) -> str:
+    if isinstance(q, dict):
+        return q.get("question", "(tuntematon kysymys)")
+    return "(tuntematon kysymys)"
+
+
+class _VirtaLukija:
+    """Lukee JSON-tiedostoa paloina ja pitää kirjaa tavusiirtymästä.
+
+    Muistissa on kerrallaan vain yksi pala sekä parhaillaan dekoodattava arvo.
+    """
+
+    def __init__(self, f: BinaryIO, palan_koko: int = PALAN_KOKO):
+        self._f = f
+        self._palan_koko = palan_koko
+        self._dekooderi = codecs.getincrementaldecoder("utf-8")()
+        self._puskuri = ""
+        self._i = 0
+        self._laskettu = 0  # puskurin kohta, johon asti _tavu on laskettu
+        self._tavu = 0
+        self._loppu = False
+        alku = f.read(len(UTF8_BOM))
+        if alku == UTF8_BOM:
+            self._tavu = len(UTF8_BOM)
+        else:
+            self._puskuri = self._dekooderi.decode(alku)
+
+    def tavusiirtyma(self) -> int:
+        if self._laskettu != self._i:
+            self._tavu += len(self._puskuri[self._laskettu:self._i].encode("utf-8"))
+            self._laskettu = self._i
+        return self._tavu
+
+    def _lue_lisaa(self) -> bool:
+        if self._loppu:
+            return False
+        raaka = self._f.read(self._palan_koko)
+        if raaka:
+            teksti = self._dekooderi.decode(raaka)
+        else:
+            teksti = self._dekooderi.decode(b"", final=True)
+            self._loppu = True
+        self.tavusiirtyma()
+        self._puskuri = self._puskuri[self._i:] + teksti
+        self._i = self._laskettu = 0
+        return True
+
+    def tavukohta(self, kohta: int) -> int:
+        """Muuntaa puskurin merkkikohdan tiedoston tavusiirtymäksi."""
+        alku = self.tavusiirtyma()
+        if kohta >= self._i:
+            return alku + len(self._puskuri[self._i:kohta].encode("utf-8"))
+        return alku - len(self._puskuri[kohta:self._i].encode("utf-8"))
+
+    def _virhe(self, viesti: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(viesti, self._puskuri, self._i)
+
+    def kurkista(self) -> str:
+        """Ohittaa välilyönnit ja palauttaa seuraavan merkin ("" tiedoston lopussa)."""
+        while True:
+            self._i = _VALIT.match(self._puskuri, self._i).end()
+            if self._i < len(self._puskuri) or not self._lue_lisaa():
+                break
+        return self._puskuri[self._i] if self._i < len(self._puskuri) else ""
+
+    def kuluta(self, merkki: str) -> None:
+        if self.kurkista() != merkki:
+            raise self._virhe(f"Odotettiin '{merkki}'")
+        self._i += 1
+
+    def erotin(self, loppumerkki: str) -> bool:
+        """Kuluttaa pilkun tai loppumerkin. Palauttaa True, jos rakenne jatkuu."""
+        merkki = self.kurkista()
+        if merkki == ",":
+            self._i += 1
+            return True
+        self.kuluta(loppumerkki)
+        return False
+
+    def arvo(self) -> Any:
+        self.kurkista()
+        while True:
+            try:
+                arvo, loppu = _DEKOODERI.raw_decode(self._puskuri, self._i)
+            except json.JSONDecodeError:
+                if self._lue_lisaa():
+                    continue
+                raise
+            # Puskurin loppuun osuva luku voi jatkua seuraavassa palassa: "12." tai
+            # "1e" dekoodautuu lukuna 12 tai 1, vaikka loput ovat vielä lukematta
+            if (
+                isinstance(arvo, (int, float))
+                and not isinstance(arvo, bool)
+                and _LUVUN_JATKO.fullmatch(self._puskuri, loppu)
+                and self._lue_lisaa()
+            ):
+                continue
+            self._i = loppu
+            return arvo
+
+
+class KysymysVirta:
+    """Iteroi tenttitiedoston kysymykset yksi kerrallaan lukematta koko tiedostoa muistiin.
+
+    Tuottaa kolmikkoja (tavu_alku, tavu_loppu, kysymys) tai pelkkiä
+    kysymyksiä, jos siirtymat=False. Tukee samoja muotoja
+    kuin lue_kysymykset: pelkkä lista tai {"questions": [...]} (jos
+    questions-avaimia on useita, vain ensimmäinen taulukko luetaan). Otsikko
+    selvitetään samalla etsi_otsikko-säännöillä ja on käytettävissä
+    attribuutissa ``otsikko``, kun virta on luettu loppuun. Virran voi
+    iteroida useasti; jokainen kierros avaa tiedoston uudelleen.
+    Jäsennysvirheen tavusiirtymä tiedostossa jää attribuuttiin ``virhekohta``.
+    """
+
+    def __init__(self, polku: str, palan_koko: int = PALAN_KOKO, siirtymat: bool = True):
+        self.polku = polku
+        self.palan_koko = palan_koko
+        self.siirtymat = siirtymat
+        self.otsikko: Optional[str] = None
+        self.otsikko_valmis = False
+        self.virhekohta: Optional[int] = None
+
+    def __iter__(self) -> Iterator[Any]:
+        self.otsikko = None
+        self.otsikko_valmis = False
+        self.virhekohta = None
+        with open(self.polku, "rb") as f:
+            lukija = _VirtaLukija(f, self.palan_koko)
+            try:
+                merkki = lukija.kurkista()
+                if merkki == "[":
+                    yield from self._taulukko(lukija, ensisijainen=True)
+                elif merkki == "{":
+                    yield from self._objekti(lukija)
+                else:
+                    self.otsikko = etsi_otsikko(lukija.arvo())
+                if lukija.kurkista():
+                    raise lukija._virhe("Ylimääräistä dataa")
+            except json.JSONDecodeError as exc:
+                self.virhekohta = lukija.tavukohta(exc.pos)
+                raise
+        self.otsikko_valmis = True
+
+    def _taulukko(self, lukija: _VirtaLukija, ensisijainen: bool, etsi: bool = True) -> Iterator[Any]:
+        """Käy läpi kysymystaulukon. Palauttaa ensimmäisen alkioista löytyneen otsikon."""
+        otsikko = None
+        lukija.kuluta("[")
+        if lukija.kurkista() == "]":
+            lukija.kuluta("]")
+            return otsikko
+        while True:
+            lukija.kurkista()
+            alku = lukija.tavusiirtyma()
+            q = lukija.arvo()
+            if etsi and otsikko is None:
+                otsikko = etsi_otsikko(q)
+                if otsikko and ensisijainen:
+                    self.otsikko = otsikko
+                    self.otsikko_valmis = True
+            yield (alku, lukija.tavusiirtyma(), q) if self.siirtymat else q
+            if not lukija.erotin("]"):
+                return otsikko
+
+    def _objekti(self, lukija: _VirtaLukija) -> Iterator[Any]:
+        suora = None  # ylätason TITLE-avain voittaa aina
+        sisakkainen = None  # muuten ensimmäinen arvoista rekursiivisesti löytynyt
+        kysymykset_luettu = False
+        lukija.kuluta("{")
+        if lukija.kurkista() == "}":
+            lukija.kuluta("}")
+            return
+        while True:
+            avain = lukija.arvo()
+            lukija.kuluta(":")
+            if avain == "questions" and not kysymykset_luettu and lukija.kurkista() == "[":
+                kysymykset_luettu = True
+                loytynyt = yield from self._taulukko(
+                    lukija, ensisijainen=False, etsi=suora is None and sisakkainen is None
+                )
+            else:
+                arvo = lukija.arvo()
+                loytynyt = None
+                if suora is None and isinstance(avain, str) and avain.upper() == "TITLE":
+                    if isinstance(arvo, str) and arvo.strip():
+                        suora = arvo.strip()
+                        self.otsikko = suora
+                        self.otsikko_valmis = True
+                if suora is None and sisakkainen is None:
+                    loytynyt = etsi_otsikko(arvo)
+            if sisakkainen is None and loytynyt:
+                sisakkainen = loytynyt
+            if not lukija.erotin("}"):
+                break
+        self.otsikko = suora or sisakkainen
+
+    def hae_otsikko(self) -> Optional[str]:
+        """Lukee virtaa vain niin pitkälle, että otsikko on varmasti selvillä."""
+        for _ in self:
+            if self.otsikko_valmis:
+                break
+        return self.otsikko
+
+
+def kelvolliset(kysymykset: Iterable[Any], virheelliset: Optional[List[str]] = None) -> Iterator[Kysymys]:
+    """Validoi kysymykset lennossa ja tuottaa vain kelvolliset normalisoituina.
+
+    Hylättyjen kysymysten nimet lisätään listaan virheelliset, jos se on annettu.
+    """
+    for q in kysymykset:
+        normalisoitu = normalisoi_kysymys(q)
+        if normalisoitu is not None:
+            yield normalisoitu
+        elif virheelliset is not None:
+            virheelliset.append(kysymyksen_nimi(q))
+
+
+def arvo_kysymykset(kysymykset: Iterable[Any], k: int, rng: random.Random = random) -> list:
+    """Arpoo k alkiota virrasta säiliöotannalla (reservoir sampling).
+
+    Muistia kuluu O(k) riippumatta virran pituudesta. Tulos on satunnaisessa
+    järjestyksessä kuten random.samplella.
+    """
+    valitut: list = []
+    for i, q in enumerate(kysymykset):
+        if i < k:
+            valitut.append(q)
+        else:
+            j = rng.randrange(i + 1)
+            if j < k:
+                valitut[j] = q
+    rng.shuffle(valitut)
+    return valitut
+
+
+@dataclass
+class IndeksiRivi:
+    tiedosto: str
+    mtime_ns: int
+    koko: int
+    otsikko: Optional[str]
+    kysymyksia: int
+    kelvollinen: bool
+    virheelliset: List[str] = field(default_factory=list)
+    siirtymat: array = field(default_factory=lambda: array("q"))
+    # Jäsennysvirhe (tavusiirtymä, viesti), jos kelvollinen on False. Ei tallennu indeksiin.
+    virhe: Optional[Tuple[int, str]] = None
+
+    @property
+    def kelvollisia(self) -> int:
+        return len(self.siirtymat) // 2
+
+
+def skannaa_tentti(
+    polku: str,
+    tiedosto: str,
+    stat: os.stat_result,
+    tarkista: Optional[Callable[[int, int, Any, Optional[Kysymys]], None]] = None,
+) -> IndeksiRivi:
+    """Jäsentää yhden tenttitiedoston ja laskee kelvollisten kysymysten tavusiirtymät.
+
+    tarkista(alku, loppu, kysymys, normalisoitu) kutsutaan jokaiselle
+    kysymykselle (update_tentit.py:n tarkistus käyttää samaa läpikäyntiä).
+    """
+    rivi = IndeksiRivi(
+        tiedosto=tiedosto,
+        mtime_ns=stat.st_mtime_ns,
+        koko=stat.st_size,
+        otsikko=None,
+        kysymyksia=0,
+        kelvollinen=False,
+    )
+    virta = KysymysVirta(polku)
+    try:
+        for alku, loppu, q in virta:
+            rivi.kysymyksia += 1
+            normalisoitu = normalisoi_kysymys(q)
+            if normalisoitu is None:
+                rivi.virheelliset.append(kysymyksen_nimi(q))
+            else:
+                rivi.siirtymat.extend((alku, loppu))
+            if tarkista is not None:
+                tarkista(alku, loppu, q, normalisoitu)
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        viesti = exc.msg if isinstance(exc, json.JSONDecodeError) else str(exc)
+        rivi.virhe = (virta.virhekohta or 0, f"{type(exc).__name__}: {viesti}")
+        rivi.kysymyksia = 0
+        rivi.virheelliset = []
+        rivi.siirtymat = array("q")
+        return rivi
+    rivi.otsikko = virta.otsikko
+    rivi.kelvollinen = True
+    return rivi
+
+
+class IndeksoidutKysymykset(Sequence):
+    """Kelvolliset kysymykset, jotka luetaan levyltä vasta tarvittaessa siirtymien avulla.
+
+    Siirtymät pätevät vain tiedostoon, jonka mtime ja koko ne laskettaessa
+    olivat. Jos tiedosto on sen jälkeen muuttunut (esim. editori tai
+    update_tentit.py --watch kirjoitti sen tentin aikana), se skannataan
+    uudelleen ennen lukemista.
+    """
+
+    def __init__(self, polku: str, siirtymat: array, mtime_ns: int, koko: int):
+        self._polku = polku
+        self._siirtymat = siirtymat
+        self._mtime_ns = mtime_ns
+        self._koko = koko
+
+    def _skannaa_uudelleen(self, stat: os.stat_result) -> None:
+        rivi = skannaa_tentti(self._polku, os.path.basename(self._polku), stat)
+        if not rivi.kelvollinen:
+            raise ValueError(f"{self._polku} muuttui eikä ole enää kelvollinen JSON-tentti")
+        self._siirtymat, self._mtime_ns, self._koko = rivi.siirtymat, rivi.mtime_ns, rivi.koko
+
+    def __len__(self) -> int:
+        return len(self._siirtymat) // 2
+
+    def __getitem__(self, index) -> Kysymys:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        with open(self._polku, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_mtime_ns != self._mtime_ns or stat.st_size != self._koko:
+                self._skannaa_uudelleen(stat)
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            alku, loppu = self._siirtymat[2 * index], self._siirtymat[2 * index + 1]
+            f.seek(alku)
+            raaka = f.read(loppu - alku)
+        kysymys = normalisoi_kysymys(json.loads(raaka))
+        if kysymys is None:  # tiedosto muuttui kesken skannauksen
+            raise ValueError(f"{self._polku} muuttui kesken lukemisen")
+        return kysymys
+
+
+class TenttiIndeksi:
+    """SQLite-pohjainen indeksi yhden tenttikansion JSON-tiedostoille."""
+
+    def __init__(self, kansio: str, polku: Optional[str] = None):
+        self.kansio = kansio
+        self.polku = polku or os.path.join(kansio, INDEKSI_TIEDOSTO)
+        try:
+            self._yhteys = sqlite3.connect(self.polku)
+            self._alusta()
+        except sqlite3.Error:
+            # Kirjoitussuojattu kansio tms. -> indeksi pidetään vain muistissa
+            self._yhteys = sqlite3.connect(":memory:")
+            self._alusta()
+
+    def _alusta(self) -> None:
+        c = self._yhteys
+        c.execute("CREATE TABLE IF NOT EXISTS meta (avain TEXT PRIMARY KEY, arvo TEXT)")
+        versio = c.execute("SELECT arvo FROM meta WHERE avain = 'versio'").fetchone()
+        if not versio or versio[0] != INDEKSIN_VERSIO:
+            c.execute("DROP TABLE IF EXISTS tentit")
+            c.execute(
+                "INSERT OR REPLACE INTO meta (avain, arvo) VALUES ('versio', ?)",
+                (INDEKSIN_VERSIO,),
+            )
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tentit (
+                tiedosto TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                koko INTEGER NOT NULL,
+                otsikko TEXT,
+                kysymyksia INTEGER NOT NULL,
+                kelvollinen INTEGER NOT NULL,
+                virheelliset TEXT NOT NULL,
+                siirtymat BLOB NOT NULL
+            )
+            """
+        )
+        c.commit()
+
+    def sulje(self) -> None:
+        self._yhteys.close()
+
+    def _rivi(self, tulos) -> IndeksiRivi:
+        siirtymat = array("q")
+        siirtymat.frombytes(tulos[7])
+        return IndeksiRivi(
+            tiedosto=tulos[0],
+            mtime_ns=tulos[1],
+            koko=tulos[2],
+            otsikko=tulos[3],
+            kysymyksia=tulos[4],
+            kelvollinen=bool(tulos[5]),
+            virheelliset=json.loads(tulos[6]),
+            siirtymat=siirtymat,
+        )
+
+    def _tallenna(self, rivi: IndeksiRivi) -> None:
+        self._yhteys.execute(
+            "INSERT OR REPLACE INTO tentit VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                rivi.tiedosto,
+                rivi.mtime_ns,
+                rivi.koko,
+                rivi.otsikko,
+                rivi.kysymyksia,
+                int(rivi.kelvollinen),
+                json.dumps(rivi.virheelliset, ensure_ascii=False),
+                rivi.siirtymat.tobytes(),
+            ),
+        )
+
+    def tallennettu(self, tiedosto: str) -> Optional[Tuple[int, int]]:
+        """Indeksoidun version (mtime_ns, koko) tai None, jos tiedostoa ei ole indeksissä."""
+        tulos = self._yhteys.execute(
+            "SELECT mtime_ns, koko FROM tentit WHERE tiedosto = ?", (tiedosto,)
+        ).fetchone()
+        return tuple(tulos) if tulos else None
+
+    def tallenna(self, rivit: Iterable[IndeksiRivi]) -> None:
+        """Tallentaa muualla skannatut rivit (esim. update_tentit.py:n tarkistus prosessipoolissa)."""
+        for rivi in rivit:
+            self._tallenna(rivi)
+        self._yhteys.commit()
+
+    def paivita(self) -> List[IndeksiRivi]:
+        """Synkronoi indeksin kansion kanssa ja palauttaa rivit os.listdir-järjestyksessä.
+
+        Vain tiedostot, joiden mtime tai koko on muuttunut, jäsennetään uudelleen.
+        """
+        vanhat = {
+            tulos[0]: tulos
+            for tulos in self._yhteys.execute("SELECT * FROM tentit")
+        }
+        rivit: List[IndeksiRivi] = []
+        muuttui = False
+        with os.scandir(self.kansio) as kohteet:
+            for kohde in kohteet:
+                if not kohde.name.endswith(".json") or not kohde.is_file():
+                    continue
+                stat = kohde.stat()
+                vanha = vanhat.pop(kohde.name, None)
+                if vanha and vanha[1] == stat.st_mtime_ns and vanha[2] == stat.st_size:
+                    rivit.append(self._rivi(vanha))
+                    continue
+                rivi = skannaa_tentti(kohde.path, kohde.name, stat)
+                self._tallenna(rivi)
+                rivit.append(rivi)
+                muuttui = True
+        if vanhat:
+            self._yhteys.executemany(
+                "DELETE FROM tentit WHERE tiedosto = ?", [(nimi,) for nimi in vanhat]
+            )
+            muuttui = True
+        if muuttui:
+            self._yhteys.commit()
+        return rivit
+
+    def hae(self, tiedosto: str) -> Optional[IndeksiRivi]:
+        """Palauttaa yhden tiedoston rivin ja skannaa sen uudelleen, jos se on muuttunut."""
+        polku = os.path.join(self.kansio, tiedosto)
+        try:
+            stat = os.stat(polku)
+        except OSError:
+            return None
+        tulos = self._yhteys.execute(
+            "SELECT * FROM tentit WHERE tiedosto = ?", (tiedosto,)
+        ).fetchone()
+        if tulos and tulos[1] == stat.st_mtime_ns and tulos[2] == stat.st_size:
+            return self._rivi(tulos)
+        rivi = skannaa_tentti(polku, tiedosto, stat)
+        self._tallenna(rivi)
+        self._yhteys.commit()
+        return rivi
+
+    def kysymykset(self, rivi: IndeksiRivi) -> IndeksoidutKysymykset:
+        return IndeksoidutKysymykset(os.path.join(self.kansio, rivi.tiedosto), rivi.siirtymat, rivi.mtime_ns, rivi.koko)
@@ -1,31 +1,49 @@
+import importlib.machinery
 import json
 import os
 import random
+import sys
+import time
 
-# Värikoodit
-RED = "\033[91m"
-GREEN = "\033[32m"
-YELLOW = "\033[93m"
-RESET = "\033[0m"
+from profilointi import vaihe, vaiheittain
+from tenttinaytto import CLEAR_SCREEN, GREEN, RED, RESET, YELLOW, Naytto, TenttiNakyma
+from tenttipankki import (
+    KysymysVirta,
+    TenttiIndeksi,
+    arvo_kysymykset,
+    etsi_otsikko,
+    kelvolliset,
+)
 
 
 TENTTIKANSIO = "TENTIT"
 
-try:
-    from rich.align import Align
-    from rich.console import Console
-    from rich.panel import Panel
-    from rich.table import Table
-    from rich.text import Text
-except ImportError:  # Rich ei ole pakollinen, pidetään taaksepäin yhteensopivuus
-    Align = None
-    Console = None
-    Panel = None
-    Table = None
-    Text = None
-
-console = Console() if Console else None
-RICH_AVAILABLE = console is not None
+# Rich tuodaan vasta, kun ensimmäinen paneeli piirretään (ks. lataa_rich), sillä
+# sen tuonti hidastaa käynnistystä. --plain ohittaa Richin kokonaan.
+Align = None
+Console = None
+Panel = None
+Text = None
+console = None
+# PathFinder ei tuo importlib.utilia, joka on itsessään hidas tuoda
+RICH_AVAILABLE = importlib.machinery.PathFinder.find_spec("rich") is not None
+PLAIN = False
+
+
+def lataa_rich():
+    """Tuo Richin ja luo konsolin ensimmäisellä kutsulla. Palauttaa konsolin tai None."""
+    global Align, Console, Panel, Text, console
+    if console is not None or PLAIN or not RICH_AVAILABLE:
+        return console
+    try:
+        from rich.align import Align
+        from rich.console import Console
+        from rich.panel import Panel
+        from rich.text import Text
+    except ImportError:  # Rich ei ole pakollinen, pidetään taaksepäin yhteensopivuus
+        return None
+    console = Console()
+    return console
 
 
 def get_panel_width():
@@ -69,8 +87,11 @@ def print_progress(answered, total, score):
         print(progress_text)
 
 
+# Tyhjentää näytön ANSI-koodilla (ei käynnistä clear/cls-prosessia).
 def clear_screen():
-    os.system("cls" if os.name == "nt" else "clear")
+    if sys.stdout.isatty():
+        sys.stdout.write(CLEAR_SCREEN)
+        sys.stdout.flush()
 
 
 # Etsii tenttikansiosta json-tiedostot.
@@ -78,212 +99,183 @@ def hae_tentit():
     return [f for f in os.listdir(TENTTIKANSIO) if f.endswith(".json")]
 
 
-# Lukee kysymykset jsonista
-def lue_kysymykset(tiedosto):
-    with open(os.path.join(TENTTIKANSIO, tiedosto), "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    otsikko = hae_tenttiotsikko(data)
-    if isinstance(data, list):
-        return data, otsikko
-    if isinstance(data, dict):
-        questions = data.get("questions")
-        if isinstance(questions, list):
-            return questions, otsikko
-    return [], otsikko
+# Lukee kysymykset jsonista. Tiedosto luetaan virtana, joten muistiin ei
+# jäsennetä koko dokumenttia. virtaa=True palauttaa listan sijaan uudelleen
+# iteroitavan KysymysVirran, jolloin kysymyksiäkään ei kerätä muistiin.
+def lue_kysymykset(tiedosto, virtaa=False):
+    virta = KysymysVirta(os.path.join(TENTTIKANSIO, tiedosto), siirtymat=False)
+    if virtaa:
+        return virta, virta.hae_otsikko()
+    kysymykset = list(virta)
+    return kysymykset, virta.otsikko
 
 
 def hae_tenttiotsikko(lahde):
     if isinstance(lahde, str):
         polku = os.path.join(TENTTIKANSIO, lahde)
         try:
-            with open(polku, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except (OSError, json.JSONDecodeError):
+            return KysymysVirta(polku).hae_otsikko()
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError):
             return None
-    else:
-        data = lahde
-
-    def _etsi_title(obj):
-        if isinstance(obj, dict):
-            for key, value in obj.items():
-                if key.upper() == "TITLE" and isinstance(value, str):
-                    otsikko = value.strip()
-                    if otsikko:
-                        return otsikko
-            for value in obj.values():
-                loytynyt = _etsi_title(value)
-                if loytynyt:
-                    return loytynyt
-        elif isinstance(obj, list):
-            for item in obj:
-                loytynyt = _etsi_title(item)
-                if loytynyt:
-                    return loytynyt
-        return None
 
-    return _etsi_title(data)
+    return etsi_otsikko(lahde)
 
 
-# Tentin suoritus
-def suorita_tentti(questions, otsikko=None):
-    valid_questions = []
-    invalid_questions = []
+# Tentin suoritus. Jos virheelliset on annettu, questions on jo validoitu
+# (esim. indeksistä luettu IndeksoidutKysymykset) eikä sitä käydä läpi uudelleen.
+# Muuten questions käydään läpi kahdesti (laskenta ja säiliöotanta), joten sen
+# pitää olla uudelleen iteroitava, esim. lista tai KysymysVirta.
+# Jos historia annetaan, jokainen vastaus kirjataan siihen tiedoston nimellä
+# (kysymyksen oma "tiedosto"-kenttä voittaa, esim. hakutulosten tentissä).
+# Jos ajastin (kertaus.Kertausajastin) annetaan, kysymykset arvotaan sen
+# painoilla; questions pitää silloin olla indeksoitava jono.
+# Jos tenttitiedosto muuttuu kesken (IndeksoidutKysymykset skannaa sen uudelleen
+# ja se lyheni tai rikkoutui), suoritus lopetetaan ilmoitukseen.
+def suorita_tentti(questions, otsikko=None, virheelliset=None, historia=None, tiedosto=None, ajastin=None):
+    with vaihe("tentti"):
+        _suorita_tentti(questions, otsikko, virheelliset, historia, tiedosto, ajastin)
 
-    for q in questions:
-        options = list(q.get("options", []))
-        correct = q.get("correct")
-        if not options or correct not in options:
-            invalid_questions.append(q.get("question", "(tuntematon kysymys)"))
-            continue
-        valid_questions.append(
-            {
-                "question": q["question"],
-                "options": options,
-                "correct": correct,
-            }
-        )
+
+def _suorita_tentti(questions, otsikko, virheelliset, historia, tiedosto, ajastin):
+    if virheelliset is not None:
+        invalid_questions = virheelliset
+        valid_count = len(questions)
+    else:
+        invalid_questions = []
+        with vaihe("validointi"):
+            valid_count = sum(1 for _ in kelvolliset(questions, invalid_questions))
 
     if invalid_questions:
         print(f"{YELLOW}Huom: seuraavilta kysymyksiltä puuttui kelvollinen oikea vastaus:{RESET}")
         for name in invalid_questions:
             print(f"- {name}")
 
-    if not valid_questions:
+    if not valid_count:
         print(f"{RED}Tentistä puuttuu kelvollisia kysymyksiä.{RESET}")
         return
 
     while True:
         try:
-            question_amount = int(
-                input(
-                    f"Montako kysymystä kysytään? (kysymyksiä yht. {len(valid_questions)}): "
-                )
-            )
-            if 1 <= question_amount <= len(valid_questions):
+            with vaihe("syöte"):
+                raw_amount = input(f"Montako kysymystä kysytään? (kysymyksiä yht. {valid_count}): ")
+            question_amount = int(raw_amount)
+            if 1 <= question_amount <= valid_count:
                 break
             print(f"{RED}Annettu numero ei ole kysymysten määrän sisällä.{RESET}")
         except ValueError:
             print(f"{RED}Syöte ei ollut numero.{RESET}")
 
-    quiz_questions = random.sample(valid_questions, k=question_amount)
+    with vaihe("arvonta"):
+        try:
+            if ajastin is not None:
+                quiz_questions = ajastin.kysymykset(questions, question_amount)
+            elif virheelliset is not None:
+                quiz_questions = random.sample(questions, k=question_amount)
+            else:
+                quiz_questions = arvo_kysymykset(kelvolliset(questions), question_amount)
+        except (IndexError, ValueError) as exc:
+            print(f"{RED}Tenttitiedosto muuttui kesken arvonnan ({exc}). Aloita tentti uudelleen.{RESET}")
+            return
 
     score = 0
     perus_otsikko = "TiTentti"
     naytettava_otsikko = f"{perus_otsikko} : {otsikko}" if otsikko else perus_otsikko
     answered = 0
     user_answers = []
-
-    for index, q in enumerate(quiz_questions, 1):
-        clear_screen()
-        panel_width = get_panel_width()
-        if console and Text:
-            header = Text.assemble(
-                (naytettava_otsikko, "bold cyan"),
-                ("    "),
-                (f"Kysymys {index}/{question_amount}", "bold yellow"),
-            )
-            console.rule(header)
-        else:
-            print("=" * 50)
-            print(f"{naytettava_otsikko}  |  Kysymys {index}/{question_amount}")
-            print("=" * 50)
-
-        options = q["options"][:]
-        random.shuffle(options)
-
-        try:
-            answer_index = options.index(q["correct"])
-        except ValueError:
-            print(f"{RED}Kysymyksen oikeaa vastausta ei löytynyt vaihtoehdoista.{RESET}")
-            continue
-
-        question_header = f"Kysymys {index}/{question_amount}"
-        question_body = q["question"]
-        if console and Panel and Text:
-            title_text = Text("Kysymys", style="bold yellow")
-            body_text = Text(question_body)
-            question_panel = Panel(
-                body_text,
-                title=title_text,
-                border_style="cyan",
-                padding=(1, 2),
-                width=panel_width,
-            )
-            console.print(question_panel)
-        else:
-            print(f"\n{question_header}: {question_body}")
-
-        if console and Table:
-            option_table = Table(box=None, show_header=False, padding=(0, 1))
-            option_table.add_column(" ", justify="right", style="bold")
-            option_table.add_column("Vaihtoehto", overflow="fold")
-            for opt_index, option in enumerate(options, 1):
-                option_table.add_row(str(opt_index), option)
-            console.print(
-                Panel(
-                    option_table,
-                    title=Text("Vaihtoehdot", style="bold magenta"),
-                    border_style="magenta",
-                    padding=(0, 2),
-                    width=panel_width,
+    muuttui = []
+
+    # Kysymykset piirretään vaihtoehtoiselle näytölle; edellisen vastauksen
+    # tulos näytetään seuraavan kysymyksen viestirivillä.
+    with vaihe("rich-tuonti"):
+        lataa_rich()
+    nakyma = TenttiNakyma(naytettava_otsikko, question_amount, console)
+    viesti = None
+    if historia is not None:
+        with vaihe("historia"):
+            historia.aloita(tiedosto or naytettava_otsikko, question_amount)
+    with Naytto() as naytto:
+        # Kysymykset voivat olla laiskasti luettavia (indeksi) tai arvottavia (ajastin)
+        for index, q in enumerate(vaiheittain("kysymyksen haku", kunnes_muuttuu(quiz_questions, muuttui)), 1):
+            # Sekoitetaan vain indeksit; vaihtoehdot ovat jaettuja merkkijonoja
+            jarjestys = q.sekoitus()
+            options = [q.vaihtoehdot[i] for i in jarjestys]
+            answer_index = jarjestys.index(q.oikea)
+
+            max_option = len(options)
+            prompt_message = f"Valitse vaihtoehto (1-{max_option}): "
+            aloitettu = time.perf_counter()
+            while True:
+                with vaihe("piirto"):
+                    naytto.piirra(
+                        nakyma.kehys(
+                            index,
+                            q.kysymys,
+                            options,
+                            render_progress(answered, question_amount, score),
+                            viesti,
+                        )
+                    )
+                try:
+                    with vaihe("syöte"):
+                        raw_input = input("> " if console else prompt_message)
+                    user_input = int(raw_input)
+                    if 1 <= user_input <= max_option:
+                        break
+                    viesti = [(f"Anna luku välillä 1-{max_option}", "yellow")]
+                except ValueError:
+                    viesti = [("Anna kokonaisluku", "yellow")]
+
+            if user_input - 1 == answer_index:
+                viesti = [("Edellinen: ", None), ("Oikein!", "green")]
+                score += 1
+                user_answers.append(
+                    (q.kysymys, True, options[answer_index], options[user_input - 1])
                 )
-            )
-        else:
-            for opt_index, option in enumerate(options, 1):
-                print(f"{opt_index}. {option}")
-
-        if console:
-            console.print()
-        print_progress(answered, question_amount, score)
-
-        max_option = len(options)
-        prompt_message = f"Valitse vaihtoehto (1-{max_option}): "
-        if console and Text:
-            console.print(Text(prompt_message, style="bold magenta"))
-        while True:
-            try:
-                raw_input = input("> " if console else prompt_message)
-                user_input = int(raw_input)
-                if 1 <= user_input <= max_option:
-                    break
-                message = f"Anna luku välillä 1-{max_option}"
-                if console:
-                    console.print(f"[yellow]{message}[/]")
-                else:
-                    print(message)
-            except ValueError:
-                message = "Anna kokonaisluku"
-                if console:
-                    console.print(f"[yellow]{message}[/]")
-                else:
-                    print(message)
-
-        if user_input - 1 == answer_index:
-            if console:
-                console.print("[green]Oikein![/]")
             else:
-                print(f"{GREEN}Oikein!{RESET}")
-            score += 1
-            user_answers.append(
-                (q["question"], True, options[answer_index], options[user_input - 1])
-            )
-        else:
-            correct_option = options[answer_index]
-            if console:
-                console.print(f"[red]Väärin![/] Oikea vastaus: {correct_option}")
-            else:
-                print(f"{RED}Väärin! Oikea vastaus: {correct_option}{RESET}")
-            user_answers.append(
-                (q["question"], False, correct_option, options[user_input - 1])
-            )
+                correct_option = options[answer_index]
+                viesti = [("Edellinen: ", None), ("Väärin!", "red"), (f" Oikea vastaus: {correct_option}", None)]
+                user_answers.append(
+                    (q.kysymys, False, correct_option, options[user_input - 1])
+                )
 
-        answered += 1
-        if console:
-            console.print()
-        print_progress(answered, question_amount, score)
+            answered += 1
+            if ajastin is not None:
+                ajastin.kirjaa(ajastin.viimeisin, user_input - 1 == answer_index)
+            if historia is not None:
+                with vaihe("historia"):
+                    historia.kirjaa(
+                        q.tiedosto or tiedosto or naytettava_otsikko,
+                        q.kysymys,
+                        user_input - 1 == answer_index,
+                        options[user_input - 1],
+                        round((time.perf_counter() - aloitettu) * 1000),
+                    )
+
+    if historia is not None:
+        with vaihe("historia"):
+            historia.lopeta()
+    if muuttui:
+        print(f"{YELLOW}Huom:{RESET} tenttitiedosto muuttui kesken tentin ({muuttui[0]}), suoritus lopetettiin.")
+        question_amount = answered
+    with vaihe("yhteenveto"):
+        tulosta_yhteenveto(naytettava_otsikko, score, question_amount, user_answers)
+
+
+def kunnes_muuttuu(kysymykset, muuttui):
+    """Tuottaa kysymykset, kunnes niiden luku epäonnistuu muuttuneen tiedoston takia (virhe lisätään listaan)."""
+    iteraattori = iter(kysymykset)
+    while True:
+        try:
+            q = next(iteraattori)
+        except StopIteration:
+            return
+        except (IndexError, ValueError) as exc:
+            muuttui.append(exc)
+            return
+        yield q
 
-    clear_screen()
+
+def tulosta_yhteenveto(naytettava_otsikko, score, question_amount, user_answers):
     if console and Text:
         console.rule(Text(naytettava_otsikko, style="bold cyan"))
         console.print(f"\n[bold yellow]=== Yhteenveto ===[/]")
@@ -317,19 +309,333 @@ def suorita_tentti(questions, otsikko=None):
         console.print()
     print_progress(question_amount, question_amount, score)
 
+
+# --- Vastauslomakkeiden eräarviointi (grade) ---
+def etsi_tenttitiedosto(tentti):
+    for polku in (
+        os.path.join(TENTTIKANSIO, tentti),
+        os.path.join(TENTTIKANSIO, f"{tentti}.json"),
+        tentti,
+    ):
+        if os.path.isfile(polku):
+            return polku
+    from arviointi import ArviointiVirhe
+
+    raise ArviointiVirhe(f"tenttiä '{tentti}' ei löytynyt kansiosta {TENTTIKANSIO}")
+
+
+def arvioi_lomakkeet(args):
+    import csv
+
+    from arviointi import Arvioija, ArviointiVirhe, kaanna_avain, lue_lomakkeet
+
+    arvioija = Arvioija(
+        lambda tentti: kaanna_avain(etsi_tenttitiedosto(tentti), tentti, args.answer_format),
+        oletustentti=args.exam,
+    )
+    # Tulokset stdoutiin (-) tai tiedostoon; yhteenveto silloin stderriin
+    loki = sys.stderr if args.results == "-" else sys.stdout
+    tulokset = None
+    if args.results:
+        tulokset = sys.stdout if args.results == "-" else open(args.results, "w", newline="", encoding="utf-8")
+    jsonl = bool(args.results) and args.results.lower().endswith((".jsonl", ".ndjson"))
+    kirjoittaja = csv.writer(tulokset) if tulokset and not jsonl else None
+    if kirjoittaja:
+        kirjoittaja.writerow(["student", "exam", "score", "max", "answered", "percent"])
+
+    lomakkeita = 0
+    pisteet = {}
+    alku = time.perf_counter()
+    try:
+        for polku in args.sheets:
+            for tulos in arvioija.arvioi_kaikki(lue_lomakkeet(polku, args.format)):
+                lomakkeita += 1
+                summa = pisteet.setdefault(tulos.tentti, [0, 0, tulos.maksimi])
+                summa[0] += 1
+                summa[1] += tulos.pisteet
+                if kirjoittaja:
+                    kirjoittaja.writerow(
+                        [tulos.opiskelija, tulos.tentti, tulos.pisteet, tulos.maksimi, tulos.vastattu, f"{tulos.prosentti:.1f}"]
+                    )
+                elif tulokset:
+                    tulokset.write(json.dumps({**tulos._asdict(), "percent": round(tulos.prosentti, 1)}, ensure_ascii=False) + "\n")
+    except (ArviointiVirhe, OSError) as exc:
+        print(f"{RED}Virhe: {exc}{RESET}", file=sys.stderr)
+        return 1
+    finally:
+        if tulokset not in (None, sys.stdout):
+            tulokset.close()
+    kesto = time.perf_counter() - alku
+    tilastot = arvioija.tilastot()
+
+    nopeus = f" ({lomakkeita / kesto:,.0f} lomaketta/s)" if kesto > 0 else ""
+    print(f"Arvioitu {lomakkeita} lomaketta {kesto:.2f} s{nopeus}", file=loki)
+    for tentti, rivit in tilastot.items():
+        maara, summa, maksimi = pisteet.get(tentti, (0, 0, 0))
+        keskiarvo = summa / maara if maara else 0.0
+        print(f"\n{YELLOW}{tentti}{RESET}: {maara} lomaketta, keskiarvo {keskiarvo:.1f}/{maksimi}", file=loki)
+        vaikeimmat = sorted((r for r in rivit if r.p_arvo is not None), key=lambda r: r.p_arvo)[: args.top]
+        if vaikeimmat:
+            print("Vaikeimmat kysymykset (p-arvo = oikein vastanneiden osuus):", file=loki)
+        for r in vaikeimmat:
+            vaara = f", yleisin väärä: {r.yleisin_vaara!r} ({r.yleisin_vaara_maara})" if r.yleisin_vaara else ""
+            kysymys = " ".join(r.kysymys.split())
+            kysymys = kysymys if len(kysymys) <= 50 else kysymys[:47] + "..."
+            print(f"  #{r.tunniste:<4} p={r.p_arvo:.2f}  n={r.vastauksia:<6} {kysymys}{vaara}", file=loki)
+
+    if args.report:
+        raportti = {
+            tentti: [{**r._asdict(), "p_arvo": None if r.p_arvo is None else round(r.p_arvo, 4)} for r in rivit]
+            for tentti, rivit in tilastot.items()
+        }
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(raportti, f, ensure_ascii=False, indent=2)
+        print(f"\nKysymyskohtainen raportti: {args.report}", file=loki)
+    return 0
+
+
+# --- Heikoimmat kysymykset historiasta (weak) ---
+def nayta_heikoimmat(args):
+    from historia import Historia
+
+    historia = Historia(TENTTIKANSIO)
+    try:
+        rivit = historia.heikoimmat(args.top, tiedosto=args.exam, vahintaan=args.min_attempts)
+        suorituksia, vastauksia, oikein = historia.yhteenveto()
+    finally:
+        historia.sulje()
+
+    if not rivit:
+        print("Historiassa ei ole vielä vastauksia.")
+        return 0
+    print(f"{YELLOW}=== Heikoimmat kysymykset ==={RESET}")
+    print(f"{suorituksia} suoritusta, {vastauksia} vastausta, {100 * oikein / vastauksia:.0f} % oikein\n")
+    for rivi in rivit:
+        kysymys = " ".join(rivi.kysymys.split())
+        kysymys = kysymys if len(kysymys) <= 60 else kysymys[:57] + "..."
+        viimeksi = time.strftime("%Y-%m-%d", time.localtime(rivi.viimeksi))
+        kesto = f", {rivi.keskimaarainen_kesto_ms / 1000:.1f} s" if rivi.keskimaarainen_kesto_ms else ""
+        vari = RED if rivi.osuus < 0.5 else YELLOW
+        print(
+            f"{vari}{rivi.oikein}/{rivi.yrityksia}{RESET} {kysymys}\n"
+            f"    {rivi.tiedosto}, viimeksi {viimeksi} ({'oikein' if rivi.viimeksi_oikein else 'väärin'}{kesto})"
+        )
+    return 0
+
+
+# --- Kokotekstihaku ja hakutulosten tentti (search) ---
+def hae_kysymyksia(args):
+    from haku import Hakuindeksi
+
+    kysely = " ".join(args.query)
+    try:
+        hakuindeksi = Hakuindeksi(TENTTIKANSIO)
+    except (OSError, ValueError):
+        print(f"{RED}Hakuindeksiä ei löytynyt. Aja ensin: python TENTIT/update_tentit.py{RESET}")
+        return 1
+    osumat = hakuindeksi.hae(kysely, None if args.quiz else args.limit, tiedosto=args.exam)
+    if not osumat:
+        print(f"Ei osumia haulle '{kysely}'.")
+        return 0
+    if not args.quiz:
+        print(f"{YELLOW}=== Haku: {kysely} ({len(osumat)} osumaa) ==={RESET}")
+        for osuma in osumat:
+            print(f"- {osuma.kysymys}\n    {osuma.otsikko} ({osuma.tiedosto}, kysymys {osuma.kohta + 1})")
+        return 0
+
+    # Osumat luetaan tenttitiedostoista indeksin siirtymillä; jos tentti on
+    # muuttunut indeksin rakentamisen jälkeen, eri kysymykseen osuvat ohitetaan.
+    indeksi = TenttiIndeksi(TENTTIKANSIO)
+    kysymykset = []
+    for osuma in osumat:
+        rivi = indeksi.hae(osuma.tiedosto)
+        if rivi is None or osuma.kohta >= rivi.kelvollisia:
+            continue
+        q = indeksi.kysymykset(rivi)[osuma.kohta]
+        if q.kysymys == osuma.kysymys:
+            q.tiedosto = osuma.tiedosto
+            kysymykset.append(q)
+    if len(kysymykset) < len(osumat):
+        print(f"{YELLOW}Huom:{RESET} {len(osumat) - len(kysymykset)} osumaa ohitettiin, aja python TENTIT/update_tentit.py")
+    if not kysymykset:
+        return 1
+
+    global PLAIN
+    PLAIN = args.plain
+    historia = None
+    if not args.no_history:
+        from historia import Historia
+
+        historia = Historia(TENTTIKANSIO)
+    try:
+        suorita_tentti(kysymykset, otsikko=f"Haku: {kysely}", virheelliset=[], historia=historia)
+    finally:
+        if historia is not None:
+            historia.sulje()
+    return 0
+
+
+# --- Toistettavat tenttiversiot (generate-variants) ---
+def luo_versiot(args):
+    from variantit import avaimen_polku, kirjoita_versiot, muoto_paatteesta
+
+    try:
+        polku = etsi_tenttitiedosto(args.exam)
+    except ValueError as exc:
+        print(f"{RED}Virhe: {exc}{RESET}", file=sys.stderr)
+        return 1
+    siemen = 0 if args.seed is None else args.seed
+    muoto = args.format or muoto_paatteesta(args.output)
+    avaimen_tiedosto = args.key or avaimen_polku(args.output)
+    alku = time.perf_counter()
+    try:
+        # newline="" pitää rivinvaihdot samoina kaikilla alustoilla
+        with open(args.output, "w", newline="", encoding="utf-8") as ulos, open(
+            avaimen_tiedosto, "w", newline="", encoding="utf-8"
+        ) as avain:
+            yhteenveto = kirjoita_versiot(polku, ulos, avain, args.count, siemen, args.questions, muoto, args.workers)
+    except (OSError, ValueError) as exc:
+        print(f"{RED}Virhe: {exc}{RESET}", file=sys.stderr)
+        # Puolikkaita versioita ei jätetä tulostettaviksi
+        for tiedosto in (args.output, avaimen_tiedosto):
+            if os.path.exists(tiedosto):
+                os.remove(tiedosto)
+        return 1
+    kesto = time.perf_counter() - alku
+    print(
+        f"{yhteenveto.versioita} versiota × {yhteenveto.kysymyksia}/{yhteenveto.pankissa} kysymystä "
+        f"(siemen {siemen}) {kesto:.2f} s"
+    )
+    print(f"Versiot: {args.output}\nVastausavain: {avaimen_tiedosto}")
+    if yhteenveto.samoja:
+        print(f"{YELLOW}Huom:{RESET} {yhteenveto.samoja} versiota on samoja kuin jokin aiempi versio (pieni pankki?)")
+    return 0
+
+
 # --- Pääohjelma ---
-def main():
-    if not RICH_AVAILABLE:
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="TiTeTenttaaja komentorivillä.")
+    parser.add_argument("--plain", action="store_true", help="Pelkkä teksti, älä käytä Richiä")
+    parser.add_argument(
+        "--adaptive", action="store_true", help="Mukautuva kertaus: painota heikkoja ja kertausvuorossa olevia kysymyksiä"
+    )
+    parser.add_argument("--no-history", action="store_true", help="Älä tallenna vastauksia historiaan")
+    parser.add_argument("--seed", type=int, help="Satunnaissiemen: sama siemen arpoo samat kysymykset samassa järjestyksessä")
+    parser.add_argument(
+        "--profile", action="store_true", help="Mittaa vaiheiden ajat ja tulosta yhteenveto lopuksi (stderr)"
+    )
+    parser.add_argument(
+        "--profile-out",
+        metavar="TIEDOSTO",
+        help="Tallenna profiili: .json = Chrome trace (jaksot), muu pääte = cProfile-tilastot (pstats)",
+    )
+    komennot = parser.add_subparsers(dest="komento")
+    grade = komennot.add_parser("grade", help="Arvioi vastauslomakkeet (CSV/JSONL) ilman käyttöliittymää")
+    grade.add_argument("sheets", nargs="+", help="Lomaketiedostot (.csv tai .jsonl)")
+    grade.add_argument("--exam", help="Tentti lomakkeille, joissa ei ole exam-kenttää (esim. fysiikka.json)")
+    grade.add_argument("--format", choices=("csv", "jsonl"), help="Lomakkeiden muoto (oletus: päätteestä)")
+    grade.add_argument(
+        "--answer-format",
+        choices=("auto", "index", "text"),
+        default="auto",
+        help="Vastaukset vaihtoehdon numerona/kirjaimena (index), tekstinä (text) vai kumpana vain (auto)",
+    )
+    grade.add_argument("--results", help="Lomakekohtaiset tulokset: .csv, .jsonl tai - (stdout)")
+    grade.add_argument("--report", help="Kysymyskohtaiset tilastot JSON-tiedostoon")
+    grade.add_argument("--top", type=int, default=10, help="Näytettävien vaikeimpien kysymysten määrä")
+    search = komennot.add_parser("search", help="Hae kysymyksiä kaikista tenteistä (ja tenttaa osumista)")
+    search.add_argument("query", nargs="+", help="Hakusanat; jokainen sana voi olla sanan alku")
+    search.add_argument("--limit", type=int, default=20, help="Näytettävien osumien enimmäismäärä")
+    search.add_argument("--exam", help="Hae vain tästä tenttitiedostosta")
+    search.add_argument("--quiz", action="store_true", help="Aloita tentti kaikista osumista")
+    weak = komennot.add_parser("weak", help="Näytä heikoimmat kysymykset suoritushistoriasta")
+    weak.add_argument("--top", type=int, default=20, help="Näytettävien kysymysten määrä")
+    weak.add_argument("--exam", help="Vain tämän tenttitiedoston kysymykset")
+    weak.add_argument("--min-attempts", type=int, default=1, help="Vähintään näin monta vastausta")
+    variants = komennot.add_parser(
+        "generate-variants", help="Luo toistettavat tenttiversiot ja vastausavaimen paperitenttiä varten"
+    )
+    variants.add_argument("exam", help="Tenttitiedosto (esim. fysiikka.json)")
+    variants.add_argument("-n", "--count", type=int, default=500, help="Versioiden määrä")
+    # SUPPRESS: ei ylikirjoita pääkomennon --seediä (oletus 0)
+    variants.add_argument("--seed", type=int, default=argparse.SUPPRESS, help="Siemen; sama siemen tuottaa samat tiedostot")
+    variants.add_argument("--questions", type=int, help="Kysymyksiä per versio (oletus: kaikki)")
+    variants.add_argument("-o", "--output", default="versiot.jsonl", help="Versiot: .jsonl tai .md")
+    variants.add_argument("--format", choices=("jsonl", "md"), help="Versioiden muoto (oletus: päätteestä)")
+    variants.add_argument("--key", help="Vastausavain (CSV, oletus: <output>.key.csv)")
+    variants.add_argument("--workers", type=int, help="Prosessien määrä (oletus: ytimien määrä)")
+    args = parser.parse_args(argv)
+    if args.komento == "generate-variants":
+        if args.count < 1:
+            variants.error("--count pitää olla vähintään 1")
+        if args.questions is not None and args.questions < 1:
+            variants.error("--questions pitää olla vähintään 1")
+        if args.workers is not None and args.workers < 1:
+            variants.error("--workers pitää olla vähintään 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not (args.profile or args.profile_out):
+        return aja(args)
+    import profilointi
+
+    # cProfile vain, jos sen tilastot tallennetaan; Chrome trace tarvitsee vain jaksot
+    profilointi.aloita(cprofile=bool(args.profile_out) and not args.profile_out.lower().endswith(".json"))
+    try:
+        return aja(args)
+    finally:
+        profilointi.lopeta(args.profile_out)
+
+
+def aja(args):
+    global PLAIN
+    PLAIN = args.plain
+    if args.komento == "generate-variants":
+        return luo_versiot(args)
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.komento == "grade":
+        return arvioi_lomakkeet(args)
+    if args.komento == "search":
+        return hae_kysymyksia(args)
+    if args.komento == "weak":
+        return nayta_heikoimmat(args)
+    if not RICH_AVAILABLE and not PLAIN:
         print(
             f"{YELLOW}Huom:{RESET} Rich ei ole asennettuna. "
             "Saat parannetun käyttöliittymän komennolla: "
             "py -m pip install rich"
         )
 
+    # Indeksi pitää otsikot, kysymysmäärät ja siirtymät tallessa kierrosten välillä
+    with vaihe("indeksin avaus"):
+        indeksi = TenttiIndeksi(TENTTIKANSIO)
+    historia = None
+    if not args.no_history:
+        with vaihe("historia"):
+            from historia import Historia
+
+            historia = Historia(TENTTIKANSIO)
+    try:
+        kysele_tentteja(indeksi, historia, args.adaptive)
+    finally:
+        # Myös Ctrl+C:n jälkeen jonossa olevat vastaukset tallennetaan
+        if historia is not None:
+            with vaihe("historia"):
+                historia.sulje()
+
+
+def kysele_tentteja(indeksi, historia, mukautuva=False):
     while True: #pääsilmukka
         print(f"{YELLOW}=== TiTeTenttaaja ==={RESET}")
 
-        tentit = hae_tentit()
+        # Päivitys jäsentää muuttuneet tentit (validointi, otsikon haku, siirtymät)
+        with vaihe("indeksin päivitys"):
+            tentit = [rivi.tiedosto for rivi in indeksi.paivita()]
         if not tentit:
             print(f"{RED}Virhe: kansiossa '{TENTTIKANSIO}' ei ole yhtään JSON-tenttitiedostoa.{RESET}")
             return
@@ -342,7 +648,9 @@ def main():
         # kysytään tenttitiedostoa.
         while True:
             try:
-                valinta = int(input("Valitse tentti (numero): "))
+                with vaihe("syöte"):
+                    raw_valinta = input("Valitse tentti (numero): ")
+                valinta = int(raw_valinta)
                 if 1 <= valinta <= len(tentit):
                     break
                 else:
@@ -353,15 +661,40 @@ def main():
         valittu_tentti = tentit[valinta - 1]
         print(f"\n{YELLOW}Valitsit tentin: {valittu_tentti.replace('.json', '').capitalize()}{RESET}")
 
-        kysymykset, tentti_otsikko = lue_kysymykset(valittu_tentti)
-        suorita_tentti(kysymykset, otsikko=tentti_otsikko)
+        with vaihe("tentin lataus"):
+            rivi = indeksi.hae(valittu_tentti)
+        if rivi is None or not rivi.kelvollinen:
+            print(f"{RED}Tenttitiedostoa '{valittu_tentti}' ei voitu lukea.{RESET}")
+        else:
+            ajastin = None
+            if mukautuva:
+                from kertaus import Kertausajastin
+
+                # Kelvolliset kysymykset ovat virrassa samassa järjestyksessä kuin indeksissä
+                with vaihe("kertauspainot"):
+                    ajastin = Kertausajastin.historiasta(
+                        historia,
+                        valittu_tentti,
+                        kelvolliset(KysymysVirta(os.path.join(TENTTIKANSIO, valittu_tentti), siirtymat=False)),
+                    )
+            with vaihe("tentin lataus"):
+                kysymykset = indeksi.kysymykset(rivi)
+            suorita_tentti(
+                kysymykset,
+                otsikko=rivi.otsikko,
+                virheelliset=rivi.virheelliset,
+                historia=historia,
+                tiedosto=valittu_tentti,
+                ajastin=ajastin,
+            )
 
         # kysytään käyttäjältä tentataanko vielä
-        uudestaan = input("\nHaluatko tehdä toisen tentin? (k/e): ").strip().lower()
+        with vaihe("syöte"):
+            uudestaan = input("\nHaluatko tehdä toisen tentin? (k/e): ").strip().lower()
         if uudestaan != "k":
             clear_screen()
             print("Kiitos tenttailusta. Suljetaan...")
             break
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Toistettavat tenttiversiot paperi- ja valvottuihin tentteihin.
+
+Jokainen versio arvotaan omalla satunnaisgeneraattorillaan, jonka siemen
+johdetaan pääsiemenestä ja version numerosta (random.Random("siemen:numero")).
+Versio ei siis riipu muista versioista eikä siitä, missä prosessissa se
+arvotaan, ja sama siemen tuottaa aina tavulleen samat tiedostot.
+
+- lue_pankki() lukee tentin kelvolliset kysymykset ja niiden tunnisteet
+  (kysymyksen "id" tai järjestysnumero tiedostossa kuten arviointi.py:ssä).
+- arvo_versio() valitsee kysymysten osajoukon, niiden järjestyksen ja
+  kunkin kysymyksen vaihtoehtojen järjestyksen.
+- kirjoita_versiot() jakaa versiot erissä prosessipoolille, joka arpoo ja
+  muotoilee ne (JSONL tai Markdown). Erät kirjoitetaan järjestyksessä
+  sitä mukaa kuin ne valmistuvat, ja samalla kootaan vastausavain
+  (CSV: variant, 1, 2, ... oikean vaihtoehdon kirjaimina).
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterator, List, NamedTuple, Optional, Tuple
+
+from tenttipankki import Kysymys, KysymysVirta, normalisoi_kysymys
+
+MUODOT = ("jsonl", "md")
+ERAN_KOKO = 250
+KIRJAIMET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+class Versio(NamedTuple):
+    numero: int
+    kysymykset: Tuple[int, ...]  # pankin indeksit esitysjärjestyksessä
+    jarjestykset: Tuple[Tuple[int, ...], ...]  # vaihtoehtojen järjestys kysymyksittäin
+    oikeat: Tuple[int, ...]  # oikean vaihtoehdon kohta näytetyssä järjestyksessä
+
+
+class Pankki(NamedTuple):
+    otsikko: str
+    tunnisteet: Tuple[str, ...]
+    kysymykset: Tuple[Kysymys, ...]
+
+
+def lue_pankki(polku: str) -> Pankki:
+    virta = KysymysVirta(polku, siirtymat=False)
+    tunnisteet = []
+    kysymykset = []
+    for numero, q in enumerate(virta, 1):
+        normalisoitu = normalisoi_kysymys(q)
+        if normalisoitu is not None:
+            tunnisteet.append(str(q["id"]) if "id" in q else str(numero))
+            kysymykset.append(normalisoitu)
+    otsikko = virta.otsikko or os.path.splitext(os.path.basename(polku))[0]
+    return Pankki(otsikko, tuple(tunnisteet), tuple(kysymykset))
+
+
+def arvo_versio(pankki: Pankki, siemen: int, numero: int, maara: int) -> Versio:
+    rng = random.Random(f"{siemen}:{numero}")
+    valitut = tuple(rng.sample(range(len(pankki.kysymykset)), maara))
+    jarjestykset = []
+    oikeat = []
+    for i in valitut:
+        q = pankki.kysymykset[i]
+        jarjestys = q.sekoitus(rng)
+        jarjestykset.append(tuple(jarjestys))
+        oikeat.append(jarjestys.index(q.oikea))
+    return Versio(numero, valitut, tuple(jarjestykset), tuple(oikeat))
+
+
+def kirjain(kohta: int) -> str:
+    return KIRJAIMET[kohta] if kohta < len(KIRJAIMET) else str(kohta + 1)
+
+
+def muotoile_jsonl(pankki: Pankki, versio: Versio) -> str:
+    kysymykset = []
+    for i, jarjestys, oikea in zip(versio.kysymykset, versio.jarjestykset, versio.oikeat):
+        q = pankki.kysymykset[i]
+        rivi = {
+            "id": pankki.tunnisteet[i],
+            "question": q.kysymys,
+            "options": [q.vaihtoehdot[j] for j in jarjestys],
+            "answer": kirjain(oikea),
+        }
+        if q.kuva:
+            rivi["image"] = q.kuva
+        kysymykset.append(rivi)
+    return json.dumps({"variant": versio.numero, "questions": kysymykset}, ensure_ascii=False) + "\n"
+
+
+def muotoile_md(pankki: Pankki, versio: Versio) -> str:
+    rivit = [f"# {pankki.otsikko} – versio {versio.numero}", ""]
+    for n, (i, jarjestys) in enumerate(zip(versio.kysymykset, versio.jarjestykset), 1):
+        q = pankki.kysymykset[i]
+        rivit.append(f"**{n}.** {q.kysymys}".replace("\n", "  \n"))
+        rivit.append("")
+        if q.kuva:
+            rivit += [f"![]({q.kuva})", ""]
+        rivit += [f"- {kirjain(k)}) {q.vaihtoehdot[j]}" for k, j in enumerate(jarjestys)]
+        rivit.append("")
+    # Sivunvaihto tulostettaessa (esim. pandoc -> PDF tai selaimen tulostus)
+    rivit += ['<div style="page-break-after: always"></div>', "", ""]
+    return "\n".join(rivit)
+
+
+MUOTOILIJAT = {"jsonl": muotoile_jsonl, "md": muotoile_md}
+
+# Prosessipoolin työntekijän pankki; luetaan kerran initializerissa
+_pankki: Optional[Pankki] = None
+
+
+def _alusta(polku: str) -> None:
+    global _pankki
+    _pankki = lue_pankki(polku)
+
+
+def _era(tehtava: Tuple[int, int, int, int, str]) -> Tuple[str, List[Tuple[int, ...]], List[str]]:
+    """Arpoo ja muotoilee versiot alku..loppu-1: (teksti, avainrivit, tiivisteet)."""
+    siemen, alku, loppu, maara, muoto = tehtava
+    muotoile = MUOTOILIJAT[muoto]
+    osat = []
+    avaimet = []
+    tiivisteet = []
+    for numero in range(alku, loppu):
+        versio = arvo_versio(_pankki, siemen, numero, maara)
+        osat.append(muotoile(_pankki, versio))
+        avaimet.append(versio.oikeat)
+        tunnus = repr((versio.kysymykset, versio.jarjestykset)).encode("ascii")
+        tiivisteet.append(hashlib.blake2b(tunnus, digest_size=16).hexdigest())
+    return "".join(osat), avaimet, tiivisteet
+
+
+class Yhteenveto(NamedTuple):
+    versioita: int
+    kysymyksia: int
+    pankissa: int
+    samoja: int  # versiot, jotka ovat täsmälleen jonkin aiemman version kopioita
+
+
+def kirjoita_versiot(
+    polku: str,
+    ulos: IO[str],
+    avain: IO[str],
+    maara: int,
+    siemen: int,
+    kysymyksia: Optional[int] = None,
+    muoto: str = "jsonl",
+    prosesseja: Optional[int] = None,
+    eran_koko: int = ERAN_KOKO,
+) -> Yhteenveto:
+    """Kirjoittaa versiot 1..maara tiedostoon ulos ja vastausavaimen CSV:nä tiedostoon avain.
+
+    prosesseja=1 arpoo versiot tässä prosessissa; tulos on sama kuin poolilla.
+    """
+    if muoto not in MUOTOILIJAT:
+        raise ValueError(f"tuntematon muoto: {muoto}")
+    pankki = lue_pankki(polku)
+    if not pankki.kysymykset:
+        raise ValueError(f"{polku}: tentissä ei ole kelvollisia kysymyksiä")
+    kysymyksia = len(pankki.kysymykset) if kysymyksia is None else kysymyksia
+    if not 1 <= kysymyksia <= len(pankki.kysymykset):
+        raise ValueError(f"kysymysten määrän pitää olla 1-{len(pankki.kysymykset)}")
+
+    tehtavat = [
+        (siemen, alku, min(alku + eran_koko, maara + 1), kysymyksia, muoto)
+        for alku in range(1, maara + 1, eran_koko)
+    ]
+    prosesseja = min(prosesseja or os.cpu_count() or 1, len(tehtavat)) if tehtavat else 1
+    kirjoittaja = csv.writer(avain, lineterminator="\n")
+    kirjoittaja.writerow(["variant", *range(1, kysymyksia + 1)])
+    nahdyt = set()
+    samoja = 0
+    numero = 1
+
+    def kirjoita(tulokset: Iterator[Tuple[str, List[Tuple[int, ...]], List[str]]]) -> None:
+        nonlocal numero, samoja
+        for teksti, avaimet, tiivisteet in tulokset:
+            ulos.write(teksti)
+            for oikeat, tiiviste in zip(avaimet, tiivisteet):
+                kirjoittaja.writerow([numero, *map(kirjain, oikeat)])
+                samoja += tiiviste in nahdyt
+                nahdyt.add(tiiviste)
+                numero += 1
+
+    if prosesseja <= 1:
+        global _pankki
+        _pankki = pankki
+        try:
+            kirjoita(map(_era, tehtavat))
+        finally:
+            _pankki = None
+    else:
+        with ProcessPoolExecutor(prosesseja, initializer=_alusta, initargs=(polku,)) as pool:
+            # map palauttaa erät järjestyksessä, joten tuloste ei riipu ajoituksesta
+            kirjoita(pool.map(_era, tehtavat))
+    return Yhteenveto(maara, kysymyksia, len(pankki.kysymykset), samoja)
+
+
+def avaimen_polku(polku: str) -> str:
+    juuri, _ = os.path.splitext(polku)
+    return f"{juuri}.key.csv"
+
+
+def muoto_paatteesta(polku: str, oletus: str = "jsonl") -> str:
+    paate = os.path.splitext(polku)[1].lower()
+    return {".jsonl": "jsonl", ".ndjson": "jsonl", ".md": "md", ".markdown": "md"}.get(paate, oletus)
+